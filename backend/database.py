@@ -2,7 +2,7 @@
 إعدادات قاعدة البيانات PostgreSQL
 """
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -23,6 +23,21 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # القاعدة للنماذج
 Base = declarative_base()
 
+# فهارس trigram (pg_trgm) للبحث التقريبي: (اسم الفهرس، الجدول، العمود)
+# تُنشأ خارج النماذج لأن الإضافة قد لا تكون متاحة على كل خادم
+TRIGRAM_INDEXES = [
+    ("ix_teams_team_name_trgm", "teams", "team_name_normalized"),
+    ("ix_team_members_name_trgm", "team_members", "name_normalized"),
+    ("ix_team_members_email_trgm", "team_members", "email_normalized"),
+    ("ix_team_members_phone_trgm", "team_members", "phone_normalized"),
+    ("ix_individuals_name_trgm", "individuals", "name_normalized"),
+    ("ix_individuals_email_trgm", "individuals", "email_normalized"),
+    ("ix_individuals_phone_trgm", "individuals", "phone_normalized"),
+]
+
+# هل إضافة pg_trgm مفعّلة؟ (تُحدد عند تهيئة قاعدة البيانات)
+_trigram_enabled = False
+
 
 def get_db():
     """الحصول على جلسة قاعدة البيانات"""
@@ -37,8 +52,64 @@ def init_db():
     """تهيئة قاعدة البيانات وإنشاء الجداول"""
     from models import (
         Admin, Team, TeamMember, Individual,
-        ProjectSubmission, Evaluation, ProgramVersion, EmailLog
+        ProjectSubmission, Evaluation, ProgramVersion, EmailLog, AICallLog,
+        ProjectFingerprint, ProjectLSHBucket
     )
     Base.metadata.create_all(bind=engine)
+    sync_schema()
+    sync_trigram_indexes()
     print("✅ تم إنشاء جميع الجداول بنجاح")
-    
\ No newline at end of file
+
+
+def sync_schema():
+    """
+    مزامنة إضافية للجداول الموجودة مسبقاً (create_all لا يعدّلها)
+    - إضافة الأعمدة الجديدة (قابلة لأن تكون NULL)
+    - إنشاء الفهارس الجديدة
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"✅ تمت إضافة العمود {table.name}.{column.name}")
+
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def sync_trigram_indexes():
+    """
+    تفعيل pg_trgm وإنشاء فهارس GIN trigram
+    - إذا لم تكن الإضافة متاحة يعمل البحث بـ LIKE على الأعمدة الموحدة
+    """
+    global _trigram_enabled
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        _trigram_enabled = False
+        print(f"⚠️ إضافة pg_trgm غير متاحة، سيُستخدم البحث بدون فهارس trigram: {e.__class__.__name__}")
+        return
+
+    with engine.begin() as conn:
+        for name, table, column in TRIGRAM_INDEXES:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)"
+            ))
+    _trigram_enabled = True
+
+
+def trigram_enabled() -> bool:
+    """هل يمكن استخدام دوال pg_trgm (similarity، word_similarity)؟"""
+    return _trigram_enabled
@@ -3,17 +3,54 @@
 FastAPI Backend
 """
 import os
+import re
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from database import init_db, SessionLocal
 from models import Admin
 from services.auth_service import get_password_hash
+from services.project_search import project_search_service
+from services.team_search import team_search_service
+from services.search_index import search_index_service
+from services.pagination import NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER
+from services.people_directory import people_directory_service
+from services.duplicate_detection import duplicate_detection_service
 from routers import students_router, projects_router, admin_router, evaluation_router, email_router
 
 load_dotenv()
 
+# ضغط الاستجابات الأكبر من هذا الحجم (بالبايت)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1000"))
+
+# مسارات البث (SSE) لا تُضغط حتى لا تُحجز الأحداث في ذاكرة الضاغط
+UNCOMPRESSED_PATHS = [r"^/api/evaluation/ai/stream$"]
+
+# Brotli اختياري (brotli-asgi)، وإلا GZip
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZip مع استثناء مسارات البث"""
+
+    def __init__(self, app, excluded_handlers=(), **kwargs):
+        super().__init__(app, **kwargs)
+        self.excluded_handlers = [re.compile(path) for path in excluded_handlers]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and any(p.search(scope["path"]) for p in self.excluded_handlers):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
 # إنشاء التطبيق
 app = FastAPI(
     title="منصة مسابقات تكنوفيست",
@@ -36,7 +73,9 @@ app = FastAPI(
     """,
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # ترميز JSON بـ orjson لكل المسارات
+    default_response_class=ORJSONResponse
 )
 
 # إعدادات CORS
@@ -46,8 +85,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # ترويسات ترقيم الصفحات بالمؤشر
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER],
 )
 
+# ضغط الاستجابات: Brotli للمتصفحات التي تدعمه مع الرجوع لـ GZip
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware,
+        quality=4,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_fallback=True,
+        excluded_handlers=UNCOMPRESSED_PATHS
+    )
+else:
+    app.add_middleware(
+        SelectiveGZipMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        excluded_handlers=UNCOMPRESSED_PATHS
+    )
+
 # تسجيل المسارات
 app.include_router(students_router)
 app.include_router(projects_router)
@@ -71,6 +128,35 @@ async def startup_event():
     # إنشاء المدير الأعلى تلقائياً إذا لم يكن موجوداً
     create_super_admin()
 
+    # فهرسة البيانات السابقة للبحث في خيط خلفي حتى لا يتأخر تشغيل الخادم
+    threading.Thread(target=build_search_indexes, daemon=True).start()
+
+    # بناء فهرس البحث الداخلي في الخلفية
+    search_index_service.load_in_background()
+
+
+def build_search_indexes():
+    """حساب متجه البحث وبصمة كشف التكرار للمشاريع والقيم الموحدة للفرق والمشاركين إن لم توجد"""
+    db = SessionLocal()
+    try:
+        indexed = project_search_service.index_missing(db)
+        if indexed:
+            print(f"✅ تمت فهرسة {indexed} مشروع للبحث النصي")
+        normalized = team_search_service.normalize_missing(db)
+        if normalized:
+            print(f"✅ تم توحيد أسماء {normalized} فريق للبحث")
+        people = people_directory_service.normalize_missing(db)
+        if people:
+            print(f"✅ تم توحيد بيانات {people} مشارك لدليل المشاركين")
+        fingerprinted = duplicate_detection_service.index_missing(db)
+        if fingerprinted:
+            print(f"✅ تم حساب بصمة {fingerprinted} مشروع لكشف التكرار")
+    except Exception as e:
+        print(f"❌ خطأ في فهرسة المشاريع للبحث: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
 
 def create_super_admin():
     """إنشاء المدير الأعلى إذا لم يكن موجوداً"""
@@ -2,10 +2,11 @@
 نماذج قاعدة البيانات - جميع الجداول
 """
 from sqlalchemy import (
-    Column, Integer, String, Text, Boolean, Float, 
-    DateTime, ForeignKey, Enum, JSON, LargeBinary
+    Column, Integer, SmallInteger, BigInteger, String, Text, Boolean, Float, 
+    DateTime, ForeignKey, Enum, JSON, LargeBinary, Index
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 from database import Base
 import enum
@@ -57,6 +58,7 @@ class ProgramVersion(Base):
     version_name = Column(String(100))  # اسم النسخة (مثل: النسخة الأولى 2024)
     is_active = Column(Boolean, default=True)  # هل النسخة نشطة؟
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # العلاقات
     teams = relationship("Team", back_populates="program_version")
@@ -81,6 +83,7 @@ class Admin(Base):
     is_active = Column(Boolean, default=True)
     is_superadmin = Column(Boolean, default=False)  # مدير عام
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # العلاقات
     evaluations = relationship("Evaluation", back_populates="admin")
@@ -94,11 +97,13 @@ class Team(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     team_name = Column(String(100), nullable=False)
+    # الاسم الموحد للبحث التقريبي (يُحدَّث تلقائياً من services/team_search.py)
+    team_name_normalized = Column(String(100))
     registration_type = Column(Enum(RegistrationType), nullable=False)
     field = Column(String(100), nullable=False)  # المجال المختار - استخدام String بدلاً من Enum
     gender = Column(Enum(Gender, name="gender_enum"), nullable=False, index=True) # gender of team
     # معلومات فكرة المشروع (للفرق التي لديها فكرة)
-    initial_idea = Column(Text)  # وصف أولي للفكرة
+    initial_idea = deferred(Column(Text))  # وصف أولي للفكرة (يُحمَّل عند الطلب فقط)
     
     # نسخة البرنامج
     program_version_id = Column(Integer, ForeignKey("program_versions.id"))
@@ -111,6 +116,11 @@ class Team(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # ترتيب الصفحات بالمؤشر (created_at, id)
+    __table_args__ = (
+        Index("ix_teams_created_at_id", "created_at", "id"),
+    )
+
     # العلاقات
     members = relationship("TeamMember", back_populates="team", cascade="all, delete-orphan")
     project_submissions = relationship("ProjectSubmission", back_populates="team")
@@ -129,6 +139,20 @@ class TeamMember(Base):
     is_leader = Column(Boolean, default=False)  # مشرف الفريق
     membership_number = Column(String(50), nullable=True)  # رقم العضوية إن وجد
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # قيم موحدة لدليل المشاركين (تُحدَّث تلقائياً من services/people_directory.py)
+    name_normalized = Column(String(100))
+    email_normalized = Column(String(100))
+    phone_normalized = Column(String(20))
+
+    __table_args__ = (
+        # varchar_pattern_ops: للمساواة والبحث بالبادئة (LIKE 'abc%')
+        Index("ix_team_members_email_normalized", "email_normalized",
+              postgresql_ops={"email_normalized": "varchar_pattern_ops"}),
+        Index("ix_team_members_phone_normalized", "phone_normalized",
+              postgresql_ops={"phone_normalized": "varchar_pattern_ops"}),
+    )
     
     # العلاقات
     team = relationship("Team", back_populates="members")
@@ -158,8 +182,8 @@ class Individual(Base):
     # المجال المرغوب
     preferred_field = Column(String(100), nullable=False)  # استخدام String بدلاً من Enum
     
-    # وصف فكرة المشروع (للأفراد الذين لديهم فكرة - سيناريو 2)
-    project_idea = Column(Text)
+    # وصف فكرة المشروع (للأفراد الذين لديهم فكرة - سيناريو 2) - يُحمَّل عند الطلب فقط
+    project_idea = deferred(Column(Text))
     
     # الفريق المُعيَّن (للأفراد بدون فكرة بعد الفرز)
     assigned_team_id = Column(Integer, ForeignKey("teams.id"), nullable=True)
@@ -171,6 +195,19 @@ class Individual(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # قيم موحدة لدليل المشاركين (تُحدَّث تلقائياً من services/people_directory.py)
+    name_normalized = Column(String(100))
+    email_normalized = Column(String(100))
+    phone_normalized = Column(String(20))
+
+    __table_args__ = (
+        Index("ix_individuals_created_at_id", "created_at", "id"),
+        Index("ix_individuals_email_normalized", "email_normalized",
+              postgresql_ops={"email_normalized": "varchar_pattern_ops"}),
+        Index("ix_individuals_phone_normalized", "phone_normalized",
+              postgresql_ops={"phone_normalized": "varchar_pattern_ops"}),
+    )
+
 
 # ================== نموذج المشروع ==================
 
@@ -189,9 +226,10 @@ class ProjectSubmission(Base):
     
     # بيانات المشروع
     title = Column(String(200), nullable=False)  # عنوان المشروع
-    problem_statement = Column(Text, nullable=False)  # المشكلة التي يحلها
-    technical_description = Column(Text, nullable=False)  # الوصف التقني (1000+ حرف)
-    scientific_reference = Column(Text, nullable=False)  # المرجع العلمي
+    # النصوص الطويلة مؤجلة كمجموعة "content": لا تُقرأ في القوائم، وتُحمَّل معاً باستعلام واحد عند الحاجة
+    problem_statement = deferred(Column(Text, nullable=False), group="content")  # المشكلة التي يحلها
+    technical_description = deferred(Column(Text, nullable=False), group="content")  # الوصف التقني (1000+ حرف)
+    scientific_reference = deferred(Column(Text, nullable=False), group="content")  # المرجع العلمي
     
     # المجال
     field = Column(String(100), nullable=False)  # استخدام String بدلاً من Enum
@@ -206,9 +244,18 @@ class ProjectSubmission(Base):
     is_complete = Column(Boolean, default=False)  # هل مكتمل؟
     character_count = Column(Integer, default=0)  # عدد الأحرف
     is_featured = Column(Boolean, default=False)  # هل يظهر في صفحة أفضل الفرق؟
+
+    # متجه البحث النصي (العنوان A، المشكلة B، الوصف C، ملاحظات المحكمين D)
+    # يُحدَّث من services/project_search.py ولا يُحمَّل مع المشروع
+    search_vector = deferred(Column(TSVECTOR))
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_project_submissions_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_project_submissions_created_at_id", "created_at", "id"),
+    )
     
     # العلاقات
     team = relationship("Team", back_populates="project_submissions")
@@ -216,6 +263,27 @@ class ProjectSubmission(Base):
     evaluations = relationship("Evaluation", back_populates="project")
 
 
+# ================== بصمات المشاريع (كشف التكرار) ==================
+
+class ProjectFingerprint(Base):
+    """بصمة نص المشروع - MinHash لكشف النسخ المتشابهة"""
+    __tablename__ = "project_fingerprints"
+
+    project_id = Column(Integer, ForeignKey("project_submissions.id"), primary_key=True)
+    content_hash = Column(String(64), nullable=False, index=True)  # للنسخ المطابقة تماماً
+    minhash = Column(JSON, nullable=False)  # توقيع MinHash
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ProjectLSHBucket(Base):
+    """فهرس LSH - كل مشروع يقع في سلة واحدة لكل حزمة من التوقيع"""
+    __tablename__ = "project_lsh_buckets"
+
+    band = Column(SmallInteger, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    project_id = Column(Integer, ForeignKey("project_submissions.id"), primary_key=True, index=True)
+
+
 # ================== نموذج التقييم ==================
 
 class Evaluation(Base):
@@ -247,6 +315,24 @@ class Evaluation(Base):
     admin = relationship("Admin", back_populates="evaluations")
 
 
+# ================== نموذج سجل استدعاءات AI ==================
+
+class AICallLog(Base):
+    """سجل استدعاءات تقييم AI - للقياس (الزمن، التوكنات، التكلفة)"""
+    __tablename__ = "ai_call_logs"
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("project_submissions.id"), nullable=False, index=True)
+    model = Column(String(50), nullable=False)
+    tier = Column(String(20))  # درجة سلّم النماذج (NULL للنتائج المعاد استخدامها)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    latency_ms = Column(Integer, default=0)  # الزمن الكلي بما فيه إعادة الطلب
+    retries = Column(SmallInteger, default=0)  # عدد طلبات التصحيح
+    outcome = Column(String(10), nullable=False)  # real, cached, mocked, failed, escalated
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
 # ================== نموذج سجل الإيميلات ==================
 
 class EmailLog(Base):
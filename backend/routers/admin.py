@@ -2,14 +2,16 @@
 مسارات الإداريين - تسجيل الدخول وإدارة النظام
 """
 import os
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
-from datetime import timedelta
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload, undefer, undefer_group
+from sqlalchemy import func, select, true
+from typing import List, Optional
+from datetime import timedelta, datetime
 from dotenv import load_dotenv
-from database import get_db
+from database import get_db, SessionLocal
 from models import (
     Admin, Gender, Team, TeamMember, Individual, ProjectSubmission,
     ProgramVersion, RegistrationType, Evaluation
@@ -17,7 +19,7 @@ from models import (
 from schemas import (
     AdminCreate, AdminResponse, AdminLogin, Token,
     TeamResponse, IndividualResponse, AssignIndividualsToTeam,
-    EmailSend, ProgramVersionCreate, ProgramVersionResponse
+    EmailSend, ProgramVersionCreate, ProgramVersionResponse, PersonResult
 )
 from services.auth_service import (
     verify_password, get_password_hash, create_access_token,
@@ -25,6 +27,14 @@ from services.auth_service import (
 )
 from services.email_service import email_service
 from services.pdf_generator import pdf_service
+from services.duplicate_detection import duplicate_detection_service
+from services.search_index import search_index_service, INDEXED_FIELDS
+from services.people_directory import people_directory_service
+from services.data_export import data_export_service
+from services.cache import cache, cached
+from services.scoring import project_scores_subquery
+from services.http_cache import data_version, etag_for
+from services.single_flight import single_flight
 
 # تحميل متغيرات البيئة
 load_dotenv()
@@ -187,7 +197,7 @@ async def get_unassigned_individuals(
     db: Session = Depends(get_db)
 ):
     """الحصول على الأفراد غير المفرزين"""
-    individuals = db.query(Individual).filter(
+    individuals = db.query(Individual).options(undefer(Individual.project_idea)).filter(
         Individual.is_assigned == False
     ).all()
     return individuals
@@ -266,6 +276,258 @@ async def assign_individuals_to_team(
     }
 
 
+# ==================== كشف المشاريع المكررة ====================
+
+@router.get("/duplicates")
+async def get_duplicate_clusters(
+    threshold: Optional[float] = None,
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    مجموعات المشاريع المتشابهة بين فرق مختلفة (نسخ مطابقة أو معدلة قليلاً)
+    - threshold: التشابه الأدنى (0-1)، الافتراضي من DUPLICATE_SIMILARITY_THRESHOLD
+    - unindexed: مشاريع بلا بصمة بعد (تُفهرس عند التشغيل أو عبر POST /duplicates/reindex)
+    """
+    clusters = duplicate_detection_service.find_clusters(db, threshold)
+
+    return {
+        "unindexed": duplicate_detection_service.count_missing(db),
+        "total_clusters": len(clusters),
+        "clusters": clusters
+    }
+
+
+@router.post("/duplicates/reindex")
+def reindex_duplicates(
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """حساب بصمات المشاريع التي لا تملك بصمة (دالة متزامنة: حساب MinHash في threadpool)"""
+    indexed = duplicate_detection_service.index_missing(db)
+    return {"newly_indexed": indexed}
+
+
+@router.get("/duplicates/{project_id}")
+async def get_project_duplicates(
+    project_id: int,
+    threshold: Optional[float] = None,
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """المشاريع المشابهة لمشروع معين"""
+    project = db.query(ProjectSubmission).filter(
+        ProjectSubmission.id == project_id
+    ).first()
+
+    if not project:
+        raise HTTPException(status_code=404, detail="المشروع غير موجود")
+
+    similar = duplicate_detection_service.find_similar(db, project_id, threshold)
+
+    projects = {
+        p.id: p
+        for p in db.query(ProjectSubmission).filter(
+            ProjectSubmission.id.in_([pid for pid, _ in similar])
+        ).all()
+    }
+
+    return {
+        "project_id": project_id,
+        "similar": [
+            {
+                "id": pid,
+                "title": projects[pid].title,
+                "team_id": projects[pid].team_id,
+                "same_team": projects[pid].team_id == project.team_id,
+                "similarity": round(score, 3)
+            }
+            for pid, score in similar
+        ]
+    }
+
+
+# ==================== البحث الموحد ====================
+
+@router.get("/search")
+def search_everything(
+    q: str,
+    kinds: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    بحث موحد في المشاريع والفرق وأعضاء الفرق والأفراد (الفهرس الداخلي - BM25)
+    - kinds: أنواع مفصولة بفواصل (project,team,member,individual)، الافتراضي الكل
+    - دالة متزامنة (threadpool): الفهرس قد يُحمَّل أو يُحدَّث أثناء الطلب فلا يحجز حلقة الأحداث
+    """
+    kind_list = [k.strip() for k in kinds.split(",") if k.strip()] if kinds else None
+    if kind_list and any(k not in INDEXED_FIELDS for k in kind_list):
+        raise HTTPException(
+            status_code=400,
+            detail=f"أنواع غير معروفة. المتاح: {', '.join(INDEXED_FIELDS)}"
+        )
+
+    started = time.perf_counter()
+    hits = search_index_service.search(q, kinds=kind_list, limit=limit)
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    # عنوان مختصر لكل نتيجة (استعلام واحد لكل نوع)
+    labels = {}
+    for kind, (model, fields) in INDEXED_FIELDS.items():
+        ids = [h["id"] for h in hits if h["kind"] == kind]
+        if not ids:
+            continue
+        for row in db.query(model.id, getattr(model, fields[0])).filter(model.id.in_(ids)).all():
+            labels[(kind, row[0])] = row[1]
+
+    return {
+        "query": q,
+        "took_ms": took_ms,
+        "index": search_index_service.stats(),
+        "results": [
+            {**hit, "label": labels.get((hit["kind"], hit["id"]))}
+            for hit in hits
+        ]
+    }
+
+
+# ==================== دليل المشاركين ====================
+
+@router.get("/people", response_model=List[PersonResult])
+async def search_people(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    بحث فوري في أعضاء الفرق والأفراد بالاسم أو البريد أو الهاتف (استعلام واحد)
+    - كل نتيجة توضح الفريق وحالة الفرز
+    """
+    return people_directory_service.search(db, q, limit=limit)
+
+
+# ==================== إحصائيات لوحة التحكم ====================
+
+@router.get("/stats")
+@cached(key="admin-stats:{program_version_id}", tags=["teams", "individuals", "projects", "scores", "program"])
+async def get_dashboard_stats(
+    program_version_id: Optional[int] = None,
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    كل عدادات لوحة التحكم في طلب واحد (استعلامان مجمّعان بدل عدّ كل رقم على حدة)
+    - program_version_id: نسخة برنامج معينة (الافتراضي الكل)
+    - مخزنة مؤقتاً وتُبطل تلقائياً عند أي تسجيل أو مشروع أو تقييم جديد
+    """
+    def scoped(statement, model):
+        if program_version_id is None:
+            return statement
+        return statement.where(model.program_version_id == program_version_id)
+
+    active_team = Team.is_active == True
+    teams = scoped(select(
+        func.count().filter(active_team).label("teams_total"),
+        func.count().filter(active_team, Team.registration_type == RegistrationType.TEAM_WITH_IDEA).label("teams_with_idea"),
+        func.count().filter(active_team, Team.registration_type == RegistrationType.TEAM_NO_IDEA).label("teams_no_idea")
+    ), Team).subquery()
+
+    members = scoped(select(
+        func.count(TeamMember.id).label("members_total")
+    ).join(Team, Team.id == TeamMember.team_id).where(active_team), Team).subquery()
+
+    individuals = scoped(select(
+        func.count().label("individuals_total"),
+        func.count().filter(Individual.registration_type == RegistrationType.INDIVIDUAL_WITH_IDEA).label("individuals_with_idea"),
+        func.count().filter(Individual.registration_type == RegistrationType.INDIVIDUAL_NO_IDEA).label("individuals_no_idea"),
+        func.count().filter(Individual.is_assigned == False).label("individuals_unassigned")
+    ), Individual).subquery()
+
+    projects = scoped(select(
+        func.count().label("projects_total"),
+        func.count().filter(ProjectSubmission.has_attachments == True).label("projects_with_attachments"),
+        func.count().filter(ProjectSubmission.is_featured == True).label("projects_featured")
+    ), ProjectSubmission).subquery()
+
+    is_ai = Evaluation.is_ai_evaluation == True
+    is_admin = Evaluation.is_ai_evaluation == False
+    evaluations = scoped(select(
+        func.count(Evaluation.id).label("evaluations_total"),
+        func.count(Evaluation.id).filter(is_ai).label("evaluations_ai"),
+        func.count(Evaluation.project_id.distinct()).label("projects_evaluated"),
+        func.count(Evaluation.project_id.distinct()).filter(is_ai).label("projects_with_ai"),
+        func.count(Evaluation.project_id.distinct()).filter(is_admin).label("projects_with_admin"),
+        func.avg(Evaluation.score).filter(is_ai).label("average_ai_score"),
+        func.avg(Evaluation.score).filter(is_admin).label("average_admin_score")
+    ).join(ProjectSubmission, ProjectSubmission.id == Evaluation.project_id), ProjectSubmission).subquery()
+
+    version_filter = (
+        ProgramVersion.id == program_version_id if program_version_id is not None
+        else ProgramVersion.is_active == True
+    )
+    version_name = select(ProgramVersion.version_name).where(version_filter).limit(1).scalar_subquery()
+
+    # كل مجموعة صف واحد، فتُربط بـ ON true في استعلام واحد
+    row = db.execute(
+        select(teams, members, individuals, projects, evaluations, version_name.label("program_version"))
+        .select_from(teams)
+        .join(members, true())
+        .join(individuals, true())
+        .join(projects, true())
+        .join(evaluations, true())
+    ).mappings().one()
+
+    field_distribution = db.execute(scoped(
+        select(ProjectSubmission.field, func.count()).group_by(ProjectSubmission.field),
+        ProjectSubmission
+    )).all()
+
+    return {
+        "program_version": row["program_version"],
+        "teams": {
+            "with_idea": row["teams_with_idea"],
+            "no_idea": row["teams_no_idea"],
+            "total": row["teams_total"],
+            "members": row["members_total"]
+        },
+        "individuals": {
+            "with_idea": row["individuals_with_idea"],
+            "no_idea": row["individuals_no_idea"],
+            "total": row["individuals_total"],
+            "unassigned": row["individuals_unassigned"]
+        },
+        "total_participants": row["members_total"] + row["individuals_total"],
+        "projects": {
+            "total": row["projects_total"],
+            "with_attachments": row["projects_with_attachments"],
+            "without_attachments": row["projects_total"] - row["projects_with_attachments"],
+            "featured": row["projects_featured"],
+            "field_distribution": {field: count for field, count in field_distribution}
+        },
+        "evaluations": {
+            "total": row["evaluations_total"],
+            "ai": row["evaluations_ai"],
+            "admin": row["evaluations_total"] - row["evaluations_ai"],
+            "projects_with_ai_evaluation": row["projects_with_ai"],
+            "projects_with_admin_evaluation": row["projects_with_admin"],
+            "projects_without_evaluation": row["projects_total"] - row["projects_evaluated"],
+            "average_ai_score": round(row["average_ai_score"] or 0, 2),
+            "average_admin_score": round(row["average_admin_score"] or 0, 2)
+        }
+    }
+
+
+# ==================== التخزين المؤقت ====================
+
+@router.get("/cache/stats")
+async def get_cache_stats(current_admin: dict = Depends(get_current_admin)):
+    """عدادات التخزين المؤقت (الإصابة والإخفاق والطرد والإبطال) ودمج الطلبات المتزامنة"""
+    return {**cache.stats(), "single_flight": single_flight.stats()}
+
+
 # ==================== إرسال روابط تلغرام ====================
 
 @router.post("/send-telegram-links/{team_id}")
@@ -329,7 +591,7 @@ async def export_project_pdf(
     db: Session = Depends(get_db)
 ):
     """تصدير مشروع كـ PDF"""
-    project = db.query(ProjectSubmission).filter(
+    project = db.query(ProjectSubmission).options(undefer_group("content")).filter(
         ProjectSubmission.id == project_id
     ).first()
     
@@ -395,53 +657,15 @@ async def export_all_projects_pdf(
     current_admin: dict = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """تصدير جميع المشاريع كتقرير PDF"""
-    projects = db.query(ProjectSubmission).all()
-
-    projects_data = []
-    for project in projects:
-        evaluations = db.query(Evaluation).filter(
-            Evaluation.project_id == project.id
-        ).all()
+    """
+    تصدير جميع المشاريع كتقرير PDF
+    - الطلبات المتزامنة لنفس النسخة من البيانات تشترك في توليد واحد
+    """
+    version = data_version(db, ProjectSubmission, Team, Evaluation, Admin)
+    # إعادة اتصال الطلب للمجمّع قبل الانتظار حتى لا يستنفد المنتظرون الاتصالات
+    db.close()
+    pdf_bytes = await single_flight.do(etag_for("projects-pdf", version), build_projects_report_pdf)
 
-        # تقييم AI (من 25)
-        ai_evaluation = next((e for e in evaluations if e.is_ai_evaluation), None)
-        ai_score = ai_evaluation.score if ai_evaluation else 0
-
-        # تقييمات الإداريين (من 75) - حساب المتوسط المرجح
-        admin_evaluations = [e for e in evaluations if not e.is_ai_evaluation]
-        if admin_evaluations:
-            admin_scores_weighted = []
-            for evaluation in admin_evaluations:
-                admin = db.query(Admin).filter(Admin.id == evaluation.admin_id).first()
-                weight = admin.evaluation_weight if admin else 100
-                admin_scores_weighted.append({
-                    "score": evaluation.score,
-                    "weight": weight
-                })
-
-            total_weight = sum(a["weight"] for a in admin_scores_weighted)
-            admin_score = sum(
-                a["score"] * a["weight"] for a in admin_scores_weighted
-            ) / total_weight if total_weight > 0 else 0
-        else:
-            admin_score = 0
-
-        # النتيجة النهائية: تقييم الإداريين (من 75) + تقييم AI (من 25) = من 100
-        total_score = (admin_score + ai_score) if evaluations else None
-
-        projects_data.append({
-            "title": project.title,
-            "team_name": project.team.team_name,
-            "field": project.field,
-            "total_score": total_score
-        })
-    
-    # ترتيب حسب النتيجة
-    projects_data.sort(key=lambda x: x.get("total_score") or 0, reverse=True)
-    
-    pdf_bytes = pdf_service.generate_projects_report_pdf(projects_data)
-    
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
@@ -451,6 +675,40 @@ async def export_all_projects_pdf(
     )
 
 
+def build_projects_report_pdf() -> bytes:
+    """توليد تقرير المشاريع (يعمل في threadpool بجلسته الخاصة، والنتائج محسوبة في SQL)"""
+    db = SessionLocal()
+    try:
+        scores = project_scores_subquery(db)
+        rows = db.query(
+            ProjectSubmission.title,
+            Team.team_name,
+            ProjectSubmission.field,
+            scores.c.total_score
+        ).join(
+            Team, Team.id == ProjectSubmission.team_id
+        ).outerjoin(
+            scores, scores.c.project_id == ProjectSubmission.id
+        ).order_by(
+            func.coalesce(scores.c.total_score, 0).desc(), ProjectSubmission.id
+        ).all()
+    finally:
+        db.close()
+
+    # النتيجة النهائية: تقييم الإداريين (من 75) + تقييم AI (من 25) = من 100، وNone بدون تقييمات
+    projects_data = [
+        {
+            "title": title,
+            "team_name": team_name,
+            "field": field,
+            "total_score": total_score
+        }
+        for title, team_name, field, total_score in rows
+    ]
+
+    return pdf_service.generate_projects_report_pdf(projects_data)
+
+
 @router.get("/export/team/{team_id}/pdf")
 async def export_team_pdf(
     team_id: int,
@@ -458,7 +716,9 @@ async def export_team_pdf(
     db: Session = Depends(get_db)
 ):
     """تصدير معلومات فريق كـ PDF"""
-    team = db.query(Team).filter(Team.id == team_id).first()
+    team = db.query(Team).options(
+        undefer(Team.initial_idea), selectinload(Team.members)
+    ).filter(Team.id == team_id).first()
     
     if not team:
         raise HTTPException(status_code=404, detail="الفريق غير موجود")
@@ -490,6 +750,58 @@ async def export_team_pdf(
     )
 
 
+# ==================== تصدير البيانات ====================
+
+def export_stream(fmt: str, name: str, exporters: dict, *args) -> StreamingResponse:
+    """بث ملف التصدير بالصيغة المطلوبة (csv أو ndjson)"""
+    media_types = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+    if fmt not in exporters:
+        raise HTTPException(status_code=400, detail="صيغة غير مدعومة. المتاح: csv, ndjson")
+
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M')}.{fmt}"
+    return StreamingResponse(
+        exporters[fmt](*args),
+        media_type=media_types[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.get("/export/registrations.{fmt}")
+async def export_registrations(
+    fmt: str,
+    program_version_id: Optional[int] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    تصدير كل التسجيلات في طلب واحد (بث مباشر من قاعدة البيانات)
+    - csv: صف لكل عضو فريق مع بيانات فريقه، ثم صف لكل فرد
+    - ndjson: سطر لكل فريق مع أعضائه، ثم سطر لكل فرد
+    - program_version_id: نسخة برنامج معينة (الافتراضي الكل)
+    """
+    return export_stream(fmt, "registrations", {
+        "csv": data_export_service.registrations_csv,
+        "ndjson": data_export_service.registrations_ndjson
+    }, program_version_id)
+
+
+@router.get("/export/scores.{fmt}")
+async def export_scores(
+    fmt: str,
+    program_version_id: Optional[int] = None,
+    field: Optional[str] = None,
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    كشف درجات المحكمين للتدقيق (صف لكل مشروع من استعلام مجمّع واحد)
+    - درجة كل محكم، درجة AI، المعايير التفصيلية (AI ومتوسط المحكمين)، والنتيجة النهائية
+    - program_version_id / field: تصفية اختيارية
+    """
+    return export_stream(fmt, "scores", {
+        "csv": data_export_service.scores_csv,
+        "ndjson": data_export_service.scores_ndjson
+    }, program_version_id, field)
+
+
 # ==================== نسخ البرنامج ====================
 
 @router.post("/program-version", response_model=ProgramVersionResponse)
@@ -7,9 +7,10 @@ from pydantic import BaseModel
 from typing import List, Optional
 
 from database import get_db
-from models import Team, Individual, TeamMember
+from models import Team
 from services.auth_service import get_current_admin
 from services.email_service import email_service
+from services.people_directory import people_directory_service, normalize_email
 
 router = APIRouter(prefix="/api/email", tags=["البريد الإلكتروني"])
 
@@ -46,19 +47,11 @@ async def send_email(
         "details": []
     }
 
-    for email in request.recipient_emails:
-        # البحث عن اسم المستلم من قاعدة البيانات
-        recipient_name = "المشارك"
+    # أسماء جميع المستلمين في استعلام واحد (الأفراد أولاً ثم أعضاء الفرق)
+    names = people_directory_service.names_by_email(db, request.recipient_emails)
 
-        # البحث في الأفراد
-        individual = db.query(Individual).filter(Individual.email == email).first()
-        if individual:
-            recipient_name = individual.full_name
-        else:
-            # البحث في أعضاء الفرق
-            team_member = db.query(TeamMember).filter(TeamMember.email == email).first()
-            if team_member:
-                recipient_name = team_member.full_name
+    for email in request.recipient_emails:
+        recipient_name = names.get(normalize_email(email), "المشارك")
 
         # إنشاء محتوى البريد
         if request.telegram_link:
@@ -1,21 +1,40 @@
 """
 مسارات التقييم - تقييم الإداريين وتقييم AI
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import os
+import json
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, selectinload, undefer, undefer_group
+from sqlalchemy import func, case
 from typing import List, Optional
-from database import get_db
-from models import Evaluation, ProjectSubmission, Admin, Team
+from datetime import datetime, timedelta, timezone
+from database import get_db, SessionLocal
+from models import Evaluation, ProjectSubmission, Admin, Team, TeamMember, AICallLog, ProjectFingerprint
 from schemas import (
     EvaluationCreate, EvaluationResponse, AIEvaluationRequest,
     TopTeamResponse
 )
 from services.auth_service import get_current_admin
 from services.ai_evaluation import ai_evaluation_service
+from services.duplicate_detection import duplicate_detection_service
+from services.prescorer import prescorer_service
+from services.project_search import project_search_service
+from services.http_cache import conditional_response, data_version, etag_for
+from services.single_flight import single_flight
+from services.scoring import project_scores_subquery
 
 router = APIRouter(prefix="/api/evaluation", tags=["التقييم"])
 
+# حد الاستدعاءات المتزامنة للتقييم التلقائي بعد التقديم
+_auto_evaluation_slots = asyncio.Semaphore(int(os.getenv("AUTO_AI_EVALUATION_CONCURRENCY", "2")))
+# الترتيب داخل المجال الذي تُحسم عنده المراكز (نتيجة AI عنده تُعد حداً)
+AI_CUTOFF_RANK = int(os.getenv("AI_CUTOFF_RANK", "5"))
+# حدود ثابتة إضافية (من 25) مفصولة بفواصل
+AI_SCORE_CUTOFFS = [float(c) for c in os.getenv("AI_SCORE_CUTOFFS", "").split(",") if c.strip()]
+
 
 # ==================== تقييم الإداريين ====================
 
@@ -60,6 +79,7 @@ async def create_or_update_admin_evaluation(
         existing.detailed_scores = evaluation_data.detailed_scores
         db.commit()
         db.refresh(existing)
+        project_search_service.refresh_project(db, existing.project_id)
         return existing
 
     # إنشاء تقييم جديد
@@ -75,6 +95,7 @@ async def create_or_update_admin_evaluation(
     db.add(evaluation)
     db.commit()
     db.refresh(evaluation)
+    project_search_service.refresh_project(db, evaluation.project_id)
 
     return evaluation
 
@@ -102,6 +123,7 @@ async def update_admin_evaluation(
 
     db.commit()
     db.refresh(evaluation)
+    project_search_service.refresh_project(db, evaluation.project_id)
 
     return evaluation
 
@@ -141,9 +163,17 @@ async def toggle_project_featured(
 
 @router.get("/featured-projects")
 async def get_featured_projects(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """الحصول على قائمة المشاريع المميزة"""
+    not_modified = conditional_response(
+        request, response, "featured-projects", data_version(db, ProjectSubmission, Team)
+    )
+    if not_modified:
+        return not_modified
+
     projects = db.query(ProjectSubmission).filter(
         ProjectSubmission.is_featured == True
     ).all()
@@ -162,9 +192,175 @@ async def get_featured_projects(
 
 # ==================== تقييم AI ====================
 
+def log_ai_call(db: Session, project_id: int, result: dict) -> None:
+    """
+    تسجيل قياس استدعاء AI (يُحفظ مع الالتزام التالي)
+    - كل درجة مُصعَّدة من السلّم تُسجل بنتيجة escalated ثم تُسجل الدرجة المقبولة
+    """
+    attempts = [(t, "escalated") for t in result.get("escalated_attempts", [])]
+    attempts.append((result.get("telemetry") or {}, result.get("outcome", "real")))
+
+    for telemetry, outcome in attempts:
+        db.add(AICallLog(
+            project_id=project_id,
+            model=telemetry.get("model", "mock"),
+            tier=telemetry.get("tier"),
+            prompt_tokens=telemetry.get("prompt_tokens", 0),
+            completion_tokens=telemetry.get("completion_tokens", 0),
+            latency_ms=telemetry.get("latency_ms", 0),
+            retries=telemetry.get("retries", 0),
+            outcome=outcome
+        ))
+
+
+def ai_score_cutoffs(db: Session, field: str) -> List[float]:
+    """
+    حدود الترتيب في مجال المشروع لسلّم نماذج AI
+    - نتيجة AI للمشروع صاحب الترتيب AI_CUTOFF_RANK في المجال
+    - مع الحدود الثابتة من AI_SCORE_CUTOFFS
+    """
+    cutoffs = list(AI_SCORE_CUTOFFS)
+    rank_score = db.query(Evaluation.score).join(
+        ProjectSubmission, ProjectSubmission.id == Evaluation.project_id
+    ).filter(
+        Evaluation.is_ai_evaluation == True,
+        ProjectSubmission.field == field
+    ).order_by(Evaluation.score.desc()).offset(AI_CUTOFF_RANK - 1).limit(1).scalar()
+
+    if rank_score is not None:
+        cutoffs.append(rank_score)
+    return cutoffs
+
+
+def save_ai_evaluation(db: Session, project_id: int, result: dict) -> Evaluation:
+    """حفظ نتيجة تقييم AI (تحديث التقييم السابق إن وُجد) مع تسجيل القياس"""
+    log_ai_call(db, project_id, result)
+
+    evaluation = db.query(Evaluation).filter(
+        Evaluation.project_id == project_id,
+        Evaluation.is_ai_evaluation == True
+    ).first()
+
+    if evaluation:
+        evaluation.score = result["score"]
+        evaluation.notes = result["notes"]
+        evaluation.detailed_scores = result["detailed_scores"]
+    else:
+        evaluation = Evaluation(
+            project_id=project_id,
+            admin_id=None,
+            is_ai_evaluation=True,
+            score=result["score"],
+            notes=result["notes"],
+            detailed_scores=result["detailed_scores"]
+        )
+        db.add(evaluation)
+
+    db.commit()
+    db.refresh(evaluation)
+
+    return evaluation
+
+
+def reuse_duplicate_ai_result(db: Session, project_id: int) -> Optional[dict]:
+    """نتيجة تقييم AI لنسخة مطابقة أو شبه مطابقة من المشروع (إن وُجدت)"""
+    source = duplicate_detection_service.find_reusable_evaluation(db, project_id)
+    if not source:
+        return None
+
+    return {
+        "success": True,
+        "outcome": "cached",
+        "score": source.score,
+        "detailed_scores": source.detailed_scores,
+        "notes": source.notes,
+        "telemetry": {"model": "duplicate"}
+    }
+
+
+def prepare_auto_evaluation(db: Session, project_id: int) -> Optional[dict]:
+    """
+    خطوات قاعدة البيانات للتقييم التلقائي لمشروع مقدَّم حديثاً (متزامنة، في threadpool)
+    - النسخة الجديدة المطابقة لنسخة الفريق السابقة تأخذ تقييمها دون استدعاء جديد
+    - النسخ المطابقة أو شبه المطابقة لمشاريع مُقيّمة تعيد استخدام تقييمها
+    - يعيد معاملات استدعاء AI (قيم فقط لا كائنات جلسة)، أو None إذا حُفظ تقييم معاد استخدامه
+    """
+    project = db.query(ProjectSubmission).options(
+        undefer_group("content")
+    ).filter(
+        ProjectSubmission.id == project_id
+    ).first()
+    if not project:
+        return None
+
+    previous = db.query(ProjectSubmission).filter(
+        ProjectSubmission.team_id == project.team_id,
+        ProjectSubmission.program_version_id == project.program_version_id,
+        ProjectSubmission.submission_version < project.submission_version
+    ).order_by(ProjectSubmission.submission_version.desc()).first()
+
+    if previous:
+        hashes = dict(db.query(ProjectFingerprint.project_id, ProjectFingerprint.content_hash).filter(
+            ProjectFingerprint.project_id.in_([project.id, previous.id])
+        ).all())
+        previous_ai = db.query(Evaluation).filter(
+            Evaluation.project_id == previous.id,
+            Evaluation.is_ai_evaluation == True
+        ).first()
+        if previous_ai and hashes.get(project.id) and hashes.get(project.id) == hashes.get(previous.id):
+            save_ai_evaluation(db, project.id, {
+                "success": True,
+                "outcome": "cached",
+                "score": previous_ai.score,
+                "detailed_scores": previous_ai.detailed_scores,
+                "notes": previous_ai.notes,
+                "telemetry": {"model": "previous-version"}
+            })
+            return None
+
+    result = reuse_duplicate_ai_result(db, project.id)
+    if result:
+        save_ai_evaluation(db, project.id, result)
+        return None
+
+    return {
+        "title": project.title,
+        "problem_statement": project.problem_statement,
+        "technical_description": project.technical_description,
+        "scientific_reference": project.scientific_reference,
+        "field": project.field,
+        "cutoffs": ai_score_cutoffs(db, project.field)
+    }
+
+
+def _save_ai_result(project_id: int, result: dict) -> None:
+    """حفظ نتيجة AI في جلسة قصيرة مستقلة"""
+    session = SessionLocal()
+    try:
+        save_ai_evaluation(session, project_id, result)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+async def auto_evaluate_project(project_id: int, evaluation_request: dict) -> None:
+    """
+    استدعاء AI للتقييم التلقائي على حلقة الأحداث (بمعاملات prepare_auto_evaluation)
+    - انتظار الحد والاستدعاء لا يحجزان خيطاً من threadpool ولا اتصالاً بقاعدة البيانات
+    - عدد الاستدعاءات المتزامنة محدود بـ AUTO_AI_EVALUATION_CONCURRENCY
+    - الحفظ بعد الرد في جلسة قصيرة مستقلة عبر threadpool
+    """
+    async with _auto_evaluation_slots:
+        result = await ai_evaluation_service.evaluate_project(**evaluation_request)
+    await run_in_threadpool(_save_ai_result, project_id, result)
+
+
 @router.post("/ai", response_model=EvaluationResponse)
 async def create_ai_evaluation(
     request: AIEvaluationRequest,
+    reuse_duplicates: bool = True,
     current_admin: dict = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
@@ -172,39 +368,20 @@ async def create_ai_evaluation(
     طلب تقييم AI لمشروع
     - يستخدم DeepSeek API لتقييم المشروع
     - النقاط من 0 إلى 25
+    - reuse_duplicates: إعادة استخدام تقييم نسخة مطابقة أو شبه مطابقة دون استدعاء جديد
     """
     # التحقق من وجود المشروع
-    project = db.query(ProjectSubmission).filter(
+    project = db.query(ProjectSubmission).options(undefer_group("content")).filter(
         ProjectSubmission.id == request.project_id
     ).first()
     
     if not project:
         raise HTTPException(status_code=404, detail="المشروع غير موجود")
-    
-    # التحقق من عدم وجود تقييم AI سابق
-    existing = db.query(Evaluation).filter(
-        Evaluation.project_id == request.project_id,
-        Evaluation.is_ai_evaluation == True
-    ).first()
-    
-    if existing:
-        # تحديث التقييم الموجود
-        result = await ai_evaluation_service.evaluate_project(
-            title=project.title,
-            problem_statement=project.problem_statement,
-            technical_description=project.technical_description,
-            scientific_reference=project.scientific_reference,
-            field=project.field
-        )
-        
-        existing.score = result["score"]
-        existing.notes = result["notes"]
-        existing.detailed_scores = result["detailed_scores"]
-        
-        db.commit()
-        db.refresh(existing)
-        
-        return existing
+
+    if reuse_duplicates:
+        result = reuse_duplicate_ai_result(db, project.id)
+        if result:
+            return save_ai_evaluation(db, project.id, result)
     
     # تقييم المشروع
     result = await ai_evaluation_service.evaluate_project(
@@ -212,84 +389,306 @@ async def create_ai_evaluation(
         problem_statement=project.problem_statement,
         technical_description=project.technical_description,
         scientific_reference=project.scientific_reference,
-        field=project.field
+        field=project.field,
+        cutoffs=ai_score_cutoffs(db, project.field)
     )
     
-    # إنشاء تقييم AI
-    evaluation = Evaluation(
-        project_id=request.project_id,
-        admin_id=None,
-        is_ai_evaluation=True,
-        score=result["score"],
-        notes=result["notes"],
-        detailed_scores=result["detailed_scores"]
+    return save_ai_evaluation(db, request.project_id, result)
+
+
+def _sse_event(event: str, data) -> str:
+    """تنسيق حدث Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def _save_streamed_result(project_id: int, result: dict) -> str:
+    """حفظ نتيجة البث في جلسة مستقلة (جلسة الطلب تُغلق قبل انتهاء البث) وإعادة حدث saved أو error"""
+    session = SessionLocal()
+    try:
+        evaluation = save_ai_evaluation(session, project_id, result)
+        saved = EvaluationResponse.model_validate(evaluation).model_dump(mode="json")
+        return _sse_event("saved", saved)
+    except Exception as e:
+        session.rollback()
+        return _sse_event("error", {"detail": f"فشل حفظ التقييم: {str(e)}"})
+    finally:
+        session.close()
+
+
+@router.post("/ai/stream")
+async def stream_ai_evaluation(
+    request: AIEvaluationRequest,
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    طلب تقييم AI لمشروع مع بث النتيجة (Server-Sent Events)
+    - status: مرحلة التقييم (started, generating, parsing, mock)
+    - token: جزء من رد النموذج فور وصوله
+    - result: النتيجة بعد التحليل
+    - saved: التقييم المحفوظ في قاعدة البيانات
+    """
+    project = db.query(ProjectSubmission).options(undefer_group("content")).filter(
+        ProjectSubmission.id == request.project_id
+    ).first()
+
+    if not project:
+        raise HTTPException(status_code=404, detail="المشروع غير موجود")
+
+    project_data = {
+        "title": project.title,
+        "problem_statement": project.problem_statement,
+        "technical_description": project.technical_description,
+        "scientific_reference": project.scientific_reference,
+        "field": project.field
+    }
+
+    async def event_stream():
+        async for item in ai_evaluation_service.stream_evaluation(**project_data):
+            if item["event"] == "result":
+                # الحفظ قبل إرسال النتيجة: انقطاع العميل لا يُضيّع التقييم المدفوع
+                # (انتظار الـ threadpool لا يُلغى قبل انتهاء الخيط)
+                saved = await run_in_threadpool(_save_streamed_result, request.project_id, item["data"])
+                yield _sse_event("result", item["data"])
+                yield saved
+            else:
+                yield _sse_event(item["event"], item["data"])
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
     )
-    
-    db.add(evaluation)
-    db.commit()
-    db.refresh(evaluation)
-    
-    return evaluation
 
 
 @router.post("/ai/bulk")
 async def create_bulk_ai_evaluations(
+    reuse_duplicates: bool = True,
+    limit: Optional[int] = None,
     current_admin: dict = Depends(get_current_admin),
     db: Session = Depends(get_db)
 ):
-    """تقييم AI لجميع المشاريع غير المُقيّمة"""
+    """
+    تقييم AI لجميع المشاريع غير المُقيّمة
+    - reuse_duplicates: النسخ المطابقة أو شبه المطابقة تأخذ تقييم نسختها دون استدعاء جديد
+    - الترتيب حسب التقييم المبدئي: الأعلى تقييماً والأقل ثقة أولاً
+    - limit: تقييم أول N مشروع فقط من هذا الترتيب
+    """
     # جلب المشاريع التي ليس لها تقييم AI
-    projects_without_ai = db.query(ProjectSubmission).filter(
+    projects_without_ai = db.query(ProjectSubmission).options(undefer_group("content")).filter(
         ~ProjectSubmission.id.in_(
             db.query(Evaluation.project_id).filter(
                 Evaluation.is_ai_evaluation == True
             )
         )
     ).all()
+
+    projects_by_id = {p.id: p for p in projects_without_ai}
+    triage = prescorer_service.triage(db, projects_without_ai)
+    if limit is not None:
+        triage = triage[:limit]
     
     results = []
-    for project in projects_without_ai:
+    for prescore in triage:
+        project = projects_by_id[prescore["project_id"]]
         try:
-            result = await ai_evaluation_service.evaluate_project(
-                title=project.title,
-                problem_statement=project.problem_statement,
-                technical_description=project.technical_description,
-                scientific_reference=project.scientific_reference,
-                field=project.field
-            )
+            result = reuse_duplicate_ai_result(db, project.id) if reuse_duplicates else None
+            if not result:
+                result = await ai_evaluation_service.evaluate_project(
+                    title=project.title,
+                    problem_statement=project.problem_statement,
+                    technical_description=project.technical_description,
+                    scientific_reference=project.scientific_reference,
+                    field=project.field,
+                    cutoffs=ai_score_cutoffs(db, project.field)
+                )
             
-            evaluation = Evaluation(
-                project_id=project.id,
-                admin_id=None,
-                is_ai_evaluation=True,
-                score=result["score"],
-                notes=result["notes"],
-                detailed_scores=result["detailed_scores"]
-            )
-            
-            db.add(evaluation)
+            save_ai_evaluation(db, project.id, result)
             results.append({
                 "project_id": project.id,
                 "status": "success",
-                "score": result["score"]
+                "score": result["score"],
+                "outcome": result.get("outcome"),
+                "band": prescore["band"]
             })
         except Exception as e:
+            db.rollback()
             results.append({
                 "project_id": project.id,
                 "status": "error",
                 "message": str(e)
             })
     
-    db.commit()
-    
     return {
         "total": len(projects_without_ai),
+        "processed": len(triage),
         "evaluated": len([r for r in results if r["status"] == "success"]),
         "failed": len([r for r in results if r["status"] == "error"]),
         "results": results
     }
 
 
+# ==================== التقييم المبدئي ====================
+
+@router.get("/prescore")
+async def get_prescores(
+    field: Optional[str] = None,
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    التقييم المبدئي الفوري لكل المشاريع (من 75) مع الثقة
+    - مرتبة حسب أولوية التقييم: top ثم uncertain ثم routine
+    - النموذج يُعاد تدريبه تلقائياً عند تغير تقييمات المحكمين
+    """
+    query = db.query(ProjectSubmission).options(undefer_group("content"))
+    if field:
+        query = query.filter(ProjectSubmission.field == field)
+    projects = query.all()
+    projects_by_id = {p.id: p for p in projects}
+
+    ranked = prescorer_service.triage(db, projects)
+    for item in ranked:
+        project = projects_by_id[item["project_id"]]
+        item["title"] = project.title
+        item["field"] = project.field
+
+    return {
+        "model": prescorer_service.model_info(),
+        "projects": ranked
+    }
+
+
+@router.post("/prescore/train")
+async def train_prescorer(
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """إعادة تدريب نموذج التقييم المبدئي على تقييمات المحكمين الحالية"""
+    return prescorer_service.train(db)
+
+
+@router.get("/ai/parse-stats")
+async def get_ai_parse_stats(
+    current_admin: dict = Depends(get_current_admin)
+):
+    """
+    عدادات تحليل ردود AI منذ تشغيل الخادم (كل تقييم في خانة واحدة فقط)
+    - valid: رد صحيح مطابق للمخطط مباشرة
+    - repaired: رد أُصلح محلياً دون طلب جديد
+    - reasked: ردود نجحت بعد طلب تصحيح من النموذج
+    - failed: ردود فشل تحليلها (ولو بعد طلب التصحيح) واستُبدلت بالتقييم التجريبي
+    """
+    return ai_evaluation_service.parse_stats
+
+
+@router.get("/ai/metrics")
+async def get_ai_metrics(
+    days: int = 7,
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    مقاييس استدعاءات AI لكل يوم
+    - زمن الاستجابة p50/p95 (للاستدعاءات الفعلية فقط: real و failed و escalated)
+    - عدد الاستدعاءات حسب النتيجة والإنتاجية بالساعة (على الساعات المرصودة فعلاً من اليوم)
+    - التوكنات والتكلفة التقديرية بالدولار
+    - نسبة القبول لكل درجة من سلّم النماذج (hit_rate) مقابل التصعيد
+    """
+    now = datetime.now(timezone.utc)
+    since = now - timedelta(days=days)
+    day = func.date_trunc("day", AICallLog.created_at).label("day")
+    # القيم NULL تُهمل في percentile_cont فتبقى الاستدعاءات الفعلية فقط
+    api_latency = case((AICallLog.outcome.in_(["real", "failed", "escalated"]), AICallLog.latency_ms))
+
+    daily = db.query(
+        day,
+        func.count(AICallLog.id),
+        func.count(AICallLog.id).filter(AICallLog.outcome == "real"),
+        func.count(AICallLog.id).filter(AICallLog.outcome == "cached"),
+        func.count(AICallLog.id).filter(AICallLog.outcome == "mocked"),
+        func.count(AICallLog.id).filter(AICallLog.outcome == "failed"),
+        func.count(AICallLog.id).filter(AICallLog.outcome == "escalated"),
+        func.sum(AICallLog.retries),
+        func.percentile_cont(0.5).within_group(api_latency),
+        func.percentile_cont(0.95).within_group(api_latency),
+        func.min(AICallLog.created_at)
+    ).filter(
+        AICallLog.created_at >= since
+    ).group_by(day).order_by(day).all()
+
+    # التكلفة تختلف حسب النموذج، لذا نجمع التوكنات لكل يوم ونموذج
+    usage = db.query(
+        day,
+        AICallLog.model,
+        func.sum(AICallLog.prompt_tokens),
+        func.sum(AICallLog.completion_tokens)
+    ).filter(
+        AICallLog.created_at >= since
+    ).group_by(day, AICallLog.model).all()
+
+    tokens_by_day = {}
+    for usage_day, model, prompt_tokens, completion_tokens in usage:
+        entry = tokens_by_day.setdefault(usage_day, {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})
+        entry["prompt_tokens"] += prompt_tokens or 0
+        entry["completion_tokens"] += completion_tokens or 0
+        entry["cost_usd"] += ai_evaluation_service.estimate_cost(model, prompt_tokens or 0, completion_tokens or 0)
+
+    # بداية الرصد: أول استدعاء في النافذة (لا تُحسب الساعات قبل بدء التشغيل أو خارج النافذة)
+    observed_from = min((row[-1] for row in daily), default=since)
+
+    result = []
+    for row_day, calls, real, cached, mocked, failed, escalated, retries, p50, p95, _ in daily:
+        tokens = tokens_by_day.get(row_day, {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0})
+        # الساعات المرصودة من اليوم (اليوم الجاري حتى الآن فقط)، ساعة على الأقل
+        observed = min(row_day + timedelta(days=1), now) - max(row_day, observed_from)
+        hours = max(observed.total_seconds() / 3600, 1.0)
+        result.append({
+            "day": row_day.date().isoformat(),
+            "calls": calls,
+            "outcomes": {"real": real, "cached": cached, "mocked": mocked, "failed": failed, "escalated": escalated},
+            "retries": retries or 0,
+            "latency_p50_ms": round(p50) if p50 is not None else None,
+            "latency_p95_ms": round(p95) if p95 is not None else None,
+            "throughput_per_hour": round(calls / hours, 2),
+            "prompt_tokens": tokens["prompt_tokens"],
+            "completion_tokens": tokens["completion_tokens"],
+            "cost_usd": round(tokens["cost_usd"], 4)
+        })
+
+    tier_rows = db.query(
+        AICallLog.tier,
+        func.count(AICallLog.id),
+        func.count(AICallLog.id).filter(AICallLog.outcome == "escalated"),
+        func.avg(AICallLog.latency_ms)
+    ).filter(
+        AICallLog.created_at >= since,
+        AICallLog.tier.isnot(None)
+    ).group_by(AICallLog.tier).all()
+
+    tiers = []
+    for tier, attempts, escalated, avg_latency in tier_rows:
+        tiers.append({
+            "tier": tier,
+            "attempts": attempts,
+            "accepted": attempts - escalated,
+            "escalated": escalated,
+            "hit_rate": round((attempts - escalated) / attempts, 3) if attempts else None,
+            "avg_latency_ms": round(avg_latency) if avg_latency is not None else None
+        })
+
+    return {
+        "days": days,
+        "total_calls": sum(d["calls"] for d in result),
+        "total_cost_usd": round(sum(d["cost_usd"] for d in result), 4),
+        "daily": result,
+        "tiers": tiers
+    }
+
+
 # ==================== الحصول على التقييمات ====================
 
 @router.get("/project/{project_id}", response_model=List[EvaluationResponse])
@@ -432,6 +831,8 @@ async def get_project_final_score(
 
 @router.get("/top-teams", response_model=List[TopTeamResponse])
 async def get_top_teams(
+    request: Request,
+    response: Response,
     limit: int = 5,
     db: Session = Depends(get_db)
 ):
@@ -440,77 +841,63 @@ async def get_top_teams(
     - يعرض فقط الفرق المميزة من قبل الإداريين
     - مرتبة بناءً على التقييم النهائي
     """
-    # جلب المشاريع المميزة فقط
-    projects = db.query(ProjectSubmission).filter(
-        ProjectSubmission.is_featured == True
-    ).all()
-    
-    scored_projects = []
-    
-    for project in projects:
-        evaluations = db.query(Evaluation).filter(
-            Evaluation.project_id == project.id
-        ).all()
-        
-        # تقييم AI
-        ai_eval = next((e for e in evaluations if e.is_ai_evaluation), None)
-        ai_score = ai_eval.score if ai_eval else 0
-        
-        # تقييمات الإداريين
-        admin_evals = [e for e in evaluations if not e.is_ai_evaluation]
-        
-        if admin_evals:
-            admin_scores_weighted = []
-            for evaluation in admin_evals:
-                admin = db.query(Admin).filter(Admin.id == evaluation.admin_id).first()
-                weight = admin.evaluation_weight if admin else 100
-                admin_scores_weighted.append({
-                    "score": evaluation.score,
-                    "weight": weight
-                })
-
-            total_weight = sum(a["weight"] for a in admin_scores_weighted)
-            # المتوسط المرجح لتقييمات الإداريين (من 75)
-            weighted_admin_score = sum(
-                a["score"] * a["weight"] for a in admin_scores_weighted
-            ) / total_weight if total_weight > 0 else 0
-        else:
-            weighted_admin_score = 0
-
-        # النتيجة النهائية: تقييم الإداريين (من 75) + تقييم AI (من 25) = من 100
-        final_score = weighted_admin_score + ai_score
-        
-        scored_projects.append({
-            "project": project,
-            "admin_score": weighted_admin_score,
-            "ai_score": ai_score,
-            "final_score": final_score
-        })
-    
-    # ترتيب حسب النتيجة النهائية
-    scored_projects.sort(key=lambda x: x["final_score"], reverse=True)
-    
-    # أخذ أفضل N
-    top_projects = scored_projects[:limit]
-    
-    result = []
-    for rank, item in enumerate(top_projects, 1):
-        project = item["project"]
-        team = project.team
-        
-        result.append(TopTeamResponse(
-            rank=rank,
-            project_title=project.title,
-            project_description=project.problem_statement[:200] + "..." if len(project.problem_statement) > 200 else project.problem_statement,
-            field=project.field,
-            team_name=team.team_name,
-            team_members=[m.full_name for m in team.members],
-            total_score=round(item["final_score"], 2),
-            admin_score=round(item["admin_score"], 2),
-            ai_score=item["ai_score"]
-        ))
-    
-    return result
+    version = data_version(db, ProjectSubmission, Team, TeamMember, Evaluation, Admin)
+    not_modified = conditional_response(request, response, f"top-teams:{limit}", version)
+    if not_modified:
+        return not_modified
+
+    # الطلبات المتزامنة لنفس النسخة من البيانات تشترك في حساب واحد
+    # (إعادة اتصال الطلب للمجمّع قبل الانتظار حتى لا يستنفد المنتظرون الاتصالات)
+    db.close()
+    return await single_flight.do(etag_for(f"top-teams:{limit}", version), compute_top_teams, limit)
+
+
+def compute_top_teams(limit: int) -> List[TopTeamResponse]:
+    """
+    حساب أفضل الفرق (يعمل في threadpool بجلسته الخاصة)
+    - النتائج محسوبة في SQL، وتُحمّل فقط أفضل N مشاريع مع فرقها وأعضائها
+    """
+    db = SessionLocal()
+    try:
+        scores = project_scores_subquery(db)
+        total_score = func.coalesce(scores.c.total_score, 0)
+
+        # المشاريع المميزة فقط مرتبة حسب النتيجة النهائية
+        rows = db.query(
+            ProjectSubmission,
+            func.coalesce(scores.c.admin_score, 0),
+            func.coalesce(scores.c.ai_score, 0),
+            total_score
+        ).outerjoin(
+            scores, scores.c.project_id == ProjectSubmission.id
+        ).options(
+            undefer(ProjectSubmission.problem_statement),
+            selectinload(ProjectSubmission.team).selectinload(Team.members)
+        ).filter(
+            ProjectSubmission.is_featured == True
+        ).order_by(
+            total_score.desc(), ProjectSubmission.id
+        ).limit(limit).all()
+
+        result = []
+        for rank, (project, admin_score, ai_score, final_score) in enumerate(rows, 1):
+            team = project.team
+
+            result.append(TopTeamResponse(
+                rank=rank,
+                project_title=project.title,
+                project_description=project.problem_statement[:200] + "..." if len(project.problem_statement) > 200 else project.problem_statement,
+                field=project.field,
+                team_name=team.team_name,
+                team_members=[m.full_name for m in team.members],
+                total_score=round(final_score, 2),
+                admin_score=round(admin_score, 2),
+                ai_score=ai_score
+            ))
+
+        return result
+    finally:
+        db.close()
 
 
 # ==================== إحصائيات التقييم ====================
@@ -3,21 +3,38 @@
 """
 import os
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status, UploadFile, File, Form
 from fastapi.responses import FileResponse, Response
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
-from database import get_db
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload, selectinload, undefer, undefer_group
+from sqlalchemy import func, case, and_, true, tuple_, literal_column
+from typing import List, Optional, Union
+from database import get_db, SessionLocal
 from models import ProjectSubmission, Team, TeamMember, ProgramVersion, Evaluation, Admin
 from schemas import (
-    ProjectSubmissionCreate, ProjectSubmissionResponse,
-    ProjectWithTeamResponse, ProjectFieldEnum
+    ProjectSubmissionCreate, ProjectSubmissionResponse, ProjectListItem,
+    ProjectWithTeamResponse, ProjectFieldEnum, GenderEnum,
+    EvaluationStatusEnum, ProjectFacetItem, FacetedProjectsResponse,
+    ProjectEvaluationItem
 )
 from services.pdf_generator import pdf_service
+from services.duplicate_detection import duplicate_detection_service
+from services.project_search import project_search_service
+from services.related_projects import related_projects_service
+from services.team_search import team_search_service
+from services.scoring import project_scores_subquery
+from services.pagination import paginate
+from services.serialization import orm_json_response, Fieldset
+from services.http_cache import conditional_response, data_version
+from services.auth_service import get_current_admin, get_optional_admin
+from services.ai_evaluation import ai_evaluation_service
+from routers.evaluation import auto_evaluate_project, prepare_auto_evaluation
 
 router = APIRouter(prefix="/api/projects", tags=["المشاريع"])
 
+# تقييم AI تلقائي للمشاريع فور تقديمها
+AUTO_AI_EVALUATION = os.getenv("AUTO_AI_EVALUATION", "true").lower() == "true"
+
 # مجلد رفع الملفات
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
@@ -34,9 +51,58 @@ def get_active_program_version(db: Session):
     return version
 
 
+def _prepare_new_submission(project_id: int) -> Optional[dict]:
+    """
+    خطوات المعالجة المتزامنة (في threadpool): البصمة والمصفوفة وتحضير التقييم التلقائي
+    - الجلسة تُغلق قبل استدعاء AI فلا يبقى اتصال محجوزاً أثناء انتظاره
+    - يعيد معاملات استدعاء AI إن لزم الاستدعاء
+    """
+    db = SessionLocal()
+    try:
+        project = db.query(ProjectSubmission).options(
+            undefer_group("content")
+        ).filter(
+            ProjectSubmission.id == project_id
+        ).first()
+        if not project:
+            return None
+
+        duplicate_detection_service.index_project(db, project)
+        related_projects_service.add_project(project)
+
+        # بدون مفتاح API ستكون النتيجة تجريبية، فلا نضيفها للترتيب تلقائياً
+        if AUTO_AI_EVALUATION and ai_evaluation_service.api_key:
+            return prepare_auto_evaluation(db, project_id)
+    except Exception as e:
+        db.rollback()
+        print(f"❌ خطأ في معالجة المشروع {project_id}: {e}")
+    finally:
+        db.close()
+    return None
+
+
+async def process_new_submission(project_id: int):
+    """
+    معالجة المشروع المقدَّم في الخلفية
+    - حساب بصمة MinHash لكشف النسخ المكررة
+    - إضافة المشروع لمصفوفة المشاريع المشابهة
+    - تقييم AI تلقائي (إلا إذا كان AUTO_AI_EVALUATION=false أو لا يوجد مفتاح API)
+    - الحساب والاستعلامات في threadpool، وانتظار AI على حلقة الأحداث دون حجز خيط أو اتصال
+    """
+    evaluation_request = await run_in_threadpool(_prepare_new_submission, project_id)
+    if evaluation_request is None:
+        return
+
+    try:
+        await auto_evaluate_project(project_id, evaluation_request)
+    except Exception as e:
+        print(f"❌ خطأ في التقييم التلقائي للمشروع {project_id}: {e}")
+
+
 @router.post("/submit", response_model=ProjectSubmissionResponse, status_code=status.HTTP_201_CREATED)
 async def submit_project(
     project_data: ProjectSubmissionCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -96,12 +162,17 @@ async def submit_project(
     db.add(submission)
     db.commit()
     db.refresh(submission)
+    project_search_service.refresh_project(db, submission.id)
+
+    # البصمة والتقييم التلقائي بعد إرسال الاستجابة
+    background_tasks.add_task(process_new_submission, submission.id)
     
     return submission
 
 
 @router.post("/submit-with-files", response_model=ProjectSubmissionResponse)
 async def submit_project_with_files(
+    background_tasks: BackgroundTasks,
     member_email: str = Form(...),
     title: str = Form(...),
     problem_statement: str = Form(...),
@@ -205,6 +276,10 @@ async def submit_project_with_files(
     db.add(submission)
     db.commit()
     db.refresh(submission)
+    project_search_service.refresh_project(db, submission.id)
+
+    # البصمة والتقييم التلقائي بعد إرسال الاستجابة
+    background_tasks.add_task(process_new_submission, submission.id)
     
     return submission
 
@@ -236,8 +311,8 @@ async def upload_attachments(
     - المخطط (اختياري)
     - التصميم المبدئي (اختياري)
     """
-    # التحقق من وجود المشروع
-    project = db.query(ProjectSubmission).filter(
+    # التحقق من وجود المشروع (مع المحتوى لأنه يُعاد في الاستجابة)
+    project = db.query(ProjectSubmission).options(undefer_group("content")).filter(
         ProjectSubmission.id == project_id
     ).first()
 
@@ -280,82 +355,341 @@ async def upload_attachments(
     if has_attachments:
         project.has_attachments = True
         db.commit()
-        db.refresh(project)
+        # إعادة التحميل مع المحتوى باستعلام واحد (refresh لا يحمّل الأعمدة المؤجلة)
+        project = db.query(ProjectSubmission).options(undefer_group("content")).filter(
+            ProjectSubmission.id == project_id
+        ).one()
 
     return project
 
 
-@router.get("/", response_model=List[ProjectSubmissionResponse])
+# الحقول المتاحة في ?fields= (أعمدة المشروع واسم الفريق)
+PROJECT_FIELDSET = Fieldset(ProjectSubmission, ProjectSubmissionResponse, extra={
+    "team_name": (str, lambda p: p.team.team_name, joinedload(ProjectSubmission.team).load_only(Team.team_name))
+})
+
+
+@router.get("/", response_model=Union[List[ProjectSubmissionResponse], List[ProjectListItem]])
 async def get_all_projects(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     field: Optional[str] = None,
+    cursor: Optional[str] = None,
+    compact: bool = False,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """الحصول على جميع المشاريع"""
+    """
+    الحصول على جميع المشاريع (الأحدث أولاً)
+    - cursor: مؤشر الصفحة التالية من ترويسة X-Next-Cursor (skip للتوافق فقط)
+    - compact: بدون المشكلة والوصف التقني والمرجع (لا تُقرأ من قاعدة البيانات أصلاً)
+    - fields: الحقول المطلوبة فقط مفصولة بفواصل (مثل id,title,field,team_name)، تُغني عن compact
+    """
+    names = PROJECT_FIELDSET.parse(fields)
     query = db.query(ProjectSubmission)
+    if names:
+        query = query.options(*PROJECT_FIELDSET.options(names))
+    elif not compact:
+        query = query.options(undefer_group("content"))
     
     if field:
         query = query.filter(ProjectSubmission.field == field)
     
-    projects = query.order_by(
-        ProjectSubmission.created_at.desc()
+    projects = paginate(db, query, ProjectSubmission, response, cursor=cursor, skip=skip, limit=limit)
+    if names:
+        return PROJECT_FIELDSET.response(names, projects, response)
+    return orm_json_response(ProjectListItem if compact else ProjectSubmissionResponse, projects, response)
+
+
+# عرض فئة النتيجة (من 100) في تصنيف score_range
+SCORE_RANGE_WIDTH = 25
+
+
+def _project_facts(db: Session):
+    """
+    استعلام فرعي بكل أبعاد التصنيف لكل مشروع
+    - النتيجة وحالة التقييم من project_scores_subquery
+    """
+    scores = project_scores_subquery(db)
+
+    evaluation_status = case(
+        (scores.c.project_id.is_(None), EvaluationStatusEnum.NOT_EVALUATED.value),
+        (and_(scores.c.has_ai, scores.c.admin_count > 0), EvaluationStatusEnum.COMPLETE.value),
+        (scores.c.has_ai, EvaluationStatusEnum.AI_ONLY.value),
+        else_=EvaluationStatusEnum.JUDGES_ONLY.value
+    )
+    # النتيجة 100 تقع في الفئة الأخيرة، وLEAST تتجاهل NULL فنستثني غير المُقيّم صراحة
+    score_bucket = case((
+        scores.c.total_score.isnot(None),
+        func.least(func.floor(scores.c.total_score / SCORE_RANGE_WIDTH), 100 // SCORE_RANGE_WIDTH - 1)
+    ))
+
+    return db.query(
+        ProjectSubmission.id.label("id"),
+        ProjectSubmission.field.label("field"),
+        func.coalesce(ProjectSubmission.has_attachments, False).label("has_attachments"),
+        func.coalesce(ProjectSubmission.is_featured, False).label("is_featured"),
+        ProjectSubmission.program_version_id.label("program_version_id"),
+        Team.team_name.label("team_name"),
+        Team.gender.label("gender"),
+        evaluation_status.label("evaluation_status"),
+        scores.c.admin_score.label("admin_score"),
+        scores.c.ai_score.label("ai_score"),
+        scores.c.total_score.label("total_score"),
+        score_bucket.label("score_range")
+    ).join(
+        Team, Team.id == ProjectSubmission.team_id
+    ).outerjoin(
+        scores, scores.c.project_id == ProjectSubmission.id
+    ).subquery()
+
+
+def _facet_value(dimension: str, value) -> Optional[str]:
+    """تمثيل قيمة التصنيف كنص"""
+    if value is None:
+        return "unscored" if dimension == "score_range" else None
+    if dimension == "score_range":
+        start = int(value) * SCORE_RANGE_WIDTH
+        return f"{start}-{start + SCORE_RANGE_WIDTH}"
+    if hasattr(value, "value"):
+        return value.value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+@router.get("/faceted", response_model=FacetedProjectsResponse)
+async def get_faceted_projects(
+    field: Optional[List[str]] = Query(None),
+    has_attachments: Optional[bool] = None,
+    is_featured: Optional[bool] = None,
+    program_version_id: Optional[int] = None,
+    gender: Optional[GenderEnum] = None,
+    evaluation_status: Optional[List[EvaluationStatusEnum]] = Query(None),
+    score_min: Optional[float] = Query(None, ge=0, le=100),
+    score_max: Optional[float] = Query(None, ge=0, le=100),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    قائمة المشاريع مع فلاتر متعددة وأعداد كل تصنيف
+    - field و evaluation_status تقبل أكثر من قيمة
+    - score_min / score_max على النتيجة النهائية من 100
+    - عدد كل تصنيف يطبق كل الفلاتر ما عدا فلتره هو (حتى تبقى الخيارات الأخرى ظاهرة)
+    - كل الأعداد من استعلام واحد: GROUPING SETS مع count(*) FILTER لكل بُعد
+    """
+    facts = _project_facts(db)
+
+    score_conditions = []
+    if score_min is not None:
+        score_conditions.append(facts.c.total_score >= score_min)
+    if score_max is not None:
+        score_conditions.append(facts.c.total_score <= score_max)
+
+    conditions = {
+        "field": facts.c.field.in_(field) if field else None,
+        "has_attachments": facts.c.has_attachments == has_attachments if has_attachments is not None else None,
+        "is_featured": facts.c.is_featured == is_featured if is_featured is not None else None,
+        "program_version_id": facts.c.program_version_id == program_version_id if program_version_id is not None else None,
+        "gender": facts.c.gender == gender.value if gender else None,
+        "evaluation_status": facts.c.evaluation_status.in_([s.value for s in evaluation_status]) if evaluation_status else None,
+        "score_range": and_(*score_conditions) if score_conditions else None,
+    }
+    active = [c for c in conditions.values() if c is not None]
+
+    def without(dimension):
+        others = [c for d, c in conditions.items() if d != dimension and c is not None]
+        return and_(*others) if others else true()
+
+    dimensions = list(conditions)
+    columns = [facts.c[d] for d in dimensions]
+
+    facet_rows = db.query(
+        *columns,
+        *[func.grouping(c) for c in columns],
+        *[func.count().filter(without(d)) for d in dimensions],
+        func.count().filter(and_(*active) if active else true())
+    ).select_from(facts).group_by(
+        func.grouping_sets(*[tuple_(c) for c in columns], literal_column("()"))
+    ).all()
+
+    n = len(dimensions)
+    total = 0
+    facets = {d: [] for d in dimensions}
+    for row in facet_rows:
+        values, grouping, counts = row[:n], row[n:2 * n], row[2 * n:3 * n]
+        if all(grouping):
+            # مجموعة () الكلية: عدد المشاريع بعد كل الفلاتر
+            total = row[3 * n]
+            continue
+        index = grouping.index(0)
+        dimension = dimensions[index]
+        if counts[index]:
+            facets[dimension].append({
+                "value": _facet_value(dimension, values[index]),
+                "count": counts[index]
+            })
+
+    for values in facets.values():
+        values.sort(key=lambda f: -f["count"])
+
+    rows = db.query(
+        ProjectSubmission,
+        facts.c.team_name,
+        facts.c.gender,
+        facts.c.evaluation_status,
+        facts.c.admin_score,
+        facts.c.ai_score,
+        facts.c.total_score
+    ).join(
+        facts, facts.c.id == ProjectSubmission.id
+    ).filter(*active).order_by(
+        ProjectSubmission.created_at.desc(), ProjectSubmission.id.desc()
     ).offset(skip).limit(limit).all()
-    
-    return projects
+
+    items = [
+        ProjectFacetItem(
+            **ProjectListItem.model_validate(project).model_dump(),
+            team_name=team_name,
+            team_gender=team_gender.value,
+            evaluation_status=status_value,
+            admin_score=round(admin_score, 2) if admin_score is not None else None,
+            ai_score=ai_score,
+            total_score=round(total_score, 2) if total_score is not None else None
+        )
+        for project, team_name, team_gender, status_value, admin_score, ai_score, total_score in rows
+    ]
+
+    return {
+        "total": total,
+        "skip": skip,
+        "limit": limit,
+        "items": items,
+        "facets": facets
+    }
 
 
 @router.get("/team/{team_id}", response_model=List[ProjectSubmissionResponse])
 async def get_team_projects(team_id: int, db: Session = Depends(get_db)):
     """الحصول على مشاريع فريق معين (جميع النسخ)"""
-    projects = db.query(ProjectSubmission).filter(
+    projects = db.query(ProjectSubmission).options(undefer_group("content")).filter(
         ProjectSubmission.team_id == team_id
     ).order_by(ProjectSubmission.submission_version.desc()).all()
     
     return projects
 
 
+@router.get("/search")
+def search_projects(
+    q: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    field: Optional[str] = None,
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    البحث النصي في المشاريع (العنوان، المشكلة، الوصف التقني، ملاحظات المحكمين)
+    - توحيد النص العربي (الألف، التاء المربوطة، التشكيل، التطويل)
+    - النتائج مرتبة حسب الصلة مع مقتطفات مظللة بـ <mark>
+    - دالة متزامنة (threadpool): البحث قد يحمّل الفهرس الداخلي فلا يحجز حلقة الأحداث
+    """
+    return project_search_service.search(db, q, page=page, page_size=page_size, field=field)
+
+
+# الأجزاء الاختيارية في تفاصيل المشروع (?include=)
+PROJECT_INCLUDES = ("evaluations", "attachments")
+
+
 @router.get("/{project_id}", response_model=ProjectWithTeamResponse)
-async def get_project(project_id: int, db: Session = Depends(get_db)):
-    """الحصول على مشروع بالمعرف مع بيانات الفريق والتقييم"""
-    project = db.query(ProjectSubmission).filter(
+async def get_project(
+    project_id: int,
+    include: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_admin: Optional[dict] = Depends(get_optional_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    الحصول على مشروع بالمعرف مع بيانات الفريق والتقييم
+    - المشروع والفريق والنتيجة في استعلام واحد، والأعضاء في استعلام ثانٍ
+    - include: أجزاء إضافية مفصولة بفواصل (evaluations للإداريين فقط، attachments)
+    - fields: أعمدة المشروع المطلوبة فقط (بدون الفريق والنتيجة، ولا تُستخدم مع include)
+    """
+    names = PROJECT_FIELDSET.parse(fields)
+    if names:
+        if include:
+            raise HTTPException(status_code=400, detail="لا يمكن استخدام fields مع include")
+        project = db.query(ProjectSubmission).options(
+            *PROJECT_FIELDSET.options(names)
+        ).filter(ProjectSubmission.id == project_id).first()
+        if not project:
+            raise HTTPException(status_code=404, detail="المشروع غير موجود")
+        return PROJECT_FIELDSET.response_one(names, project)
+
+    includes = {part.strip() for part in include.split(",") if part.strip()} if include else set()
+    if includes - set(PROJECT_INCLUDES):
+        raise HTTPException(
+            status_code=400,
+            detail=f"قيم include غير معروفة. المتاح: {', '.join(PROJECT_INCLUDES)}"
+        )
+    if "evaluations" in includes and current_admin is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="تقييمات المشروع متاحة للإداريين فقط",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+    scores = project_scores_subquery(db)
+    row = db.query(
+        ProjectSubmission,
+        scores.c.admin_score,
+        scores.c.ai_score,
+        scores.c.total_score
+    ).outerjoin(
+        scores, scores.c.project_id == ProjectSubmission.id
+    ).options(
+        undefer_group("content"),
+        joinedload(ProjectSubmission.team).options(
+            undefer(Team.initial_idea),
+            selectinload(Team.members)
+        )
+    ).filter(
         ProjectSubmission.id == project_id
     ).first()
-    
-    if not project:
-        raise HTTPException(status_code=404, detail="المشروع غير موجود")
-    
-    # حساب التقييمات
-    evaluations = db.query(Evaluation).filter(
-        Evaluation.project_id == project_id
-    ).all()
 
-    # تقييم AI (من 25)
-    ai_evaluation = next((e for e in evaluations if e.is_ai_evaluation), None)
-    ai_score = ai_evaluation.score if ai_evaluation else 0
-
-    # تقييمات الإداريين (من 75) - حساب المتوسط المرجح
-    admin_evaluations = [e for e in evaluations if not e.is_ai_evaluation]
-    if admin_evaluations:
-        admin_scores_weighted = []
-        for evaluation in admin_evaluations:
-            admin = db.query(Admin).filter(Admin.id == evaluation.admin_id).first()
-            weight = admin.evaluation_weight if admin else 100
-            admin_scores_weighted.append({
-                "score": evaluation.score,
-                "weight": weight
-            })
+    if not row:
+        raise HTTPException(status_code=404, detail="المشروع غير موجود")
 
-        total_weight = sum(a["weight"] for a in admin_scores_weighted)
-        admin_score = sum(
-            a["score"] * a["weight"] for a in admin_scores_weighted
-        ) / total_weight if total_weight > 0 else 0
-    else:
-        admin_score = 0
+    # النتيجة النهائية: تقييم الإداريين (من 75) + تقييم AI (من 25) = من 100، وNone بدون تقييمات
+    project, admin_score, ai_score, total_score = row
+
+    evaluations = None
+    if "evaluations" in includes:
+        evaluations = [
+            ProjectEvaluationItem(
+                id=evaluation.id,
+                project_id=evaluation.project_id,
+                admin_id=evaluation.admin_id,
+                is_ai_evaluation=evaluation.is_ai_evaluation,
+                score=evaluation.score,
+                notes=evaluation.notes,
+                detailed_scores=evaluation.detailed_scores,
+                created_at=evaluation.created_at,
+                admin_name=admin_name,
+                admin_weight=admin_weight
+            )
+            for evaluation, admin_name, admin_weight in db.query(
+                Evaluation, Admin.full_name, Admin.evaluation_weight
+            ).outerjoin(
+                Admin, Admin.id == Evaluation.admin_id
+            ).filter(
+                Evaluation.project_id == project_id
+            ).order_by(Evaluation.created_at, Evaluation.id).all()
+        ]
 
-    # النتيجة النهائية: تقييم الإداريين (من 75) + تقييم AI (من 25) = من 100
-    total_score = (admin_score + ai_score) if evaluations else None
-    
     response = ProjectWithTeamResponse(
         id=project.id,
         team_id=project.team_id,
@@ -376,8 +710,10 @@ async def get_project(project_id: int, db: Session = Depends(get_db)):
         updated_at=project.updated_at,
         team=project.team,
         total_score=total_score,
-        admin_score=admin_score,
-        ai_score=ai_score
+        admin_score=admin_score or 0,
+        ai_score=ai_score or 0,
+        evaluations=evaluations,
+        attachments=project_attachments(project) if "attachments" in includes else None
     )
     
     return response
@@ -385,23 +721,28 @@ async def get_project(project_id: int, db: Session = Depends(get_db)):
 
 @router.get("/search/{team_name}")
 async def search_by_team_name(team_name: str, db: Session = Depends(get_db)):
-    """البحث عن مشاريع باسم الفريق"""
-    teams = db.query(Team).filter(
-        Team.team_name.ilike(f"%{team_name}%")
-    ).all()
-    
-    team_ids = [t.id for t in teams]
-    
-    projects = db.query(ProjectSubmission).filter(
-        ProjectSubmission.team_id.in_(team_ids)
+    """
+    البحث عن مشاريع باسم الفريق
+    - مطابقة تقريبية على الاسم الموحد للفريق (فهرس trigram) في استعلام واحد
+    """
+    projects = db.query(ProjectSubmission).options(undefer_group("content")).filter(
+        ProjectSubmission.team_id.in_(
+            team_search_service.matching_team_ids(db, team_name)
+        )
     ).all()
     
     return projects
 
 
 @router.get("/stats/summary")
-async def get_projects_stats(db: Session = Depends(get_db)):
+async def get_projects_stats(request: Request, response: Response, db: Session = Depends(get_db)):
     """إحصائيات المشاريع"""
+    not_modified = conditional_response(
+        request, response, "projects-stats", data_version(db, ProjectSubmission, ProgramVersion)
+    )
+    if not_modified:
+        return not_modified
+
     version = get_active_program_version(db)
 
     total = db.query(ProjectSubmission).filter(
@@ -431,12 +772,31 @@ async def get_projects_stats(db: Session = Depends(get_db)):
     }
 
 
+@router.get("/{project_id}/related")
+async def get_related_projects(
+    project_id: int,
+    limit: int = Query(5, ge=1, le=20),
+    same_field: bool = True,
+    current_admin: dict = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    المشاريع الأقرب نصياً لمشروع معين (تشابه TF-IDF) لمقارنتها أثناء التحكيم
+    - same_field: من المجال نفسه فقط (الافتراضي)
+    - مشاريع الفريق نفسه مستبعدة
+    """
+    related = related_projects_service.related_projects(db, project_id, limit=limit, same_field=same_field)
+    if related is None:
+        raise HTTPException(status_code=404, detail="المشروع غير موجود")
+    return related
+
+
 # ==================== تصدير PDF ====================
 
 @router.get("/{project_id}/pdf")
 async def export_project_pdf(project_id: int, db: Session = Depends(get_db)):
     """تصدير مشروع كـ PDF"""
-    project = db.query(ProjectSubmission).filter(
+    project = db.query(ProjectSubmission).options(undefer_group("content")).filter(
         ProjectSubmission.id == project_id
     ).first()
 
@@ -525,16 +885,8 @@ async def get_attachment(filename: str):
     )
 
 
-@router.get("/{project_id}/attachments")
-async def get_project_attachments(project_id: int, db: Session = Depends(get_db)):
-    """الحصول على قائمة المرفقات لمشروع"""
-    project = db.query(ProjectSubmission).filter(
-        ProjectSubmission.id == project_id
-    ).first()
-
-    if not project:
-        raise HTTPException(status_code=404, detail="المشروع غير موجود")
-
+def project_attachments(project: ProjectSubmission) -> list:
+    """قائمة مرفقات المشروع مع روابط تحميلها"""
     attachments = []
 
     if project.image_path:
@@ -561,9 +913,22 @@ async def get_project_attachments(project_id: int, db: Session = Depends(get_db)
             "url": f"/api/projects/attachment/{project.design_path}"
         })
 
+    return attachments
+
+
+@router.get("/{project_id}/attachments")
+async def get_project_attachments(project_id: int, db: Session = Depends(get_db)):
+    """الحصول على قائمة المرفقات لمشروع"""
+    project = db.query(ProjectSubmission).filter(
+        ProjectSubmission.id == project_id
+    ).first()
+
+    if not project:
+        raise HTTPException(status_code=404, detail="المشروع غير موجود")
+
     return {
         "project_id": project_id,
         "has_attachments": project.has_attachments,
-        "attachments": attachments
+        "attachments": project_attachments(project)
     }
     
\ No newline at end of file
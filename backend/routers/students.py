@@ -1,21 +1,26 @@
 """
 مسارات تسجيل الطلاب (الفرق والأفراد)
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, Body
+from sqlalchemy.orm import Session, selectinload, undefer
 from sqlalchemy import func
-from typing import List
+from typing import List, Optional, Union
 from pydantic import BaseModel
 from database import get_db
 from models import Team, TeamMember, Individual, ProgramVersion, RegistrationType
 from schemas import (
-    TeamCreate, TeamResponse,
-    IndividualCreate, IndividualResponse,
+    TeamCreate, TeamResponse, TeamListItem,
+    IndividualCreate, IndividualResponse, IndividualListItem,
     ProjectFieldEnum, RegistrationTypeEnum,
     AssignIndividualsToTeam
 )
 from services.email_service import email_service
 from services.iforgot_service import iForgotService
+from services.team_search import team_search_service
+from services.pagination import paginate
+from services.serialization import orm_json_response, Fieldset
+from services.http_cache import conditional_response, STARTED_AT
+from services.cache import cached
 
 router = APIRouter(prefix="/api/students", tags=["المشاركون"])
 
@@ -102,25 +107,68 @@ async def register_team(team_data: TeamCreate, db: Session = Depends(get_db)):
     return team
 
 
-@router.get("/teams", response_model=List[TeamResponse])
+# الحقول المتاحة في ?fields=
+TEAM_FIELDSET = Fieldset(Team, TeamResponse)
+INDIVIDUAL_FIELDSET = Fieldset(Individual, IndividualResponse)
+
+
+@router.get("/teams", response_model=Union[List[TeamResponse], List[TeamListItem]])
 async def get_all_teams(
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
+    cursor: Optional[str] = None,
+    compact: bool = False,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    الحصول على جميع الفرق (الأحدث أولاً)
+    - cursor: مؤشر الصفحة التالية من ترويسة X-Next-Cursor (skip للتوافق فقط)
+    - compact: بدون الفكرة الأولية والأعضاء
+    - fields: الحقول المطلوبة فقط مفصولة بفواصل (مثل id,team_name,members)، تُغني عن compact
+    """
+    names = TEAM_FIELDSET.parse(fields)
+    query = db.query(Team).filter(Team.is_active == True)
+    if names:
+        query = query.options(*TEAM_FIELDSET.options(names))
+    elif not compact:
+        # تحميل أعضاء كل الفرق في استعلام واحد بدل استعلام لكل فريق
+        query = query.options(undefer(Team.initial_idea), selectinload(Team.members))
+
+    teams = paginate(db, query, Team, response, cursor=cursor, skip=skip, limit=limit)
+    if names:
+        return TEAM_FIELDSET.response(names, teams, response)
+    return orm_json_response(TeamListItem if compact else TeamResponse, teams, response)
+
+
+@router.get("/teams/autocomplete")
+async def autocomplete_teams(
+    q: str,
+    limit: int = Query(10, ge=1, le=50),
     db: Session = Depends(get_db)
 ):
-    """الحصول على جميع الفرق"""
-    teams = db.query(Team).filter(
-        Team.is_active == True
-    ).offset(skip).limit(limit).all()
-    return teams
+    """
+    إكمال تلقائي لأسماء الفرق النشطة
+    - البحث على الاسم الموحد (بدون تشكيل، مع توحيد الألف والتاء المربوطة)
+    - مرتبة: الأسماء التي تبدأ بالنص أولاً ثم حسب التشابه
+    """
+    return team_search_service.autocomplete(db, q, limit=limit)
 
 
 @router.get("/team/{team_id}", response_model=TeamResponse)
-async def get_team(team_id: int, db: Session = Depends(get_db)):
-    """الحصول على فريق بالمعرف"""
-    team = db.query(Team).filter(Team.id == team_id).first()
+async def get_team(team_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    الحصول على فريق بالمعرف
+    - fields: الحقول المطلوبة فقط مفصولة بفواصل
+    """
+    names = TEAM_FIELDSET.parse(fields)
+    options = TEAM_FIELDSET.options(names) if names else [undefer(Team.initial_idea), selectinload(Team.members)]
+    team = db.query(Team).options(*options).filter(Team.id == team_id).first()
     if not team:
         raise HTTPException(status_code=404, detail="الفريق غير موجود")
+    if names:
+        return TEAM_FIELDSET.response_one(names, team)
     return team
 
 
@@ -184,37 +232,61 @@ async def register_individual(
     return individual
 
 
-@router.get("/individuals", response_model=List[IndividualResponse])
+@router.get("/individuals", response_model=Union[List[IndividualResponse], List[IndividualListItem]])
 async def get_all_individuals(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     unassigned_only: bool = False,
+    cursor: Optional[str] = None,
+    compact: bool = False,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """الحصول على جميع الأفراد"""
+    """
+    الحصول على جميع الأفراد (الأحدث أولاً)
+    - cursor: مؤشر الصفحة التالية من ترويسة X-Next-Cursor (skip للتوافق فقط)
+    - compact: بدون فكرة المشروع
+    - fields: الحقول المطلوبة فقط مفصولة بفواصل (مثل id,full_name,email)، تُغني عن compact
+    """
+    names = INDIVIDUAL_FIELDSET.parse(fields)
     query = db.query(Individual)
+    if names:
+        query = query.options(*INDIVIDUAL_FIELDSET.options(names))
+    elif not compact:
+        query = query.options(undefer(Individual.project_idea))
     
     if unassigned_only:
         query = query.filter(Individual.is_assigned == False)
     
-    individuals = query.offset(skip).limit(limit).all()
-    return individuals
+    individuals = paginate(db, query, Individual, response, cursor=cursor, skip=skip, limit=limit)
+    if names:
+        return INDIVIDUAL_FIELDSET.response(names, individuals, response)
+    return orm_json_response(IndividualListItem if compact else IndividualResponse, individuals, response)
 
 
 @router.get("/individual/{individual_id}", response_model=IndividualResponse)
-async def get_individual(individual_id: int, db: Session = Depends(get_db)):
-    """الحصول على فرد بالمعرف"""
-    individual = db.query(Individual).filter(Individual.id == individual_id).first()
+async def get_individual(individual_id: int, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    الحصول على فرد بالمعرف
+    - fields: الحقول المطلوبة فقط مفصولة بفواصل
+    """
+    names = INDIVIDUAL_FIELDSET.parse(fields)
+    options = INDIVIDUAL_FIELDSET.options(names) if names else [undefer(Individual.project_idea)]
+    individual = db.query(Individual).options(*options).filter(Individual.id == individual_id).first()
     if not individual:
         raise HTTPException(status_code=404, detail="الفرد غير موجود")
+    if names:
+        return INDIVIDUAL_FIELDSET.response_one(names, individual)
     return individual
 
 
 # ==================== الإحصائيات ====================
 
 @router.get("/stats")
+@cached(key="registration-stats", tags=["teams", "individuals", "program"])
 async def get_registration_stats(db: Session = Depends(get_db)):
-    """إحصائيات التسجيل"""
+    """إحصائيات التسجيل (مخزنة مؤقتاً حتى أي تسجيل جديد)"""
     version = get_active_program_version(db)
     
     # إحصائيات الفرق
@@ -269,13 +341,23 @@ async def get_registration_stats(db: Session = Depends(get_db)):
 
 # ==================== المجالات المتاحة ====================
 
+# المجالات ثابتة في الكود فلا تتغير إلا مع النشر
+AVAILABLE_FIELDS = [
+    {"value": field.value, "label": field.value}
+    for field in ProjectFieldEnum
+]
+
+
 @router.get("/fields")
-async def get_available_fields():
+async def get_available_fields(request: Request, response: Response):
     """الحصول على المجالات المتاحة"""
-    return [
-        {"value": field.value, "label": field.value}
-        for field in ProjectFieldEnum
-    ]
+    not_modified = conditional_response(
+        request, response, "fields", (AVAILABLE_FIELDS, STARTED_AT), max_age=3600
+    )
+    if not_modified:
+        return not_modified
+
+    return AVAILABLE_FIELDS
 
 
 # ==================== الفرق المتاحة للإضافة ====================
@@ -285,8 +367,8 @@ async def get_teams_with_space(db: Session = Depends(get_db)):
     """الحصول على الفرق التي لديها مساحة لأعضاء إضافيين (أقل من 6 أعضاء)"""
     version = get_active_program_version(db)
 
-    # الحصول على الفرق مع عدد أعضائها
-    teams = db.query(Team).filter(
+    # الحصول على الفرق مع أعضائها (استعلام واحد للأعضاء لكل الفرق)
+    teams = db.query(Team).options(selectinload(Team.members)).filter(
         Team.is_active == True,
         Team.program_version_id == version.id
     ).all()
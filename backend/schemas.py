@@ -2,7 +2,7 @@
 مخططات Pydantic للتحقق من البيانات
 """
 from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -90,23 +90,27 @@ class TeamCreate(BaseModel):
         return v
 
 
-class TeamResponse(BaseModel):
-    """استجابة الفريق"""
+class TeamListItem(BaseModel):
+    """الفريق في القوائم المختصرة (بدون الفكرة والأعضاء)"""
     id: int
     team_name: str
     registration_type: RegistrationTypeEnum
     field: ProjectFieldEnum
-    initial_idea: Optional[str]
     telegram_group_link: Optional[str]
     is_active: bool
     created_at: datetime
-    members: List[TeamMemberResponse] = []
     gender: GenderEnum
     
     class Config:
         from_attributes = True
 
 
+class TeamResponse(TeamListItem):
+    """استجابة الفريق"""
+    initial_idea: Optional[str]
+    members: List[TeamMemberResponse] = []
+
+
 # ================== مخططات الأفراد ==================
 
 class IndividualCreate(BaseModel):
@@ -130,8 +134,8 @@ class IndividualCreate(BaseModel):
         return v
 
 
-class IndividualResponse(BaseModel):
-    """استجابة الفرد"""
+class IndividualListItem(BaseModel):
+    """الفرد في القوائم المختصرة (بدون فكرة المشروع)"""
     id: int
     registration_type: RegistrationTypeEnum
     membership_number: Optional[str]
@@ -142,7 +146,6 @@ class IndividualResponse(BaseModel):
     interests: str
     experience_level: str
     preferred_field: ProjectFieldEnum
-    project_idea: Optional[str]
     assigned_team_id: Optional[int]
     is_assigned: bool
     created_at: datetime
@@ -152,6 +155,31 @@ class IndividualResponse(BaseModel):
         from_attributes = True
 
 
+class IndividualResponse(IndividualListItem):
+    """استجابة الفرد"""
+    project_idea: Optional[str]
+
+
+class PersonKindEnum(str, Enum):
+    """نوع المشارك في دليل المشاركين"""
+    TEAM_MEMBER = "team_member"
+    INDIVIDUAL = "individual"
+
+
+class PersonResult(BaseModel):
+    """نتيجة موحدة لعضو فريق أو فرد"""
+    kind: PersonKindEnum
+    id: int
+    full_name: str
+    email: str
+    phone: str
+    team_id: Optional[int]
+    team_name: Optional[str]
+    is_leader: bool
+    is_assigned: bool
+    score: float
+
+
 # ================== مخططات المشروع ==================
 
 class ProjectSubmissionCreate(BaseModel):
@@ -170,16 +198,13 @@ class ProjectSubmissionCreate(BaseModel):
         return v
 
 
-class ProjectSubmissionResponse(BaseModel):
-    """استجابة تقديم المشروع"""
+class ProjectListItem(BaseModel):
+    """المشروع في القوائم المختصرة (بدون النصوص الطويلة)"""
     id: int
     team_id: int
     program_version_id: int
     submission_version: int
     title: str
-    problem_statement: str
-    technical_description: str
-    scientific_reference: str
     field: ProjectFieldEnum
     image_path: Optional[str]
     diagram_path: Optional[str]
@@ -195,12 +220,76 @@ class ProjectSubmissionResponse(BaseModel):
         from_attributes = True
 
 
+class ProjectSubmissionResponse(ProjectListItem):
+    """استجابة تقديم المشروع"""
+    problem_statement: str
+    technical_description: str
+    scientific_reference: str
+
+
+class AttachmentItem(BaseModel):
+    """ملف مرفق بالمشروع"""
+    type: str
+    label: str
+    filename: str
+    url: str
+
+
+class ProjectEvaluationItem(BaseModel):
+    """تقييم المشروع مع اسم الإداري ووزنه"""
+    id: int
+    project_id: int
+    admin_id: Optional[int]
+    is_ai_evaluation: bool
+    score: float
+    notes: Optional[str]
+    detailed_scores: Optional[dict]
+    created_at: datetime
+    admin_name: Optional[str] = None
+    admin_weight: Optional[float] = None
+
+
 class ProjectWithTeamResponse(ProjectSubmissionResponse):
     """استجابة المشروع مع بيانات الفريق"""
     team: TeamResponse
     total_score: Optional[float] = None
     admin_score: Optional[float] = None
     ai_score: Optional[float] = None
+    # تُملأ فقط عند طلبها عبر include
+    evaluations: Optional[List[ProjectEvaluationItem]] = None
+    attachments: Optional[List[AttachmentItem]] = None
+
+
+class EvaluationStatusEnum(str, Enum):
+    NOT_EVALUATED = "not_evaluated"
+    AI_ONLY = "ai_only"
+    JUDGES_ONLY = "judges_only"
+    COMPLETE = "complete"
+
+
+class ProjectFacetItem(ProjectListItem):
+    """مشروع في القائمة المفلترة مع النتيجة وحالة التقييم"""
+    team_name: str
+    team_gender: GenderEnum
+    evaluation_status: EvaluationStatusEnum
+    admin_score: Optional[float] = None
+    ai_score: Optional[float] = None
+    total_score: Optional[float] = None
+
+
+class FacetCount(BaseModel):
+    """قيمة تصنيف وعدد المشاريع المطابقة لها"""
+    value: Optional[str]
+    count: int
+
+
+class FacetedProjectsResponse(BaseModel):
+    """قائمة المشاريع المفلترة مع أعداد كل تصنيف"""
+    total: int
+    skip: int
+    limit: int
+    items: List[ProjectFacetItem]
+    facets: Dict[str, List[FacetCount]]
 
 
 # ================== مخططات التقييم ==================
@@ -233,6 +322,22 @@ class AIEvaluationRequest(BaseModel):
     project_id: int
 
 
+class AIDetailedScores(BaseModel):
+    """النقاط التفصيلية لتقييم AI (كل معيار من 0 إلى 5)"""
+    innovation: float = Field(..., ge=0, le=5)
+    feasibility: float = Field(..., ge=0, le=5)
+    problem_solving: float = Field(..., ge=0, le=5)
+    technical_description: float = Field(..., ge=0, le=5)
+    scientific_reference: float = Field(..., ge=0, le=5)
+
+
+class AIEvaluationResult(BaseModel):
+    """رد نموذج AI بعد التحقق (المجموع من 25)"""
+    total_score: float = Field(..., ge=0, le=25)
+    detailed_scores: AIDetailedScores
+    notes: str = ""
+
+
 # ================== مخططات الإداريين ==================
 
 class AdminCreate(BaseModel):
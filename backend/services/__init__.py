@@ -6,8 +6,18 @@ from .auth_service import (
     get_password_hash,
     create_access_token,
     decode_token,
-    get_current_admin
+    get_current_admin,
+    get_optional_admin
 )
 from .email_service import email_service
 from .ai_evaluation import ai_evaluation_service
 from .pdf_generator import pdf_service
+from .duplicate_detection import duplicate_detection_service
+from .prescorer import prescorer_service
+from .project_search import project_search_service
+from .team_search import team_search_service
+from .search_index import search_index_service
+from .related_projects import related_projects_service
+from .people_directory import people_directory_service
+from .data_export import data_export_service
+from .cache import cache, cached
@@ -2,15 +2,53 @@
 خدمة التقييم بالذكاء الاصطناعي - DeepSeek API
 """
 import os
+import re
 import json
-from typing import Optional
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+from pydantic import ValidationError
 from dotenv import load_dotenv
+from schemas import AIEvaluationResult
 
 load_dotenv()
 
 # مفتاح DeepSeek API
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+DEEPSEEK_MODEL = "deepseek-chat"
+
+# أسعار النماذج بالدولار لكل مليون توكن (مدخلات، مخرجات)
+MODEL_PRICING = {
+    "deepseek-chat": (
+        float(os.getenv("DEEPSEEK_INPUT_PRICE_PER_M", "0.27")),
+        float(os.getenv("DEEPSEEK_OUTPUT_PRICE_PER_M", "1.10"))
+    ),
+    "deepseek-reasoner": (0.55, 2.19),
+}
+
+# سلّم النماذج: name:model:prompt:max_tokens مفصولة بفواصل
+# prompt إما short (نص مختصر) أو full (النص الكامل)
+# كل درجة عدا الأخيرة تُصعَّد إذا فشل التحقق أو كانت النتيجة قريبة من حدود الترتيب
+AI_EVALUATION_LADDER = os.getenv(
+    "AI_EVALUATION_LADDER",
+    "fast:deepseek-chat:short:400,full:deepseek-chat:full:1000"
+)
+# المسافة (بالنقاط من 25) التي تُعد فيها النتيجة قريبة من حد الترتيب
+AI_BORDERLINE_MARGIN = float(os.getenv("AI_BORDERLINE_MARGIN", "2"))
+
+
+def parse_ladder(spec: str) -> List[dict]:
+    """تحليل إعداد سلّم النماذج"""
+    ladder = []
+    for entry in spec.split(","):
+        name, model, prompt, max_tokens = entry.strip().split(":")
+        ladder.append({
+            "name": name,
+            "model": model,
+            "prompt": prompt,
+            "max_tokens": int(max_tokens)
+        })
+    return ladder
 
 
 class AIEvaluationService:
@@ -20,6 +58,12 @@ class AIEvaluationService:
         self.api_key = DEEPSEEK_API_KEY
         self.base_url = DEEPSEEK_BASE_URL
         self.max_score = 50  # الحد الأقصى للنقاط
+        self._client = None
+        self.ladder = parse_ladder(AI_EVALUATION_LADDER)
+        self.borderline_margin = AI_BORDERLINE_MARGIN
+        # عدادات تحليل الردود: صحيح مباشرة / أُصلح محلياً / نجح بعد إعادة الطلب / فشل
+        # (كل تقييم في خانة واحدة فقط، فمجموعها عدد الردود المحللة)
+        self.parse_stats = {"valid": 0, "repaired": 0, "reasked": 0, "failed": 0}
     
     def create_evaluation_prompt(
         self,
@@ -70,6 +114,29 @@ class AIEvaluationService:
 }}
 """
         return prompt
+
+    def create_short_evaluation_prompt(
+        self,
+        title: str,
+        problem_statement: str,
+        technical_description: str,
+        scientific_reference: str,
+        field: str
+    ) -> str:
+        """نص طلب مختصر للدرجة السريعة (نصوص مقتطعة وملاحظات قصيرة)"""
+        return f"""
+قيّم المشروع التالي بإيجاز.
+العنوان: {title}
+المجال: {field}
+المشكلة: {problem_statement[:600]}
+الوصف التقني: {technical_description[:2500]}
+المرجع العلمي: {scientific_reference[:400]}
+
+المعايير (0-5 لكل منها، المجموع من 25): innovation, feasibility, problem_solving, technical_description, scientific_reference
+
+أجب بصيغة JSON فقط:
+{{"total_score": <من 25>, "detailed_scores": {{"innovation": 0, "feasibility": 0, "problem_solving": 0, "technical_description": 0, "scientific_reference": 0}}, "notes": "<جملة واحدة بالعربية>"}}
+"""
     
     async def evaluate_project(
         self,
@@ -77,22 +144,101 @@ class AIEvaluationService:
         problem_statement: str,
         technical_description: str,
         scientific_reference: str,
-        field: str
+        field: str,
+        cutoffs: Optional[List[float]] = None
     ) -> dict:
-        """تقييم المشروع باستخدام AI"""
+        """
+        تقييم المشروع باستخدام AI عبر سلّم النماذج
+        - تُقبل نتيجة الدرجة الرخيصة إلا إذا فشل التحقق منها أو كانت قريبة من أحد حدود الترتيب (cutoffs)
+        - الدرجة الأخيرة تُقبل دائماً بعد محاولة التصحيح
+        - قياسات الدرجات المُصعَّدة تُرفق في escalated_attempts
+        """
         
         # إذا لم يكن هناك مفتاح API، نستخدم تقييم تجريبي
         if not self.api_key:
             return self._mock_evaluation(title, technical_description)
 
+        project = {
+            "title": title,
+            "problem_statement": problem_statement,
+            "technical_description": technical_description,
+            "scientific_reference": scientific_reference,
+            "field": field
+        }
+        escalated = []
+        telemetry = self._new_telemetry(self.ladder[0])
         try:
-            import openai
+            client = self._get_client()
 
-            # استخدام DeepSeek API (متوافق مع OpenAI)
-            client = openai.OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url
-            )
+            for index, tier in enumerate(self.ladder):
+                telemetry = self._new_telemetry(tier)
+                messages = self._build_messages(self._tier_prompt(tier, project))
+
+                response = await client.chat.completions.create(
+                    model=tier["model"],
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=tier["max_tokens"],
+                    response_format={"type": "json_object"}
+                )
+                self._add_usage(telemetry, response.usage)
+                result_text = response.choices[0].message.content
+
+                if index == len(self.ladder) - 1:
+                    result = await self._parse_or_reask(client, messages, result_text, title, technical_description, telemetry)
+                    break
+
+                parsed, _, repaired = self._parse_result(result_text)
+                if parsed and not self._is_borderline(parsed.total_score, cutoffs):
+                    self.parse_stats["repaired" if repaired else "valid"] += 1
+                    result = self._format_result(parsed)
+                    break
+
+                escalated.append(self._close_telemetry(telemetry))
+                
+        except Exception as e:
+            print(f"خطأ في تقييم AI: {str(e)}")
+            result = self._mock_evaluation(title, technical_description, outcome="failed")
+
+        result["escalated_attempts"] = escalated
+        return self._finish_telemetry(result, telemetry)
+
+    def _tier_prompt(self, tier: dict, project: dict) -> str:
+        """نص الطلب حسب نوع الدرجة"""
+        if tier["prompt"] == "short":
+            return self.create_short_evaluation_prompt(**project)
+        return self.create_evaluation_prompt(**project)
+
+    def _is_borderline(self, score: float, cutoffs: Optional[List[float]]) -> bool:
+        """هل النتيجة قريبة من أحد حدود الترتيب؟"""
+        return any(abs(score - cutoff) <= self.borderline_margin for cutoff in cutoffs or [])
+
+    async def stream_evaluation(
+        self,
+        title: str,
+        problem_statement: str,
+        technical_description: str,
+        scientific_reference: str,
+        field: str
+    ) -> AsyncIterator[dict]:
+        """
+        تقييم المشروع مع بث التقدم أولاً بأول
+        - يُرجع أحداثاً متتالية: status ثم token (أجزاء الرد) ثم result
+        - حدث result يحمل نفس شكل نتيجة evaluate_project
+        """
+        yield {"event": "status", "data": {"stage": "started"}}
+
+        if not self.api_key:
+            yield {"event": "status", "data": {"stage": "mock"}}
+            yield {"event": "result", "data": self._mock_evaluation(title, technical_description)}
+            return
+
+        # البث للإداري مباشرة فيستخدم الدرجة الكاملة (الأخيرة) من السلّم
+        tier = self.ladder[-1]
+        telemetry = self._new_telemetry(tier)
+        chunks = []
+        try:
+            client = self._get_client()
 
             prompt = self.create_evaluation_prompt(
                 title=title,
@@ -101,48 +247,183 @@ class AIEvaluationService:
                 scientific_reference=scientific_reference,
                 field=field
             )
+            messages = self._build_messages(prompt)
 
-            response = client.chat.completions.create(
-                model="deepseek-chat",  # نموذج DeepSeek
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "أنت خبير في تقييم المشاريع التقنية. أجب دائماً بصيغة JSON فقط."
-                    },
+            stream = await client.chat.completions.create(
+                model=tier["model"],
+                messages=messages,
+                temperature=0.3,
+                max_tokens=tier["max_tokens"],
+                response_format={"type": "json_object"},
+                stream=True,
+                extra_body={"stream_options": {"include_usage": True}}
+            )
+            yield {"event": "status", "data": {"stage": "generating"}}
+
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    self._add_usage(telemetry, chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield {"event": "token", "data": {"content": delta}}
+
+            yield {"event": "status", "data": {"stage": "parsing"}}
+            result = await self._parse_or_reask(client, messages, "".join(chunks), title, technical_description, telemetry)
+
+        except Exception as e:
+            print(f"خطأ في تقييم AI: {str(e)}")
+            yield {"event": "status", "data": {"stage": "mock"}}
+            result = self._mock_evaluation(title, technical_description, outcome="failed")
+
+        yield {"event": "result", "data": self._finish_telemetry(result, telemetry)}
+
+    def _get_client(self):
+        """عميل DeepSeek (متوافق مع OpenAI) - يُنشأ مرة واحدة"""
+        if self._client is None:
+            import openai
+
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url
+            )
+        return self._client
+
+    def _build_messages(self, prompt: str) -> list:
+        """رسائل المحادثة المرسلة للنموذج"""
+        return [
+            {
+                "role": "system",
+                "content": "أنت خبير في تقييم المشاريع التقنية. أجب دائماً بصيغة JSON فقط."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+    def _new_telemetry(self, tier: dict) -> dict:
+        """بدء قياس استدعاء جديد لدرجة من السلّم"""
+        return {
+            "model": tier["model"],
+            "tier": tier["name"],
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "retries": 0,
+            "started_at": time.perf_counter()
+        }
+
+    def _add_usage(self, telemetry: dict, usage) -> None:
+        """إضافة استهلاك التوكنات من رد النموذج"""
+        if usage is None:
+            return
+        telemetry["prompt_tokens"] += usage.prompt_tokens or 0
+        telemetry["completion_tokens"] += usage.completion_tokens or 0
+
+    def _close_telemetry(self, telemetry: dict) -> dict:
+        """إنهاء القياس وحساب الزمن"""
+        if "started_at" in telemetry:
+            started_at = telemetry.pop("started_at")
+            telemetry["latency_ms"] = int((time.perf_counter() - started_at) * 1000)
+        return telemetry
+
+    def _finish_telemetry(self, result: dict, telemetry: dict) -> dict:
+        """إرفاق القياس بالنتيجة"""
+        result["telemetry"] = self._close_telemetry(telemetry)
+        return result
+
+    async def _parse_or_reask(
+        self,
+        client,
+        messages: list,
+        result_text: str,
+        title: str,
+        technical_description: str,
+        telemetry: dict
+    ) -> dict:
+        """
+        التحقق من رد النموذج مقابل المخطط
+        - محاولة إصلاح محلية رخيصة أولاً (أسوار markdown، نص زائد، فواصل زائدة)
+        - ثم طلب تصحيح واحد قصير من النموذج مع رسالة الخطأ
+        - التقييم التجريبي فقط عند فشل كل ما سبق
+        """
+        parsed, error, repaired = self._parse_result(result_text)
+        if parsed:
+            self.parse_stats["repaired" if repaired else "valid"] += 1
+            return self._format_result(parsed)
+
+        telemetry["retries"] += 1
+        try:
+            response = await client.chat.completions.create(
+                model=telemetry["model"],
+                messages=messages + [
+                    {"role": "assistant", "content": result_text or ""},
                     {
                         "role": "user",
-                        "content": prompt
+                        "content": f"الرد السابق لا يطابق المخطط المطلوب ({error}). أعد نفس التقييم بصيغة JSON صحيحة فقط."
                     }
                 ],
-                temperature=0.3,
-                max_tokens=1000
+                temperature=0,
+                max_tokens=600,
+                response_format={"type": "json_object"}
             )
-            
-            result_text = response.choices[0].message.content
-            
-            # محاولة استخراج JSON
-            try:
-                # إزالة أي نص قبل أو بعد JSON
-                start_idx = result_text.find('{')
-                end_idx = result_text.rfind('}') + 1
-                json_str = result_text[start_idx:end_idx]
-                result = json.loads(json_str)
-                
-                return {
-                    "success": True,
-                    "score": min(result.get("total_score", 25), self.max_score),
-                    "detailed_scores": result.get("detailed_scores", {}),
-                    "notes": result.get("notes", "")
-                }
-            except json.JSONDecodeError:
-                return self._mock_evaluation(title, technical_description)
-                
+            self._add_usage(telemetry, response.usage)
+            parsed, error, _ = self._parse_result(response.choices[0].message.content)
         except Exception as e:
-            print(f"خطأ في تقييم AI: {str(e)}")
-            return self._mock_evaluation(title, technical_description)
+            error = str(e)
+
+        if parsed:
+            self.parse_stats["reasked"] += 1
+            return self._format_result(parsed)
+
+        self.parse_stats["failed"] += 1
+        print(f"فشل تحليل رد AI: {error}")
+        return self._mock_evaluation(title, technical_description, outcome="failed")
+
+    def _parse_result(self, result_text: Optional[str]) -> Tuple[Optional[AIEvaluationResult], Optional[str], bool]:
+        """
+        تحليل رد النموذج والتحقق منه - يُرجع (النتيجة، رسالة الخطأ، هل أُصلح محلياً)
+        - لا يعدّ في parse_stats: المستدعي يعرف المحاولة ويعدّ النتيجة النهائية مرة واحدة
+        """
+        if not result_text:
+            return None, "رد فارغ", False
+
+        try:
+            return AIEvaluationResult.model_validate_json(result_text), None, False
+        except ValidationError as e:
+            error = str(e.errors()[0]["msg"]) if e.errors() else str(e)
+
+        # إصلاح رخيص: إزالة أي نص قبل أو بعد JSON والفواصل الزائدة
+        start_idx = result_text.find('{')
+        end_idx = result_text.rfind('}') + 1
+        if start_idx == -1 or end_idx <= start_idx:
+            return None, error, False
+
+        json_str = re.sub(r",\s*([}\]])", r"\1", result_text[start_idx:end_idx])
+        try:
+            parsed = AIEvaluationResult.model_validate(json.loads(json_str))
+        except (json.JSONDecodeError, ValidationError) as e:
+            return None, str(e), False
+
+        return parsed, None, True
+
+    def _format_result(self, parsed: AIEvaluationResult) -> dict:
+        """تحويل النتيجة المتحقق منها إلى شكل نتيجة الخدمة"""
+        return {
+            "success": True,
+            "outcome": "real",
+            "score": min(parsed.total_score, self.max_score),
+            "detailed_scores": parsed.detailed_scores.model_dump(),
+            "notes": parsed.notes
+        }
     
-    def _mock_evaluation(self, title: str, description: str) -> dict:
-        """تقييم تجريبي في حالة عدم توفر API"""
+    def _mock_evaluation(self, title: str, description: str, outcome: str = "mocked") -> dict:
+        """
+        تقييم تجريبي في حالة عدم توفر API
+        - outcome: mocked عند غياب المفتاح، failed عند فشل الاستدعاء أو التحليل
+        """
         import hashlib
         
         # إنشاء نقاط شبه عشوائية بناءً على المحتوى
@@ -170,6 +451,7 @@ class AIEvaluationService:
         
         return {
             "success": True,
+            "outcome": outcome,
             "score": min(total, self.max_score),
             "detailed_scores": {
                 "innovation": innovation,
@@ -181,6 +463,11 @@ class AIEvaluationService:
             "notes": notes
         }
     
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """تكلفة استدعاء بالدولار حسب أسعار النموذج"""
+        input_price, output_price = MODEL_PRICING.get(model, MODEL_PRICING[DEEPSEEK_MODEL])
+        return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
     def calculate_final_score(
         self,
         admin_evaluations: list,  # [{"score": x, "weight": y}, ...]
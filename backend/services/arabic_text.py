@@ -0,0 +1,64 @@
+"""
+أدوات معالجة النص العربي - التوحيد والتقطيع
+"""
+import re
+
+# التشكيل وعلامات القرآن والتطويل (الصيغة صالحة في Python و PostgreSQL)
+DIACRITICS_PATTERN = r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]"
+_DIACRITICS = re.compile(DIACRITICS_PATTERN)
+# كل ما ليس حرفاً أو رقماً
+_NON_WORD = re.compile(r"[\W_]+")
+
+CHAR_MAP = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",  # أشكال الألف
+    "ة": "ه",  # التاء المربوطة
+    "ى": "ي",  # الألف المقصورة
+    "ؤ": "و",
+    "ئ": "ي",
+}
+_CHAR_MAP = str.maketrans(CHAR_MAP)
+
+# أداة التعريف مع حروف العطف والجر الملتصقة بها (الأطول أولاً)
+_ARTICLE_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    توحيد النص العربي للمقارنة والبحث
+    - حذف التشكيل والتطويل
+    - توحيد أشكال الألف والتاء المربوطة والألف المقصورة
+    - تحويل الأحرف اللاتينية لحروف صغيرة وتوحيد المسافات
+    """
+    if not text:
+        return ""
+    text = _DIACRITICS.sub("", text).translate(_CHAR_MAP).lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def tokenize(text: str) -> list:
+    """تقطيع النص الموحد إلى كلمات"""
+    return normalize_arabic(text).split()
+
+
+def strip_article(token: str) -> str:
+    """حذف أداة التعريف من كلمة موحدة (المدارس -> مدارس، بالذكاء -> ذكاء)"""
+    for prefix in _ARTICLE_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            return token[len(prefix):]
+    return token
+
+
+# اللواحق الشائعة (بعد التوحيد: ة -> ه)، الأطول أولاً
+_SUFFIXES = ("يات", "ات", "ون", "ين", "ان", "يه", "ها", "هم", "نا", "كم", "ه", "ي")
+
+
+def light_stem(token: str) -> str:
+    """
+    تجذيع خفيف: حذف أداة التعريف ولاحقة واحدة مع إبقاء 3 أحرف على الأقل
+    (المدارس -> مدارس، التقنيات -> تقن، برمجه -> برمج)
+    """
+    token = strip_article(token)
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
@@ -25,6 +25,9 @@ pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
 # OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/admin/login")
 
+# للمسارات العامة التي تعرض بيانات إضافية للإداريين فقط
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/admin/login", auto_error=False)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """التحقق من كلمة المرور"""
@@ -74,4 +77,12 @@ async def get_current_admin(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
     
     return {"username": username, "admin_id": payload.get("admin_id")}
+
+
+async def get_optional_admin(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[dict]:
+    """الإداري الحالي إن وُجد توكن صالح، وإلا None (بدون خطأ)"""
+    payload = decode_token(token) if token else None
+    if payload is None or payload.get("sub") is None:
+        return None
+    return {"username": payload["sub"], "admin_id": payload.get("admin_id")}
     
\ No newline at end of file
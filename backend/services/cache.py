@@ -0,0 +1,336 @@
+"""
+طبقة تخزين مؤقت موحدة - LRU مع مدة صلاحية، Redis اختياري، وإبطال بالوسوم
+"""
+import os
+import enum
+import time
+import inspect
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import ProjectSubmission, Team, TeamMember, Individual, Evaluation, Admin, ProgramVersion
+
+# Redis اختياري (أي عميل متوافق مع redis-py)
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# عنوان Redis (إن لم يُحدد تُستخدم ذاكرة العملية)
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+# مدة الصلاحية الافتراضية (بالثواني)
+CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "30"))
+
+# أقصى عدد مفاتيح في ذاكرة العملية قبل طرد الأقدم استخداماً
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+
+# قيمة غائبة (للتمييز عن None المخزنة)
+MISSING = object()
+
+
+class MemoryBackend:
+    """
+    تخزين داخل العملية: LRU بحد أقصى للمفاتيح ومدة صلاحية لكل مفتاح
+    - القيم تُخزن كما هي (بدون نسخ)، فلا تُعدّل القيم المُعادة من الذاكرة
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value, ttl: int, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisBackend:
+    """
+    تخزين مشترك بين العمليات في Redis
+    - القيم تُرمَّز JSON (تعود كأنواع JSON: قواميس وقوائم ونصوص)
+    - كل وسم مجموعة Redis بمفاتيحه، والطرد حسب إعدادات maxmemory في Redis
+    """
+
+    evictions = 0
+
+    def __init__(self, client, prefix: str = "cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return MISSING if raw is None else orjson.loads(raw)
+
+    def set(self, key: str, value, ttl: int, tags: Iterable[str] = ()):
+        name = self.prefix + key
+        pipe = self.client.pipeline()
+        pipe.set(name, orjson.dumps(value, default=jsonable_encoder), ex=ttl)
+        tag_ttl = max(ttl, CACHE_DEFAULT_TTL)
+        for tag in tags:
+            tag_key = self.prefix + "tag:" + tag
+            pipe.sadd(tag_key, name)
+            # مدة الوسم تُمدَّد فقط ولا تُقصَّر: كتابة قصيرة الأجل لا تُسقط مفاتيح أطول عمراً من الوسم
+            pipe.expire(tag_key, tag_ttl, nx=True)
+            pipe.expire(tag_key, tag_ttl, gt=True)
+        pipe.execute()
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        count = 0
+        for tag in tags:
+            tag_name = self.prefix + "tag:" + tag
+            names = list(self.client.smembers(tag_name))
+            if names:
+                count += self.client.delete(*names)
+            self.client.delete(tag_name)
+        return count
+
+    def clear(self):
+        names = list(self.client.scan_iter(match=self.prefix + "*"))
+        if names:
+            self.client.delete(*names)
+
+    def size(self) -> int:
+        tag_prefix = (self.prefix + "tag:").encode("utf-8")
+        return sum(
+            1 for name in self.client.scan_iter(match=self.prefix + "*")
+            if not (name if isinstance(name, bytes) else name.encode("utf-8")).startswith(tag_prefix)
+        )
+
+
+class Cache:
+    """واجهة التخزين المؤقت مع عدادات الإصابة والإخفاق"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: str):
+        """القيمة المخزنة أو MISSING"""
+        value = self.backend.get(key)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value, ttl: Optional[int] = None, tags: Iterable[str] = ()):
+        self.backend.set(key, value, ttl or CACHE_DEFAULT_TTL, tags)
+
+    def delete(self, key: str):
+        self.backend.delete(key)
+
+    def invalidate(self, *tags: str) -> int:
+        """حذف كل المفاتيح الموسومة بأي من الوسوم"""
+        if not tags:
+            return 0
+        removed = self.backend.invalidate(tags)
+        self.invalidations += removed
+        return removed
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "evictions": self.backend.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+def _create_cache() -> Cache:
+    if CACHE_REDIS_URL and redis is not None:
+        return Cache(RedisBackend(redis.Redis.from_url(CACHE_REDIS_URL)))
+    if CACHE_REDIS_URL:
+        print("⚠️ مكتبة redis غير مثبتة، سيُستخدم التخزين المؤقت في الذاكرة")
+    return Cache()
+
+
+# إنشاء نسخة من الخدمة
+cache = _create_cache()
+
+
+# ==================== المزخرف ====================
+
+# أنواع المعاملات التي تدخل في المفتاح الافتراضي
+_KEY_TYPES = (str, int, float, bool, type(None))
+
+
+def cached(key: Optional[str] = None, ttl: Optional[int] = None, tags: Iterable[str] = ()):
+    """
+    تخزين نتيجة دالة (متزامنة أو async، ومنها دوال المسارات)
+    - key / tags: قوالب بأسماء المعاملات، مثل "top-teams:{limit}" و "project:{project_id}"
+    - بدون key: اسم الدالة مع المعاملات البسيطة (تُتجاهل الجلسة والطلب والمستخدم الحالي)
+    - النتيجة يجب أن تكون بيانات JSON (لا كائنات ORM مرتبطة بجلسة)
+    """
+    tags = tuple(tags)
+
+    def decorator(func: Callable):
+        signature = inspect.signature(func)
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def build(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                k: v.value if isinstance(v, enum.Enum) else v
+                for k, v in bound.arguments.items()
+            }
+            if key is not None:
+                cache_key = key.format(**arguments)
+            else:
+                simple = [f"{k}={v!r}" for k, v in arguments.items() if isinstance(v, _KEY_TYPES)]
+                cache_key = f"{name}({','.join(simple)})"
+            return cache_key, [tag.format(**arguments) for tag in tags]
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key, cache_tags = build(args, kwargs)
+                value = cache.get(cache_key)
+                if value is MISSING:
+                    value = await func(*args, **kwargs)
+                    cache.set(cache_key, value, ttl, cache_tags)
+                return value
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key, cache_tags = build(args, kwargs)
+            value = cache.get(cache_key)
+            if value is MISSING:
+                value = func(*args, **kwargs)
+                cache.set(cache_key, value, ttl, cache_tags)
+            return value
+        return wrapper
+
+    return decorator
+
+
+# ==================== الإبطال التلقائي ====================
+
+# الوسم العام لكل جدول (أوزان الإداريين تدخل في النتائج فتتبع scores)
+_TABLE_TAGS = {
+    ProjectSubmission: "projects",
+    Team: "teams",
+    TeamMember: "teams",
+    Individual: "individuals",
+    Evaluation: "scores",
+    Admin: "scores",
+    ProgramVersion: "program",
+}
+
+# وسوم السجل المعدّل نفسه
+_RECORD_TAGS = {
+    ProjectSubmission: lambda o: [f"project:{o.id}", f"team:{o.team_id}"],
+    Team: lambda o: [f"team:{o.id}"],
+    TeamMember: lambda o: [f"team:{o.team_id}"],
+    Evaluation: lambda o: [f"project:{o.project_id}"],
+}
+
+
+def _pending_tags(session: Session) -> set:
+    return session.info.setdefault("cache_tags", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_tags(session, flush_context):
+    """جمع وسوم السجلات المضافة والمعدّلة والمحذوفة (تُبطل بعد الالتزام فقط)"""
+    pending = _pending_tags(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        model = type(obj)
+        if model in _TABLE_TAGS:
+            pending.add(_TABLE_TAGS[model])
+        if model in _RECORD_TAGS:
+            pending.update(_RECORD_TAGS[model](obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tags(orm_execute_state):
+    """التحديث والحذف الجماعي (query.update / delete) يبطل وسم الجدول كاملاً"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        tag = _TABLE_TAGS.get(mapper.class_) if mapper is not None else None
+        if tag:
+            _pending_tags(orm_execute_state.session).add(tag)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        cache.invalidate(*tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_tags(session):
+    session.info.pop("cache_tags", None)
@@ -0,0 +1,348 @@
+"""
+خدمة تصدير البيانات - بث CSV وNDJSON مباشرة من مؤشر قاعدة البيانات
+"""
+import io
+import os
+import csv
+import enum
+from typing import Iterable, Iterator, List, Optional
+import orjson
+from sqlalchemy import select, func, case, and_
+from sqlalchemy.orm import aliased
+from database import SessionLocal
+from models import Team, TeamMember, Individual, ProjectSubmission, Evaluation, Admin
+from services.scoring import score_aggregates
+
+# عدد الصفوف المقروءة من المؤشر في كل دفعة
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# علامة BOM حتى يقرأ Excel ملف CSV العربي بترميز UTF-8
+_UTF8_BOM = "\ufeff"
+
+REGISTRATION_COLUMNS = [
+    "record_type", "team_id", "team_name", "registration_type", "field", "gender",
+    "is_leader", "person_id", "full_name", "email", "phone", "membership_number",
+    "experience_level", "technical_skills", "interests", "is_assigned", "created_at"
+]
+
+_TEAM_FIELDS = ("team_id", "team_name", "registration_type", "field", "gender", "is_active", "team_created_at")
+_MEMBER_FIELDS = ("member_id", "full_name", "email", "phone", "membership_number", "is_leader", "member_created_at")
+
+
+def _plain(value):
+    """قيمة قابلة للكتابة (التعدادات كقيمها النصية)"""
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def _csv_chunks(fieldnames: List[str], records: Iterable[dict]) -> Iterator[str]:
+    """كتابة السجلات كـ CSV وإرسالها بدفعات من EXPORT_BATCH_SIZE صف"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    buffer.write(_UTF8_BOM)
+    writer.writeheader()
+
+    for count, record in enumerate(records, start=1):
+        writer.writerow(record)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(records: Iterable[dict]) -> Iterator[bytes]:
+    """سطر JSON لكل سجل، بدفعات من EXPORT_BATCH_SIZE سطر"""
+    lines = []
+    for record in records:
+        lines.append(orjson.dumps(record))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+class DataExportService:
+    """
+    تصدير بيانات المسابقة كاملة في طلب واحد
+    - القراءة بمؤشر من جهة الخادم (yield_per) فلا تُحمَّل كل الصفوف في الذاكرة
+    - كل مولّد يفتح جلسته الخاصة لأن جلسة الطلب تُغلق قبل بدء البث
+    """
+
+    # ==================== الاستعلامات ====================
+
+    def _members(self, db, program_version_id: Optional[int]):
+        """الفرق وأعضاؤها مرتبين حسب الفريق (الفرق بدون أعضاء تظهر بصف واحد)"""
+        statement = select(
+            Team.id.label("team_id"),
+            Team.team_name.label("team_name"),
+            Team.registration_type.label("registration_type"),
+            Team.field.label("field"),
+            Team.gender.label("gender"),
+            Team.is_active.label("is_active"),
+            Team.created_at.label("team_created_at"),
+            TeamMember.id.label("member_id"),
+            TeamMember.full_name.label("full_name"),
+            TeamMember.email.label("email"),
+            TeamMember.phone.label("phone"),
+            TeamMember.membership_number.label("membership_number"),
+            TeamMember.is_leader.label("is_leader"),
+            TeamMember.created_at.label("member_created_at")
+        ).outerjoin(
+            TeamMember, TeamMember.team_id == Team.id
+        ).order_by(Team.id, TeamMember.id)
+        if program_version_id is not None:
+            statement = statement.where(Team.program_version_id == program_version_id)
+        return db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE)).mappings()
+
+    def _individuals(self, db, program_version_id: Optional[int]):
+        """الأفراد مع اسم الفريق الذي فُرزوا إليه"""
+        assigned_team = aliased(Team)
+        statement = select(
+            Individual.id.label("person_id"),
+            Individual.registration_type.label("registration_type"),
+            Individual.full_name.label("full_name"),
+            Individual.email.label("email"),
+            Individual.phone.label("phone"),
+            Individual.membership_number.label("membership_number"),
+            Individual.gender.label("gender"),
+            Individual.preferred_field.label("field"),
+            Individual.experience_level.label("experience_level"),
+            Individual.technical_skills.label("technical_skills"),
+            Individual.interests.label("interests"),
+            Individual.is_assigned.label("is_assigned"),
+            Individual.assigned_team_id.label("team_id"),
+            assigned_team.team_name.label("team_name"),
+            Individual.created_at.label("created_at")
+        ).outerjoin(
+            assigned_team, assigned_team.id == Individual.assigned_team_id
+        ).order_by(Individual.id)
+        if program_version_id is not None:
+            statement = statement.where(Individual.program_version_id == program_version_id)
+        return db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE)).mappings()
+
+    # ==================== التسجيلات ====================
+
+    def _registration_rows(self, db, program_version_id: Optional[int]) -> Iterator[dict]:
+        """صف لكل عضو فريق مع بيانات فريقه ثم صف لكل فرد"""
+        for row in self._members(db, program_version_id):
+            yield {
+                **{key: _plain(row[key]) for key in _TEAM_FIELDS},
+                **{key: _plain(row[key]) for key in _MEMBER_FIELDS},
+                "record_type": "team_member",
+                "person_id": row["member_id"],
+                "is_assigned": True,
+                "created_at": row["member_created_at"] or row["team_created_at"]
+            }
+
+        for row in self._individuals(db, program_version_id):
+            yield {
+                **{key: _plain(value) for key, value in row.items()},
+                "record_type": "individual",
+                "is_leader": False
+            }
+
+    def _registration_records(self, db, program_version_id: Optional[int]) -> Iterator[dict]:
+        """
+        سجل لكل فريق (مع أعضائه) ثم سجل لكل فرد
+        - الصفوف مرتبة حسب الفريق، فيكفي الاحتفاظ بالفريق الحالي فقط في الذاكرة
+        """
+        team = None
+        for row in self._members(db, program_version_id):
+            if team is None or team["id"] != row["team_id"]:
+                if team is not None:
+                    yield team
+                team = {
+                    "type": "team",
+                    "id": row["team_id"],
+                    "team_name": row["team_name"],
+                    "registration_type": _plain(row["registration_type"]),
+                    "field": row["field"],
+                    "gender": _plain(row["gender"]),
+                    "is_active": row["is_active"],
+                    "created_at": row["team_created_at"],
+                    "members": []
+                }
+            if row["member_id"] is not None:
+                team["members"].append({
+                    "id": row["member_id"],
+                    "full_name": row["full_name"],
+                    "email": row["email"],
+                    "phone": row["phone"],
+                    "membership_number": row["membership_number"],
+                    "is_leader": row["is_leader"]
+                })
+        if team is not None:
+            yield team
+
+        for row in self._individuals(db, program_version_id):
+            yield {
+                "type": "individual",
+                **{key: _plain(value) for key, value in row.items()}
+            }
+
+    def registrations_csv(self, program_version_id: Optional[int] = None) -> Iterator[str]:
+        """تصدير التسجيلات كـ CSV"""
+        db = SessionLocal()
+        try:
+            yield from _csv_chunks(REGISTRATION_COLUMNS, self._registration_rows(db, program_version_id))
+        finally:
+            db.close()
+
+    def registrations_ndjson(self, program_version_id: Optional[int] = None) -> Iterator[bytes]:
+        """تصدير التسجيلات كـ NDJSON"""
+        db = SessionLocal()
+        try:
+            yield from _ndjson_chunks(self._registration_records(db, program_version_id))
+        finally:
+            db.close()
+
+    # ==================== كشف الدرجات ====================
+
+    def _score_columns(self, db) -> tuple:
+        """المحكمون الذين قيّموا ومعايير التقييم التفصيلي (أعمدة الكشف)"""
+        judges = db.query(Admin.id, Admin.username).join(
+            Evaluation, Evaluation.admin_id == Admin.id
+        ).filter(
+            Evaluation.is_ai_evaluation == False
+        ).distinct().order_by(Admin.id).all()
+
+        criteria = db.query(
+            func.json_object_keys(Evaluation.detailed_scores)
+        ).filter(
+            func.json_typeof(Evaluation.detailed_scores) == "object"
+        ).distinct().all()
+
+        return judges, sorted(key for (key,) in criteria)
+
+    def _score_sheet(self, db, judges, criteria, program_version_id: Optional[int], field: Optional[str]):
+        """
+        كشف الدرجات كاستعلام مجمّع واحد (جدول محوري)
+        - صف لكل مشروع، وعمود لكل محكم ولكل معيار عبر تجميعات مشروطة
+        - j{i}: درجة المحكم، ai_c{i}: معيار AI، judges_c{i}: متوسط المعيار لدى المحكمين
+        """
+        is_ai = Evaluation.is_ai_evaluation == True
+        is_admin = Evaluation.is_ai_evaluation == False
+        admin_score, ai_score = score_aggregates()
+
+        def criterion(source, name):
+            # القيم الرقمية فقط (detailed_scores حقل JSON حر)
+            value = Evaluation.detailed_scores[name]
+            return case((and_(source, func.json_typeof(value) == "number"), value.as_float()))
+
+        columns = [
+            ProjectSubmission.id.label("project_id"),
+            ProjectSubmission.title.label("title"),
+            ProjectSubmission.field.label("field"),
+            Team.id.label("team_id"),
+            Team.team_name.label("team_name")
+        ]
+        columns += [
+            func.max(case((and_(is_admin, Evaluation.admin_id == judge_id), Evaluation.score))).label(f"j{i}")
+            for i, (judge_id, _) in enumerate(judges)
+        ]
+        columns.append(func.max(case((is_ai, Evaluation.score))).label("ai_score"))
+        for i, name in enumerate(criteria):
+            columns.append(func.max(criterion(is_ai, name)).label(f"ai_c{i}"))
+            columns.append(func.avg(criterion(is_admin, name)).label(f"judges_c{i}"))
+        columns += [
+            func.count(case((is_admin, Evaluation.id))).label("judges_count"),
+            admin_score.label("admin_score"),
+            (admin_score + ai_score).label("final_score")
+        ]
+
+        statement = select(*columns).join(
+            Team, Team.id == ProjectSubmission.team_id
+        ).outerjoin(
+            Evaluation, Evaluation.project_id == ProjectSubmission.id
+        ).outerjoin(
+            Admin, Admin.id == Evaluation.admin_id
+        ).group_by(
+            ProjectSubmission.id, Team.id
+        ).order_by(ProjectSubmission.id)
+        if program_version_id is not None:
+            statement = statement.where(ProjectSubmission.program_version_id == program_version_id)
+        if field:
+            statement = statement.where(ProjectSubmission.field == field)
+        return db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE)).mappings()
+
+    def scores_csv(self, program_version_id: Optional[int] = None, field: Optional[str] = None) -> Iterator[str]:
+        """كشف الدرجات كـ CSV: عمود judge_<اسم المستخدم> لكل محكم وعمودان لكل معيار"""
+        db = SessionLocal()
+        try:
+            judges, criteria = self._score_columns(db)
+            judge_columns = [f"judge_{username}" for _, username in judges]
+            criteria_columns = [
+                column for name in criteria
+                for column in (f"ai_{name}", f"judges_avg_{name}")
+            ]
+            fieldnames = (
+                ["project_id", "team_id", "team_name", "field", "title"]
+                + judge_columns + ["ai_score"] + criteria_columns
+                + ["judges_count", "admin_score", "final_score"]
+            )
+
+            def rows():
+                for row in self._score_sheet(db, judges, criteria, program_version_id, field):
+                    record = {key: row[key] for key in ("project_id", "team_id", "team_name", "field", "title", "ai_score", "judges_count")}
+                    record.update({column: row[f"j{i}"] for i, column in enumerate(judge_columns)})
+                    for i, name in enumerate(criteria):
+                        record[f"ai_{name}"] = row[f"ai_c{i}"]
+                        record[f"judges_avg_{name}"] = _round(row[f"judges_c{i}"])
+                    record["admin_score"] = _round(row["admin_score"])
+                    record["final_score"] = _round(row["final_score"])
+                    yield record
+
+            yield from _csv_chunks(fieldnames, rows())
+        finally:
+            db.close()
+
+    def scores_ndjson(self, program_version_id: Optional[int] = None, field: Optional[str] = None) -> Iterator[bytes]:
+        """كشف الدرجات كـ NDJSON: سطر لكل مشروع (الدرجات الغائبة محذوفة من القواميس)"""
+        db = SessionLocal()
+        try:
+            judges, criteria = self._score_columns(db)
+
+            def records():
+                for row in self._score_sheet(db, judges, criteria, program_version_id, field):
+                    yield {
+                        "project_id": row["project_id"],
+                        "team_id": row["team_id"],
+                        "team_name": row["team_name"],
+                        "field": row["field"],
+                        "title": row["title"],
+                        "judges": {
+                            username: row[f"j{i}"]
+                            for i, (_, username) in enumerate(judges)
+                            if row[f"j{i}"] is not None
+                        },
+                        "ai_score": row["ai_score"],
+                        "detailed_scores": {
+                            "ai": {
+                                name: row[f"ai_c{i}"]
+                                for i, name in enumerate(criteria)
+                                if row[f"ai_c{i}"] is not None
+                            },
+                            "judges_avg": {
+                                name: _round(row[f"judges_c{i}"])
+                                for i, name in enumerate(criteria)
+                                if row[f"judges_c{i}"] is not None
+                            }
+                        },
+                        "judges_count": row["judges_count"],
+                        "admin_score": _round(row["admin_score"]),
+                        "final_score": _round(row["final_score"])
+                    }
+
+            yield from _ndjson_chunks(records())
+        finally:
+            db.close()
+
+
+# إنشاء نسخة من الخدمة
+data_export_service = DataExportService()
@@ -0,0 +1,284 @@
+"""
+خدمة كشف المشاريع المكررة - MinHash + LSH
+"""
+import os
+import random
+import struct
+import hashlib
+import zlib
+from typing import List, Optional, Tuple
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session, undefer_group
+from models import ProjectSubmission, ProjectFingerprint, ProjectLSHBucket, Team, Evaluation
+from services.arabic_text import normalize_arabic
+
+# 128 دالة تجزئة مقسمة إلى 16 حزمة × 8 صفوف
+# عتبة التصادم التقريبية في LSH: (1/16)^(1/8) ≈ 0.71
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3  # عدد الكلمات في كل مقطع
+
+_PRIME = (1 << 61) - 1
+# بذرة ثابتة حتى تبقى التواقيع المخزنة قابلة للمقارنة بعد إعادة التشغيل
+_rng = random.Random(1)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+    for _ in range(NUM_PERM)
+]
+
+
+class DuplicateDetectionService:
+    """كشف النسخ المطابقة والمتقاربة من نصوص المشاريع"""
+
+    def __init__(self):
+        # التشابه الأدنى لاعتبار مشروعين مشبوهين
+        self.similarity_threshold = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", "0.7"))
+        # التشابه الأدنى لإعادة استخدام تقييم AI لمشروع آخر بدل استدعاء جديد
+        self.reuse_threshold = float(os.getenv("DUPLICATE_REUSE_THRESHOLD", "0.9"))
+
+    # ==================== التوقيع ====================
+
+    def project_text(self, project: ProjectSubmission) -> str:
+        """النص الموحد الذي تُحسب منه البصمة"""
+        return normalize_arabic(" ".join([
+            project.title or "",
+            project.problem_statement or "",
+            project.technical_description or ""
+        ]))
+
+    def content_hash(self, text: str) -> str:
+        """تجزئة النص الموحد - تتطابق للنسخ الحرفية"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def shingles(self, text: str) -> set:
+        """مقاطع من 3 كلمات متتالية (مجزأة إلى أعداد 32 بت)"""
+        words = text.split()
+        if len(words) < SHINGLE_SIZE:
+            return {zlib.crc32(text.encode("utf-8"))} if text else set()
+        return {
+            zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"))
+            for i in range(len(words) - SHINGLE_SIZE + 1)
+        }
+
+    def minhash(self, shingles: set) -> List[int]:
+        """توقيع MinHash: أصغر قيمة لكل دالة تجزئة"""
+        if not shingles:
+            return [_PRIME] * NUM_PERM
+        return [
+            min((a * s + b) % _PRIME for s in shingles)
+            for a, b in _PERMUTATIONS
+        ]
+
+    def band_buckets(self, signature: List[int]) -> List[Tuple[int, int]]:
+        """سلة LSH لكل حزمة من التوقيع"""
+        buckets = []
+        for band in range(BANDS):
+            rows = signature[band * ROWS:(band + 1) * ROWS]
+            digest = hashlib.blake2b(struct.pack(f"<{ROWS}Q", *rows), digest_size=8).digest()
+            buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+        return buckets
+
+    @staticmethod
+    def similarity(signature_a: List[int], signature_b: List[int]) -> float:
+        """تقدير تشابه Jaccard من توقيعين"""
+        matches = sum(1 for a, b in zip(signature_a, signature_b) if a == b)
+        return matches / NUM_PERM
+
+    # ==================== الفهرسة ====================
+
+    def index_project(self, db: Session, project: ProjectSubmission) -> ProjectFingerprint:
+        """حساب بصمة المشروع وإضافتها لفهرس LSH"""
+        text = self.project_text(project)
+        signature = self.minhash(self.shingles(text))
+
+        db.query(ProjectLSHBucket).filter(
+            ProjectLSHBucket.project_id == project.id
+        ).delete(synchronize_session=False)
+
+        fingerprint = db.merge(ProjectFingerprint(
+            project_id=project.id,
+            content_hash=self.content_hash(text),
+            minhash=signature
+        ))
+        db.add_all([
+            ProjectLSHBucket(band=band, bucket=bucket, project_id=project.id)
+            for band, bucket in self.band_buckets(signature)
+        ])
+        db.commit()
+
+        return fingerprint
+
+    def _missing(self, db: Session):
+        return db.query(ProjectSubmission).filter(
+            ~ProjectSubmission.id.in_(db.query(ProjectFingerprint.project_id))
+        )
+
+    def count_missing(self, db: Session) -> int:
+        """عدد المشاريع التي لا تملك بصمة بعد (للقراءة فقط)"""
+        return self._missing(db).count()
+
+    def index_missing(self, db: Session) -> int:
+        """فهرسة المشاريع التي لا تملك بصمة (المقدمة قبل تفعيل الخدمة)"""
+        projects = self._missing(db).options(undefer_group("content")).all()
+
+        for project in projects:
+            self.index_project(db, project)
+
+        return len(projects)
+
+    # ==================== البحث ====================
+
+    def find_similar(
+        self,
+        db: Session,
+        project_id: int,
+        threshold: Optional[float] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        المشاريع المشابهة لمشروع معين مرتبة تنازلياً حسب التشابه
+        - المرشحون من تصادم سلال LSH فقط (دون مقارنة كل الأزواج)
+        """
+        threshold = self.similarity_threshold if threshold is None else threshold
+
+        fingerprint = db.query(ProjectFingerprint).filter(
+            ProjectFingerprint.project_id == project_id
+        ).first()
+        if not fingerprint:
+            return []
+
+        candidate_ids = db.query(ProjectLSHBucket.project_id).filter(
+            tuple_(ProjectLSHBucket.band, ProjectLSHBucket.bucket).in_(
+                self.band_buckets(fingerprint.minhash)
+            ),
+            ProjectLSHBucket.project_id != project_id
+        ).distinct()
+
+        candidates = db.query(ProjectFingerprint).filter(
+            ProjectFingerprint.project_id.in_(candidate_ids)
+        ).all()
+
+        similar = []
+        for candidate in candidates:
+            if candidate.content_hash == fingerprint.content_hash:
+                score = 1.0
+            else:
+                score = self.similarity(fingerprint.minhash, candidate.minhash)
+            if score >= threshold:
+                similar.append((candidate.project_id, score))
+
+        similar.sort(key=lambda item: item[1], reverse=True)
+        return similar
+
+    def find_reusable_evaluation(self, db: Session, project_id: int) -> Optional[Evaluation]:
+        """تقييم AI لنسخة مطابقة أو شبه مطابقة يمكن إعادة استخدامه"""
+        similar = self.find_similar(db, project_id, threshold=self.reuse_threshold)
+        if not similar:
+            return None
+
+        evaluations = {
+            e.project_id: e
+            for e in db.query(Evaluation).filter(
+                Evaluation.project_id.in_([pid for pid, _ in similar]),
+                Evaluation.is_ai_evaluation == True
+            ).all()
+        }
+
+        for pid, _ in similar:
+            if pid in evaluations:
+                return evaluations[pid]
+        return None
+
+    def find_clusters(self, db: Session, threshold: Optional[float] = None) -> List[dict]:
+        """
+        مجموعات المشاريع المشبوهة بالتكرار بين فرق مختلفة
+        - الأزواج المرشحة من السلال التي تحوي أكثر من مشروع
+        - التحقق بالتوقيع ثم التجميع (union-find)
+        """
+        threshold = self.similarity_threshold if threshold is None else threshold
+
+        collisions = db.query(
+            func.array_agg(ProjectLSHBucket.project_id)
+        ).group_by(
+            ProjectLSHBucket.band, ProjectLSHBucket.bucket
+        ).having(func.count(ProjectLSHBucket.project_id) > 1).all()
+
+        candidate_pairs = set()
+        for (project_ids,) in collisions:
+            project_ids = sorted(project_ids)
+            for i, a in enumerate(project_ids):
+                for b in project_ids[i + 1:]:
+                    candidate_pairs.add((a, b))
+
+        if not candidate_pairs:
+            return []
+
+        involved = {pid for pair in candidate_pairs for pid in pair}
+        rows = db.query(ProjectFingerprint, ProjectSubmission, Team.team_name).join(
+            ProjectSubmission, ProjectSubmission.id == ProjectFingerprint.project_id
+        ).join(
+            Team, Team.id == ProjectSubmission.team_id
+        ).filter(ProjectFingerprint.project_id.in_(involved)).all()
+        info = {fp.project_id: (fp, project, team_name) for fp, project, team_name in rows}
+
+        parent = {}
+
+        def find(x):
+            parent.setdefault(x, x)
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        pairs = []
+        for a, b in candidate_pairs:
+            if a not in info or b not in info:
+                continue
+            fp_a, project_a, _ = info[a]
+            fp_b, project_b, _ = info[b]
+            # نسخ الفريق نفسه المتتالية ليست تكراراً مشبوهاً
+            if project_a.team_id == project_b.team_id:
+                continue
+            exact = fp_a.content_hash == fp_b.content_hash
+            score = 1.0 if exact else self.similarity(fp_a.minhash, fp_b.minhash)
+            if score >= threshold:
+                pairs.append((a, b, score, exact))
+                parent[find(a)] = find(b)
+
+        clusters = {}
+        for a, b, score, exact in pairs:
+            cluster = clusters.setdefault(find(a), {"project_ids": set(), "pairs": []})
+            cluster["project_ids"].update((a, b))
+            cluster["pairs"].append({
+                "project_a": a,
+                "project_b": b,
+                "similarity": round(score, 3),
+                "exact_copy": exact
+            })
+
+        result = []
+        for cluster in clusters.values():
+            projects = []
+            for pid in sorted(cluster["project_ids"]):
+                _, project, team_name = info[pid]
+                projects.append({
+                    "id": project.id,
+                    "title": project.title,
+                    "team_id": project.team_id,
+                    "team_name": team_name,
+                    "submission_version": project.submission_version,
+                    "created_at": project.created_at.isoformat() if project.created_at else None
+                })
+            result.append({
+                "max_similarity": max(p["similarity"] for p in cluster["pairs"]),
+                "exact_copy": any(p["exact_copy"] for p in cluster["pairs"]),
+                "projects": projects,
+                "pairs": sorted(cluster["pairs"], key=lambda p: p["similarity"], reverse=True)
+            })
+
+        result.sort(key=lambda c: c["max_similarity"], reverse=True)
+        return result
+
+
+# إنشاء نسخة من الخدمة
+duplicate_detection_service = DuplicateDetectionService()
@@ -0,0 +1,99 @@
+"""
+التخزين الشرطي في HTTP للمسارات العامة (ETag / Last-Modified / 304)
+"""
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import func, select, literal, union_all
+from sqlalchemy.orm import Session
+
+# مدة صلاحية الاستجابة في المتصفح وشبكة CDN قبل إعادة التحقق (بالثواني)
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+
+# وقت بدء العملية - آخر تعديل للبيانات الثابتة في الكود
+STARTED_AT = datetime.now(timezone.utc)
+
+
+def data_version(db: Session, *models) -> Tuple[list, Optional[datetime]]:
+    """
+    بصمة بيانات الجداول باستعلام واحد: (العدد، أكبر id، آخر تعديل، مجموع أوقات التعديل)
+    - الإضافة والحذف تغيّر العدد أو أكبر id
+    - التعديل يغيّر updated_at، ومجموع الأوقات يكشف تعديلاً بوقت أقدم من آخر تعديل
+    - يعيد (البصمة، آخر تعديل)
+    """
+    parts = []
+    for model in models:
+        changed = func.coalesce(model.updated_at, model.created_at)
+        parts.append(select(
+            literal(model.__tablename__).label("table_name"),
+            func.count(model.id).label("rows"),
+            func.max(model.id).label("max_id"),
+            func.max(changed).label("changed"),
+            func.sum(func.extract("epoch", changed)).label("checksum")
+        ))
+    rows = db.execute(union_all(*parts)).all()
+
+    fingerprint = [
+        (row.table_name, row.rows, row.max_id, str(row.changed), str(row.checksum))
+        for row in rows
+    ]
+    last_modified = max((row.changed for row in rows if row.changed), default=None)
+    return fingerprint, last_modified
+
+
+def etag_for(key: str, version: Tuple[object, Optional[datetime]]) -> str:
+    """ETag قوي لمسار ومعاملاته عند نسخة بيانات معينة (يصلح أيضاً مفتاحاً للحساب)"""
+    digest = hashlib.sha1(json.dumps([key, version[0]], default=str).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+
+def _is_fresh(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """هل نسخة العميل مطابقة؟ (If-None-Match له الأولوية على If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # مقارنة ضعيفة كما يتطلب المعيار (الـ CDN قد يضيف W/ بعد الضغط)
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    key: str,
+    version: Tuple[object, Optional[datetime]],
+    max_age: int = HTTP_CACHE_MAX_AGE
+) -> Optional[Response]:
+    """
+    ترويسات التخزين (Cache-Control, ETag, Last-Modified) على الاستجابة المحقونة
+    - key: يميّز المسار ومعاملاته، version: (البصمة، آخر تعديل) من data_version
+    - إذا كانت نسخة العميل حديثة يعيد استجابة 304 جاهزة (يُعاد مباشرة دون حساب المحتوى)
+    - وإلا يعيد None ويكمل المسار عادياً
+    """
+    etag = etag_for(key, version)
+    last_modified = version[1]
+
+    headers = {"Cache-Control": f"public, max-age={max_age}", "ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+
+    if _is_fresh(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,100 @@
+"""
+ترقيم الصفحات بالمؤشر (keyset) على (created_at, id) مع الإزاحة كبديل للتوافق
+"""
+import json
+import base64
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+# ترويسات الاستجابة (مكشوفة في CORS من main.py)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_ESTIMATE_HEADER = "X-Total-Estimate"
+
+
+def encode_cursor(created_at: datetime, record_id: int) -> str:
+    """مؤشر معتم: آخر (created_at, id) في الصفحة"""
+    payload = json.dumps([created_at.isoformat(), record_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) لاستعلام مع معاملاته المربوطة كما هي"""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def estimate_count(db: Session, query: Query) -> Optional[int]:
+    """
+    العدد التقريبي من تقدير مخطط الاستعلام (EXPLAIN) بدل COUNT(*)
+    - يحترم الفلاتر، ولا يقرأ الجدول
+    - داخل نقطة حفظ: فشل EXPLAIN لا يُفسد معاملة الطلب في PostgreSQL
+    - None إذا تعذر التقدير (أو لم تكن القاعدة PostgreSQL)
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    try:
+        with db.begin_nested():
+            plan = db.execute(Explain(query.order_by(None).statement)).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (SQLAlchemyError, KeyError, IndexError, TypeError):
+        return None
+
+
+def paginate(
+    db: Session,
+    query: Query,
+    model,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> list:
+    """
+    صفحة من النتائج الأحدث أولاً
+    - مع cursor: الصفوف التي تلي المؤشر مباشرة (ثابتة عند إضافة سجلات جديدة أثناء التصفح)
+    - بدونه: الإزاحة skip كما في السابق
+    - المؤشر التالي في ترويسة X-Next-Cursor (غائبة في الصفحة الأخيرة)
+    - العدد التقريبي في ترويسة X-Total-Estimate
+    """
+    total = estimate_count(db, query)
+    if total is not None:
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(total)
+
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, record_id))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+
+    return rows
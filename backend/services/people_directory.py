@@ -0,0 +1,167 @@
+"""
+دليل المشاركين - بحث موحد في الأفراد وأعضاء الفرق بالاسم والبريد والهاتف
+"""
+import re
+from typing import Dict, List
+from sqlalchemy import event, select, literal, union_all, or_, case, func, false, true
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+from database import trigram_enabled
+from models import TeamMember, Individual, Team
+from services.arabic_text import normalize_arabic
+
+_NON_DIGIT = re.compile(r"\D")
+
+# أقل عدد أرقام للبحث في أرقام الهواتف
+MIN_PHONE_DIGITS = 3
+
+
+def normalize_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+def normalize_phone(phone: str) -> str:
+    """الأرقام فقط (بدون مسافات أو + أو -)"""
+    return _NON_DIGIT.sub("", phone or "")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@event.listens_for(TeamMember, "before_insert")
+@event.listens_for(TeamMember, "before_update")
+@event.listens_for(Individual, "before_insert")
+@event.listens_for(Individual, "before_update")
+def _normalize_person(mapper, connection, person):
+    """تحديث القيم الموحدة عند كل إضافة أو تعديل"""
+    person.name_normalized = normalize_arabic(person.full_name)
+    person.email_normalized = normalize_email(person.email)
+    person.phone_normalized = normalize_phone(person.phone)
+
+
+class PeopleDirectoryService:
+    """بحث فوري (أثناء الكتابة) في الأفراد وأعضاء الفرق معاً"""
+
+    def _match(self, model, text: str):
+        """شرط المطابقة ودرجة الترتيب لجدول واحد"""
+        name_q = normalize_arabic(text)
+        email_q = normalize_email(text)
+        digits = normalize_phone(text)
+
+        name, email, phone = model.name_normalized, model.email_normalized, model.phone_normalized
+        email_prefix = email.like(f"{_escape_like(email_q)}%", escape="\\")
+        name_prefix = name.like(f"{name_q}%") if name_q else false()
+        # بداية أي كلمة في الاسم (محمد احمد <- "احم")
+        word_prefix = name.like(f"% {name_q}%") if name_q else false()
+        phone_match = phone.like(f"%{digits}%") if len(digits) >= MIN_PHONE_DIGITS else false()
+
+        conditions = [email_prefix, name_prefix, word_prefix, phone_match]
+        if trigram_enabled() and name_q:
+            conditions.append(name.op("%>")(name_q))
+            fallback_score = func.word_similarity(name_q, name)
+        else:
+            fallback_score = literal(0.5)
+
+        score = case(
+            (email == email_q, 1.0),
+            (or_(name_prefix, email_prefix), 0.9),
+            (word_prefix, 0.8),
+            (phone_match, 0.7),
+            else_=fallback_score
+        )
+        return or_(*conditions), score
+
+    def search(self, db: Session, text: str, limit: int = 20) -> List[dict]:
+        """
+        نتائج موحدة مع حالة الانضمام للفريق
+        - kind: team_member أو individual
+        - is_assigned: عضو فريق أو فرد تم فرزه لفريق
+        """
+        if not text or not text.strip():
+            return []
+
+        member_condition, member_score = self._match(TeamMember, text)
+        individual_condition, individual_score = self._match(Individual, text)
+
+        members = select(
+            literal("team_member").label("kind"),
+            TeamMember.id.label("id"),
+            TeamMember.full_name.label("full_name"),
+            TeamMember.email.label("email"),
+            TeamMember.phone.label("phone"),
+            TeamMember.team_id.label("team_id"),
+            Team.team_name.label("team_name"),
+            func.coalesce(TeamMember.is_leader, False).label("is_leader"),
+            true().label("is_assigned"),
+            member_score.label("score")
+        ).join(Team, Team.id == TeamMember.team_id).where(member_condition)
+
+        individuals = select(
+            literal("individual").label("kind"),
+            Individual.id.label("id"),
+            Individual.full_name.label("full_name"),
+            Individual.email.label("email"),
+            Individual.phone.label("phone"),
+            Individual.assigned_team_id.label("team_id"),
+            Team.team_name.label("team_name"),
+            false().label("is_leader"),
+            func.coalesce(Individual.is_assigned, False).label("is_assigned"),
+            individual_score.label("score")
+        ).outerjoin(Team, Team.id == Individual.assigned_team_id).where(individual_condition)
+
+        people = union_all(members, individuals).subquery()
+        rows = db.execute(
+            select(people).order_by(
+                people.c.score.desc(), people.c.full_name, people.c.kind, people.c.id
+            ).limit(limit)
+        ).mappings().all()
+
+        return [{**row, "score": round(float(row["score"]), 3)} for row in rows]
+
+    def names_by_email(self, db: Session, emails: List[str]) -> Dict[str, str]:
+        """
+        أسماء أصحاب عناوين البريد في استعلام واحد
+        - الأفراد لهم الأولوية على أعضاء الفرق (كما في السابق)
+        - المفتاح هو البريد الموحد
+        """
+        normalized = list({normalize_email(e) for e in emails})
+        if not normalized:
+            return {}
+
+        people = union_all(
+            select(
+                literal(0).label("priority"),
+                Individual.email_normalized.label("email"),
+                Individual.full_name.label("full_name")
+            ).where(Individual.email_normalized.in_(normalized)),
+            select(
+                literal(1).label("priority"),
+                TeamMember.email_normalized.label("email"),
+                TeamMember.full_name.label("full_name")
+            ).where(TeamMember.email_normalized.in_(normalized))
+        ).subquery()
+
+        names = {}
+        for _, email, full_name in db.execute(
+            select(people).order_by(people.c.priority.desc())
+        ).all():
+            # الترتيب تنازلي فتكتب الأولوية الأعلى (0) أخيراً
+            names[email] = full_name
+        return names
+
+    def normalize_missing(self, db: Session) -> int:
+        """حساب القيم الموحدة للسجلات المسجلة قبل إضافة الأعمدة"""
+        count = 0
+        for model in (TeamMember, Individual):
+            for person in db.query(model).filter(model.email_normalized.is_(None)).all():
+                _normalize_person(None, None, person)
+                # updated_at بقيمته الحالية (وإلا طبّق onupdate وقت التشغيل): الأعمدة مشتقة لا تعديل على السجل
+                flag_modified(person, "updated_at")
+                count += 1
+        db.commit()
+        return count
+
+
+# إنشاء نسخة من الخدمة
+people_directory_service = PeopleDirectoryService()
@@ -0,0 +1,245 @@
+"""
+خدمة التقييم المبدئي المحلي - انحدار Ridge بـ NumPy على تقييمات المحكمين السابقة
+"""
+import os
+import re
+import math
+from typing import List, Optional
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session, undefer_group
+from models import ProjectSubmission, Evaluation, Admin
+from services.arabic_text import tokenize
+
+# تقييم المحكمين من 75
+ADMIN_MAX_SCORE = 75
+
+# الروابط ومعرفات DOI والمراجع المرقمة مثل [1]
+_REFERENCE = re.compile(r"https?://\S+|\b10\.\d{4,9}/\S+|\[\d+\]")
+
+
+class PreScorerService:
+    """
+    تقييم مبدئي فوري لكل مشروع قبل استدعاء النموذج اللغوي
+    - الخصائص: عدد الأحرف، عدد المراجع، المرفقات، ومصطلحات TF-IDF
+    - الهدف: المتوسط المرجح لتقييمات المحكمين (من 75)
+    - الثقة من عرض فترة التنبؤ (كلما كان المشروع بعيداً عن بيانات التدريب قلت الثقة)
+    """
+
+    def __init__(self):
+        self.alpha = float(os.getenv("PRESCORER_RIDGE_ALPHA", "1.0"))
+        self.max_terms = int(os.getenv("PRESCORER_MAX_TERMS", "300"))
+        # أقل عدد من المشاريع المُقيّمة لتدريب النموذج
+        self.min_samples = int(os.getenv("PRESCORER_MIN_SAMPLES", "10"))
+        # المشاريع الأقل ثقة من هذه القيمة تُرسل للنموذج اللغوي أولاً
+        self.confidence_threshold = float(os.getenv("PRESCORER_CONFIDENCE_THRESHOLD", "0.6"))
+        # نسبة المشاريع الأعلى تقييماً مبدئياً (حيث تُحسم المراكز)
+        self.top_band = float(os.getenv("PRESCORER_TOP_BAND", "0.2"))
+
+        self._model = None
+        self._signature = None
+
+    # ==================== الخصائص ====================
+
+    def _document(self, project: ProjectSubmission) -> List[str]:
+        return tokenize(" ".join([
+            project.title or "",
+            project.problem_statement or "",
+            project.technical_description or ""
+        ]))
+
+    def _numeric_features(self, project: ProjectSubmission) -> List[float]:
+        reference = project.scientific_reference or ""
+        attachments = [project.image_path, project.diagram_path, project.design_path]
+        return [
+            math.log1p(project.character_count or 0),
+            float(len(_REFERENCE.findall(reference))),
+            float(len([line for line in reference.splitlines() if line.strip()])),
+            1.0 if project.has_attachments else 0.0,
+            float(sum(1 for path in attachments if path))
+        ]
+
+    def _tfidf(self, documents: List[List[str]], vocabulary: dict, idf: np.ndarray) -> np.ndarray:
+        """مصفوفة TF-IDF مطبّعة (L2) لكل مستند"""
+        matrix = np.zeros((len(documents), len(vocabulary)))
+        for row, tokens in enumerate(documents):
+            for token in tokens:
+                column = vocabulary.get(token)
+                if column is not None:
+                    matrix[row, column] += 1
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return matrix / norms
+
+    def _features(self, projects: List[ProjectSubmission]) -> np.ndarray:
+        model = self._model
+        numeric = np.array([self._numeric_features(p) for p in projects], dtype=float)
+        numeric = (numeric - model["mean"]) / model["std"]
+        terms = self._tfidf([self._document(p) for p in projects], model["vocabulary"], model["idf"])
+        return np.hstack([numeric, terms])
+
+    # ==================== التدريب ====================
+
+    def _judge_scores(self, db: Session):
+        """المتوسط المرجح لتقييمات المحكمين لكل مشروع"""
+        weight = func.coalesce(Admin.evaluation_weight, 100)
+        return db.query(
+            Evaluation.project_id,
+            func.sum(Evaluation.score * weight) / func.nullif(func.sum(weight), 0)
+        ).outerjoin(
+            Admin, Admin.id == Evaluation.admin_id
+        ).filter(
+            Evaluation.is_ai_evaluation == False
+        ).group_by(Evaluation.project_id).all()
+
+    def _current_signature(self, db: Session):
+        """تتغير عند إضافة أو تعديل أي تقييم محكّم"""
+        return db.query(
+            func.count(Evaluation.id),
+            func.max(func.coalesce(Evaluation.updated_at, Evaluation.created_at))
+        ).filter(Evaluation.is_ai_evaluation == False).one()
+
+    def train(self, db: Session) -> dict:
+        """تدريب النموذج على كل المشاريع التي قيّمها المحكمون"""
+        self._signature = tuple(self._current_signature(db))
+        scores = {pid: score for pid, score in self._judge_scores(db) if score is not None}
+
+        if len(scores) < self.min_samples:
+            self._model = None
+            return {"trained": False, "samples": len(scores), "min_samples": self.min_samples}
+
+        projects = db.query(ProjectSubmission).options(undefer_group("content")).filter(
+            ProjectSubmission.id.in_(list(scores))
+        ).all()
+        y = np.array([scores[p.id] for p in projects], dtype=float)
+        documents = [self._document(p) for p in projects]
+
+        # المفردات: المصطلحات التي تظهر في مستندين على الأقل، الأكثر شيوعاً أولاً
+        document_frequency = {}
+        for tokens in documents:
+            for token in set(tokens):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        terms = sorted(
+            (t for t, df in document_frequency.items() if df >= 2),
+            key=lambda t: (-document_frequency[t], t)
+        )[:self.max_terms]
+        vocabulary = {term: i for i, term in enumerate(terms)}
+        idf = np.array([
+            math.log((1 + len(documents)) / (1 + document_frequency[t])) + 1 for t in terms
+        ])
+
+        numeric = np.array([self._numeric_features(p) for p in projects], dtype=float)
+        mean = numeric.mean(axis=0)
+        std = numeric.std(axis=0)
+        std[std == 0] = 1
+
+        X = np.hstack([(numeric - mean) / std, self._tfidf(documents, vocabulary, idf)])
+        intercept = y.mean()
+
+        # حل Ridge المغلق: (XᵀX + αI) w = Xᵀ(y - ȳ)
+        gram = X.T @ X + self.alpha * np.eye(X.shape[1])
+        gram_inv = np.linalg.pinv(gram)
+        weights = gram_inv @ (X.T @ (y - intercept))
+
+        residuals = y - (X @ weights + intercept)
+        # بواقي الإسقاط واحداً (leave-one-out) بالصيغة المغلقة e / (1 - h)
+        # حتى لا تبالغ الثقة عندما تكون الخصائص أكثر من المشاريع المُقيّمة
+        hat = np.einsum("ij,jk,ik->i", X, gram_inv, X)
+        loo_residuals = residuals / np.maximum(1 - hat, 1e-6)
+        sigma = float(np.sqrt(np.mean(loo_residuals ** 2)))
+
+        self._model = {
+            "vocabulary": vocabulary,
+            "idf": idf,
+            "mean": mean,
+            "std": std,
+            "weights": weights,
+            "intercept": intercept,
+            "gram_inv": gram_inv,
+            "sigma": sigma,
+            "samples": len(y)
+        }
+        return {
+            "trained": True,
+            "samples": len(y),
+            "terms": len(vocabulary),
+            "rmse": round(float(np.sqrt(np.mean(residuals ** 2))), 3),
+            "loo_rmse": round(sigma, 3)
+        }
+
+    def ensure_trained(self, db: Session) -> None:
+        """إعادة التدريب فقط إذا تغيرت تقييمات المحكمين"""
+        if self._signature != tuple(self._current_signature(db)):
+            self.train(db)
+
+    # ==================== التنبؤ والفرز ====================
+
+    def predict(self, db: Session, projects: List[ProjectSubmission]) -> List[dict]:
+        """التقييم المبدئي (من 75) والثقة (0-1) لكل مشروع"""
+        self.ensure_trained(db)
+        if not projects:
+            return []
+        if self._model is None:
+            return [
+                {"project_id": p.id, "provisional_score": None, "confidence": 0.0}
+                for p in projects
+            ]
+
+        model = self._model
+        X = self._features(projects)
+        predictions = np.clip(X @ model["weights"] + model["intercept"], 0, ADMIN_MAX_SCORE)
+        # الرافعة xᵀ(XᵀX + αI)⁻¹x تكبر للمشاريع البعيدة عن بيانات التدريب
+        leverage = np.einsum("ij,jk,ik->i", X, model["gram_inv"], X)
+        half_width = 1.96 * model["sigma"] * np.sqrt(1 + np.maximum(leverage, 0))
+        confidence = np.clip(1 - half_width / (ADMIN_MAX_SCORE / 2), 0, 1)
+
+        return [
+            {
+                "project_id": p.id,
+                "provisional_score": round(float(score), 2),
+                "confidence": round(float(conf), 3)
+            }
+            for p, score, conf in zip(projects, predictions, confidence)
+        ]
+
+    def triage(self, db: Session, projects: List[ProjectSubmission]) -> List[dict]:
+        """
+        ترتيب المشاريع لأولوية التقييم بالنموذج اللغوي
+        - top: ضمن أعلى نسبة PRESCORER_TOP_BAND من التقييم المبدئي
+        - uncertain: ثقة أقل من PRESCORER_CONFIDENCE_THRESHOLD
+        - routine: الباقي
+        - top و uncertain أولاً ثم الباقي، وكل مجموعة تنازلياً حسب التقييم المبدئي
+        """
+        predictions = self.predict(db, projects)
+        scored = [p["provisional_score"] for p in predictions if p["provisional_score"] is not None]
+        top_cutoff = float(np.quantile(scored, 1 - self.top_band)) if scored else None
+
+        for prediction in predictions:
+            score = prediction["provisional_score"]
+            if score is not None and score >= top_cutoff:
+                prediction["band"] = "top"
+            elif prediction["confidence"] < self.confidence_threshold:
+                prediction["band"] = "uncertain"
+            else:
+                prediction["band"] = "routine"
+
+        predictions.sort(key=lambda p: (
+            p["band"] == "routine",
+            -(p["provisional_score"] if p["provisional_score"] is not None else ADMIN_MAX_SCORE)
+        ))
+        return predictions
+
+    def model_info(self) -> Optional[dict]:
+        """ملخص النموذج الحالي"""
+        if self._model is None:
+            return None
+        return {
+            "samples": self._model["samples"],
+            "terms": len(self._model["vocabulary"]),
+            "residual_std": round(self._model["sigma"], 3)
+        }
+
+
+# إنشاء نسخة من الخدمة
+prescorer_service = PreScorerService()
@@ -0,0 +1,372 @@
+"""
+خدمة البحث النصي في المشاريع - PostgreSQL Full-Text Search مع توحيد النص العربي
+"""
+import os
+import re
+from typing import List, Optional
+from sqlalchemy import func, literal_column
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, undefer_group
+from models import ProjectSubmission, Evaluation, Team
+from services.arabic_text import normalize_arabic, strip_article, DIACRITICS_PATTERN, CHAR_MAP
+from services.search_index import search_index_service, analyze
+
+# إعداد simple: بدون تجذيع، فالتوحيد يتم في Python قبل الفهرسة والبحث
+_CONFIG = literal_column("'simple'::regconfig")
+
+# postgres: البحث النصي في PostgreSQL مع الرجوع للفهرس الداخلي عند الخطأ
+# memory: الفهرس الداخلي فقط (للبيئات بدون دعم البحث النصي)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "postgres")
+
+_DIACRITIC = re.compile(DIACRITICS_PATTERN)
+
+# عدد الكلمات في مقتطف الفهرس الداخلي
+_SNIPPET_WORDS = 35
+
+_HIGHLIGHT_START, _HIGHLIGHT_STOP, _FRAGMENT_DELIMITER = "<mark>", "</mark>", " ... "
+
+_HEADLINE_OPTIONS = (
+    f"StartSel={_HIGHLIGHT_START}, StopSel={_HIGHLIGHT_STOP}, MaxWords=35, MinWords=15, "
+    f"MaxFragments=2, FragmentDelimiter=\"{_FRAGMENT_DELIMITER}\""
+)
+
+
+def _index_text(text: str) -> str:
+    """النص الموحد مع صيغة كل كلمة بدون أداة التعريف"""
+    tokens = normalize_arabic(text).split()
+    stripped = [strip_article(t) for t in tokens]
+    return " ".join(tokens + [s for t, s in zip(tokens, stripped) if s != t])
+
+
+def _weighted(text: str, weight: str):
+    """متجه نص موحد بوزن معين"""
+    return func.setweight(func.to_tsvector(_CONFIG, _index_text(text)), weight)
+
+
+def _sql_normalize(expression):
+    """نفس توحيد normalize_arabic داخل SQL (لمقتطفات ts_headline)"""
+    translated = func.translate(
+        func.lower(expression),
+        "".join(CHAR_MAP.keys()),
+        "".join(CHAR_MAP.values())
+    )
+    return func.regexp_replace(translated, DIACRITICS_PATTERN, "", "g")
+
+
+def _highlight(text: str, terms: set) -> str:
+    """مقتطف حول أول كلمة مطابقة مع تظليلها بـ <mark> (مثل ts_headline) بالنص الأصلي كما كتبه المشارك"""
+    words = text.split()
+    matched = [any(stem in terms for stem in analyze(word)) for word in words]
+    first = next((i for i, hit in enumerate(matched) if hit), 0)
+    start = max(first - _SNIPPET_WORDS // 3, 0)
+    window = range(start, min(start + _SNIPPET_WORDS, len(words)))
+    return " ".join(
+        f"{_HIGHLIGHT_START}{words[i]}{_HIGHLIGHT_STOP}" if matched[i] else words[i]
+        for i in window
+    )
+
+
+def _normalized_positions(raw: str) -> Optional[tuple]:
+    """
+    نفس توحيد _sql_normalize حرفاً بحرف مع موضع كل حرف موحد في النص الأصلي
+    - None إذا غيّر تحويل الحروف الصغيرة طول حرف (فلا يمكن المطابقة)
+    """
+    chars, positions = [], []
+    for index, char in enumerate(raw):
+        lowered = char.lower()
+        if len(lowered) != 1:
+            return None
+        lowered = CHAR_MAP.get(lowered, lowered)
+        if _DIACRITIC.match(lowered):
+            continue
+        chars.append(lowered)
+        positions.append(index)
+    return "".join(chars), positions
+
+
+def _restore_headline(raw: str, headline: Optional[str]) -> Optional[str]:
+    """
+    إعادة مقتطف ts_headline (المحسوب على النص الموحد ليطابق الاستعلام) إلى النص الأصلي
+    - كل مقطع يُحدد موضعه في النص الموحد، ثم يُنقل هو وعلامات التظليل للنص الأصلي
+    - المقتطف الموحد كما هو إذا تعذرت المطابقة
+    """
+    if not headline or not raw:
+        return headline
+    mapping = _normalized_positions(raw)
+    if mapping is None:
+        return headline
+    normalized, positions = mapping
+
+    fragments = []
+    search_from = 0
+    for fragment in headline.split(_FRAGMENT_DELIMITER):
+        plain, marks = "", []
+        for i, part in enumerate(fragment.split(_HIGHLIGHT_START)):
+            marked, _, rest = part.rpartition(_HIGHLIGHT_STOP) if i else ("", "", part)
+            if marked:
+                marks.append((len(plain), len(plain) + len(marked)))
+                plain += marked
+            plain += rest
+        start = normalized.find(plain, search_from)
+        if start < 0:
+            start = normalized.find(plain)
+        if start < 0 or not plain:
+            return headline
+        search_from = start + len(plain)
+
+        def raw_offset(offset: int) -> int:
+            # موضع الحرف التالي، فالتشكيل الملتصق بآخر حرف يبقى داخل المقطع
+            return positions[start + offset] if start + offset < len(positions) else len(raw)
+
+        pieces, cursor = [], raw_offset(0)
+        for mark_start, mark_end in marks:
+            pieces += [raw[cursor:raw_offset(mark_start)], _HIGHLIGHT_START,
+                       raw[raw_offset(mark_start):raw_offset(mark_end)], _HIGHLIGHT_STOP]
+            cursor = raw_offset(mark_end)
+        pieces.append(raw[cursor:raw_offset(len(plain))])
+        fragments.append("".join(pieces).strip())
+
+    return _FRAGMENT_DELIMITER.join(fragments)
+
+
+class ProjectSearchService:
+    """فهرسة المشاريع في عمود search_vector والبحث المرتب فيها"""
+
+    # ==================== الفهرسة ====================
+
+    def refresh_project(self, db: Session, project_id: int) -> None:
+        """
+        إعادة حساب متجه البحث لمشروع
+        - يُستدعى بعد التقديم وبعد كل تعديل على ملاحظات المحكمين
+        - الفشل لا يوقف الطلب: البحث يرجع للفهرس الداخلي
+        """
+        if SEARCH_BACKEND != "postgres":
+            return
+        try:
+            self._refresh_vector(db, project_id)
+        except SQLAlchemyError as e:
+            db.rollback()
+            print(f"⚠️ تعذر تحديث متجه البحث للمشروع {project_id}: {e.__class__.__name__}")
+
+    def _refresh_vector(self, db: Session, project_id: int) -> None:
+        project = db.query(
+            ProjectSubmission.title,
+            ProjectSubmission.problem_statement,
+            ProjectSubmission.technical_description
+        ).filter(ProjectSubmission.id == project_id).first()
+        if not project:
+            return
+
+        notes = db.query(Evaluation.notes).filter(
+            Evaluation.project_id == project_id,
+            Evaluation.is_ai_evaluation == False,
+            Evaluation.notes.isnot(None)
+        ).all()
+
+        vector = (
+            _weighted(project.title, "A")
+            .op("||")(_weighted(project.problem_statement, "B"))
+            .op("||")(_weighted(project.technical_description, "C"))
+            .op("||")(_weighted(" ".join(n for (n,) in notes), "D"))
+        )
+
+        # updated_at يبقى كما هو (وإلا طبّق onupdate وقت الفهرسة): المتجه مشتق لا تعديل من المشارك
+        db.query(ProjectSubmission).filter(
+            ProjectSubmission.id == project_id
+        ).update({
+            ProjectSubmission.search_vector: vector,
+            ProjectSubmission.updated_at: ProjectSubmission.updated_at
+        }, synchronize_session=False)
+        db.commit()
+
+    def index_missing(self, db: Session) -> int:
+        """فهرسة المشاريع التي لا تملك متجه بحث (المقدمة قبل تفعيل الخدمة)"""
+        if SEARCH_BACKEND != "postgres":
+            return 0
+        project_ids = [
+            pid for (pid,) in db.query(ProjectSubmission.id).filter(
+                ProjectSubmission.search_vector.is_(None)
+            ).all()
+        ]
+
+        for project_id in project_ids:
+            self.refresh_project(db, project_id)
+
+        return len(project_ids)
+
+    # ==================== البحث ====================
+
+    def build_query(self, text: str) -> Optional[str]:
+        """
+        تحويل نص البحث إلى tsquery
+        - كل كلمة موحدة بمطابقة البادئة (:*) لغياب التجذيع العربي
+        - الكلمة المعرّفة تطابق صيغتها بدون أداة التعريف أيضاً
+        """
+        tokens = normalize_arabic(text).split()
+        if not tokens:
+            return None
+
+        terms = []
+        for token in tokens:
+            stripped = strip_article(token)
+            if stripped == token:
+                terms.append(f"{token}:*")
+            else:
+                terms.append(f"({token}:* | {stripped}:*)")
+        return " & ".join(terms)
+
+    def search(
+        self,
+        db: Session,
+        text: str,
+        page: int = 1,
+        page_size: int = 20,
+        field: Optional[str] = None
+    ) -> dict:
+        """
+        بحث مرتب حسب الصلة مع مقتطفات مظللة
+        - PostgreSQL أولاً، والفهرس الداخلي (BM25) إذا لم يكن البحث النصي متاحاً
+        """
+        if SEARCH_BACKEND == "postgres":
+            try:
+                return self._search_postgres(db, text, page, page_size, field)
+            except SQLAlchemyError as e:
+                db.rollback()
+                print(f"⚠️ البحث النصي في PostgreSQL غير متاح، استخدام الفهرس الداخلي: {e.__class__.__name__}")
+        return self._search_memory(db, text, page, page_size, field)
+
+    def _search_postgres(
+        self,
+        db: Session,
+        text: str,
+        page: int,
+        page_size: int,
+        field: Optional[str]
+    ) -> dict:
+        """ترتيب ts_rank_cd ومقتطفات ts_headline لصفحة النتائج فقط"""
+        tsquery_text = self.build_query(text)
+        if not tsquery_text:
+            return self._response(text, 0, page, page_size, [], "postgres")
+
+        tsquery = func.to_tsquery(_CONFIG, tsquery_text)
+        rank = func.ts_rank_cd(ProjectSubmission.search_vector, tsquery)
+
+        matches = db.query(
+            ProjectSubmission.id.label("id"),
+            rank.label("rank")
+        ).filter(ProjectSubmission.search_vector.op("@@")(tsquery))
+        if field:
+            matches = matches.filter(ProjectSubmission.field == field)
+
+        total = matches.count()
+
+        page_rows = matches.order_by(
+            rank.desc(), ProjectSubmission.id.desc()
+        ).offset((page - 1) * page_size).limit(page_size).subquery()
+
+        document = func.concat_ws(
+            " ",
+            ProjectSubmission.title,
+            ProjectSubmission.problem_statement,
+            ProjectSubmission.technical_description
+        )
+        headline = func.ts_headline(_CONFIG, _sql_normalize(document), tsquery, _HEADLINE_OPTIONS)
+
+        rows = db.query(
+            ProjectSubmission.id,
+            ProjectSubmission.title,
+            ProjectSubmission.field,
+            ProjectSubmission.team_id,
+            ProjectSubmission.submission_version,
+            Team.team_name,
+            page_rows.c.rank,
+            headline,
+            document
+        ).join(
+            page_rows, page_rows.c.id == ProjectSubmission.id
+        ).join(
+            Team, Team.id == ProjectSubmission.team_id
+        ).order_by(page_rows.c.rank.desc(), ProjectSubmission.id.desc()).all()
+
+        return self._response(text, total, page, page_size, [
+            {
+                "id": row[0],
+                "title": row[1],
+                "field": row[2],
+                "team_id": row[3],
+                "submission_version": row[4],
+                "team_name": row[5],
+                "rank": round(row[6], 4),
+                # المقتطف محسوب على النص الموحد، ويُعرض بالنص الأصلي
+                "snippet": _restore_headline(row[8], row[7])
+            }
+            for row in rows
+        ], "postgres")
+
+    def _search_memory(
+        self,
+        db: Session,
+        text: str,
+        page: int,
+        page_size: int,
+        field: Optional[str]
+    ) -> dict:
+        """البحث في الفهرس الداخلي (بدون ملاحظات المحكمين) مع مقتطفات محسوبة في Python"""
+        hits = search_index_service.search(text, kinds=["project"], limit=None)
+        scores = {hit["id"]: hit["score"] for hit in hits}
+        ranked_ids = [hit["id"] for hit in hits]
+
+        if field and ranked_ids:
+            in_field = {
+                pid for (pid,) in db.query(ProjectSubmission.id).filter(
+                    ProjectSubmission.id.in_(ranked_ids),
+                    ProjectSubmission.field == field
+                ).all()
+            }
+            ranked_ids = [pid for pid in ranked_ids if pid in in_field]
+
+        page_ids = ranked_ids[(page - 1) * page_size:page * page_size]
+        rows = {
+            project.id: (project, team_name)
+            for project, team_name in db.query(ProjectSubmission, Team.team_name).options(
+                undefer_group("content")
+            ).join(
+                Team, Team.id == ProjectSubmission.team_id
+            ).filter(ProjectSubmission.id.in_(page_ids)).all()
+        } if page_ids else {}
+
+        terms = set(analyze(text))
+        results: List[dict] = []
+        for pid in page_ids:
+            if pid not in rows:
+                continue
+            project, team_name = rows[pid]
+            results.append({
+                "id": project.id,
+                "title": project.title,
+                "field": project.field,
+                "team_id": project.team_id,
+                "submission_version": project.submission_version,
+                "team_name": team_name,
+                "rank": scores[pid],
+                "snippet": _highlight(
+                    " ".join([project.title, project.problem_statement, project.technical_description]),
+                    terms
+                )
+            })
+
+        return self._response(text, len(ranked_ids), page, page_size, results, "memory")
+
+    def _response(self, text, total, page, page_size, results, backend) -> dict:
+        return {
+            "query": text,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "backend": backend,
+            "results": results
+        }
+
+
+# إنشاء نسخة من الخدمة
+project_search_service = ProjectSearchService()
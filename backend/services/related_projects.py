@@ -0,0 +1,237 @@
+"""
+خدمة المشاريع المشابهة - تشابه جيب التمام (cosine) على مصفوفة TF-IDF متفرقة (SciPy)
+"""
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+from models import ProjectSubmission, Team
+from services.search_index import analyze
+
+
+class RelatedProjectsService:
+    """
+    أقرب المشاريع نصياً لمشروع معين
+    - عدّادات المصطلحات لكل مشروع تُحفظ في الذاكرة وتُضاف تدريجياً عند كل تقديم
+    - مصفوفة TF-IDF المطبّعة تُبنى من العدّادات عند أول استعلام بعد أي تغيير (O(عدد القيم غير الصفرية))
+    - التشابه لكل المشاريع بضرب مصفوفة متفرقة واحد، ونتائج كل مشروع تُخزن حتى التغيير التالي
+    """
+
+    def __init__(self):
+        self.top_k = int(os.getenv("RELATED_PROJECTS_TOP_K", "5"))
+        # أقل تشابه لعرض المشروع كمشابه
+        self.min_similarity = float(os.getenv("RELATED_PROJECTS_MIN_SIMILARITY", "0.05"))
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        self._vocabulary: Dict[str, int] = {}
+        self._document_frequency = np.zeros(0, dtype=np.int64)
+        self._rows: Dict[int, int] = {}  # معرف المشروع -> رقم الصف
+        self._project_ids: List[int] = []
+        self._team_ids: List[int] = []
+        self._fields: List[str] = []
+        self._terms: List[np.ndarray] = []  # أعمدة المصطلحات لكل صف
+        self._counts: List[np.ndarray] = []  # تكرارها بالترتيب نفسه
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._neighbors: Dict[tuple, List[tuple]] = {}
+
+    # ==================== البناء ====================
+
+    def _term_counts(self, project) -> tuple:
+        """أعمدة المصطلحات وتكرارها (تُضاف المصطلحات الجديدة للمفردات)"""
+        frequencies = {}
+        for term in analyze(" ".join([
+            project.title or "",
+            project.problem_statement or "",
+            project.technical_description or ""
+        ])):
+            column = self._vocabulary.setdefault(term, len(self._vocabulary))
+            frequencies[column] = frequencies.get(column, 0) + 1
+
+        if len(self._vocabulary) > len(self._document_frequency):
+            self._document_frequency = np.concatenate([
+                self._document_frequency,
+                np.zeros(len(self._vocabulary) - len(self._document_frequency), dtype=np.int64)
+            ])
+
+        columns = np.fromiter(frequencies.keys(), dtype=np.int64, count=len(frequencies))
+        counts = np.fromiter(frequencies.values(), dtype=np.float64, count=len(frequencies))
+        return columns, counts
+
+    def _add(self, project) -> None:
+        columns, counts = self._term_counts(project)
+        row = self._rows.get(project.id)
+        if row is None:
+            row = len(self._project_ids)
+            self._rows[project.id] = row
+            self._project_ids.append(project.id)
+            self._team_ids.append(project.team_id)
+            self._fields.append(project.field)
+            self._terms.append(columns)
+            self._counts.append(counts)
+        else:
+            # إعادة فهرسة مشروع موجود: إزالة مصطلحاته القديمة من تكرار المستندات
+            self._document_frequency[self._terms[row]] -= 1
+            self._fields[row] = project.field
+            self._terms[row] = columns
+            self._counts[row] = counts
+        self._document_frequency[columns] += 1
+        self._matrix = None
+
+    def _query(self, db: Session):
+        return db.query(
+            ProjectSubmission.id,
+            ProjectSubmission.team_id,
+            ProjectSubmission.field,
+            ProjectSubmission.title,
+            ProjectSubmission.problem_statement,
+            ProjectSubmission.technical_description
+        )
+
+    def load(self, db: Session) -> None:
+        """بناء العدّادات لكل المشاريع"""
+        with self._lock:
+            self._reset()
+            for project in self._query(db).order_by(ProjectSubmission.id).yield_per(500):
+                self._add(project)
+            self._loaded = True
+
+    def add_project(self, project: ProjectSubmission) -> None:
+        """
+        إضافة مشروع مقدَّم حديثاً (أو إعادة فهرسته)
+        - قبل التحميل الأول لا شيء: التحميل سيقرأه من قاعدة البيانات
+        """
+        with self._lock:
+            if self._loaded:
+                self._add(project)
+
+    def _ensure_matrix(self, db: Session) -> sparse.csr_matrix:
+        """مصفوفة TF-IDF بتطبيع L2 (تكرار لوغاريتمي × IDF)"""
+        if not self._loaded:
+            self.load(db)
+        if self._matrix is not None:
+            return self._matrix
+
+        lengths = np.fromiter((len(c) for c in self._terms), dtype=np.int64, count=len(self._terms))
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        indices = np.concatenate(self._terms) if self._terms else np.zeros(0, dtype=np.int64)
+        counts = np.concatenate(self._counts) if self._counts else np.zeros(0)
+
+        documents = len(self._project_ids)
+        idf = np.log((1 + documents) / (1 + self._document_frequency)) + 1
+        data = (1 + np.log(counts)) * idf[indices]
+
+        matrix = sparse.csr_matrix(
+            (data, indices, indptr),
+            shape=(documents, len(self._vocabulary))
+        )
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        self._matrix = sparse.diags(1 / norms) @ matrix
+        self._neighbors.clear()
+        return self._matrix
+
+    # ==================== الاستعلام ====================
+
+    def related(
+        self,
+        db: Session,
+        project_id: int,
+        limit: Optional[int] = None,
+        same_field: bool = True
+    ) -> Optional[List[tuple]]:
+        """
+        أقرب المشاريع: قائمة (معرف المشروع، التشابه) تنازلياً
+        - يستبعد مشاريع الفريق نفسه (نسخ التقديم السابقة)
+        - None إذا لم يكن المشروع موجوداً
+        """
+        limit = limit or self.top_k
+        with self._lock:
+            if self._loaded and project_id not in self._rows:
+                # مشروع لم تصل إضافته الخلفية بعد
+                project = self._query(db).filter(ProjectSubmission.id == project_id).first()
+                if project is None:
+                    return None
+                self._add(project)
+
+            matrix = self._ensure_matrix(db)
+            row = self._rows.get(project_id)
+            if row is None:
+                return None
+
+            key = (project_id, limit, same_field)
+            if key in self._neighbors:
+                return self._neighbors[key]
+
+            similarities = (matrix @ matrix[row].T).toarray().ravel()
+            excluded = np.array(self._team_ids) == self._team_ids[row]
+            if same_field:
+                excluded |= np.array(self._fields) != self._fields[row]
+            similarities[excluded] = 0
+
+            candidates = np.flatnonzero(similarities >= max(self.min_similarity, 1e-9))
+            if len(candidates) > limit:
+                candidates = candidates[np.argpartition(-similarities[candidates], limit - 1)[:limit]]
+            candidates = candidates[np.argsort(-similarities[candidates], kind="stable")]
+
+            neighbors = [
+                (self._project_ids[i], round(float(similarities[i]), 4))
+                for i in candidates
+            ]
+            self._neighbors[key] = neighbors
+            return neighbors
+
+    def related_projects(
+        self,
+        db: Session,
+        project_id: int,
+        limit: Optional[int] = None,
+        same_field: bool = True
+    ) -> Optional[List[dict]]:
+        """أقرب المشاريع مع العنوان واسم الفريق (استعلام واحد)"""
+        neighbors = self.related(db, project_id, limit, same_field)
+        if neighbors is None:
+            return None
+
+        rows = {
+            row.id: row
+            for row in db.query(
+                ProjectSubmission.id,
+                ProjectSubmission.title,
+                ProjectSubmission.field,
+                ProjectSubmission.team_id,
+                Team.team_name
+            ).join(Team, Team.id == ProjectSubmission.team_id).filter(
+                ProjectSubmission.id.in_([pid for pid, _ in neighbors])
+            ).all()
+        } if neighbors else {}
+
+        return [
+            {
+                "id": pid,
+                "title": rows[pid].title,
+                "field": rows[pid].field,
+                "team_id": rows[pid].team_id,
+                "team_name": rows[pid].team_name,
+                "similarity": similarity
+            }
+            for pid, similarity in neighbors
+            if pid in rows
+        ]
+
+    def stats(self) -> dict:
+        """حجم المصفوفة"""
+        return {
+            "loaded": self._loaded,
+            "projects": len(self._project_ids),
+            "terms": len(self._vocabulary),
+            "nonzeros": int(sum(len(c) for c in self._terms))
+        }
+
+
+# إنشاء نسخة من الخدمة
+related_projects_service = RelatedProjectsService()
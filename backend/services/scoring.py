@@ -0,0 +1,44 @@
+"""
+حساب نتائج المشاريع في SQL - نفس قواعد calculate_final_score لكن كاستعلام فرعي واحد
+"""
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from models import Evaluation, Admin
+
+
+def score_aggregates():
+    """
+    تجميعات النتيجة (admin_score, ai_score) لاستعلام مجمّع حسب المشروع
+    - يتطلب ربط Evaluation مع Admin (outerjoin) في الاستعلام نفسه
+    """
+    weight = func.coalesce(Admin.evaluation_weight, 100)
+    is_admin = Evaluation.is_ai_evaluation == False
+
+    weighted_sum = func.sum(case((is_admin, Evaluation.score * weight), else_=0))
+    weight_sum = func.sum(case((is_admin, weight), else_=0))
+    admin_score = func.coalesce(weighted_sum / func.nullif(weight_sum, 0), 0)
+    ai_score = func.coalesce(func.max(case((Evaluation.is_ai_evaluation == True, Evaluation.score))), 0)
+    return admin_score, ai_score
+
+
+def project_scores_subquery(db: Session):
+    """
+    نتيجة كل مشروع مُقيّم (استعلام فرعي يُربط بـ ProjectSubmission.id)
+    - admin_score: المتوسط المرجح لتقييمات الإداريين من 75 (الوزن الافتراضي 100)
+    - ai_score: تقييم AI من 25
+    - total_score: المجموع من 100
+    - المشاريع بدون أي تقييم لا تظهر (استخدم outerjoin)
+    """
+    is_admin = Evaluation.is_ai_evaluation == False
+    admin_score, ai_score = score_aggregates()
+
+    return db.query(
+        Evaluation.project_id.label("project_id"),
+        admin_score.label("admin_score"),
+        ai_score.label("ai_score"),
+        (admin_score + ai_score).label("total_score"),
+        func.count(case((is_admin, Evaluation.id))).label("admin_count"),
+        func.bool_or(Evaluation.is_ai_evaluation).label("has_ai")
+    ).outerjoin(
+        Admin, Admin.id == Evaluation.admin_id
+    ).group_by(Evaluation.project_id).subquery()
@@ -0,0 +1,320 @@
+"""
+فهرس بحث مقلوب داخل العملية (Python فقط) - بديل البحث النصي في PostgreSQL
+"""
+import os
+import math
+import threading
+import time
+from array import array
+from itertools import accumulate
+from functools import lru_cache
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import ProjectSubmission, Team, TeamMember, Individual
+from services.arabic_text import tokenize, light_stem
+
+# الحقول المفهرسة لكل نوع
+INDEXED_FIELDS = {
+    "project": (ProjectSubmission, ("title", "problem_statement", "technical_description")),
+    "team": (Team, ("team_name", "initial_idea")),
+    "member": (TeamMember, ("full_name", "email")),
+    "individual": (Individual, ("full_name", "email", "technical_skills", "interests", "project_idea")),
+}
+_KIND_BY_MODEL = {model: kind for kind, (model, _) in INDEXED_FIELDS.items()}
+_KIND_CODES = {kind: code for code, kind in enumerate(INDEXED_FIELDS, start=1)}
+
+# معاملات BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# نسبة المستندات المحذوفة التي يُعاد عندها بناء قوائم الورود
+COMPACT_RATIO = 0.25
+
+
+# المفردات محدودة، فتخزين نتائج التجذيع يسرّع البناء كثيراً
+_stem = lru_cache(maxsize=200_000)(light_stem)
+
+
+def analyze(text: str) -> List[str]:
+    """توحيد وتقطيع وتجذيع خفيف"""
+    return [_stem(token) for token in tokenize(text)]
+
+
+class _Postings:
+    """
+    قائمة ورود مضغوطة لمصطلح واحد
+    - معرفات المستندات الداخلية تتزايد دائماً، فتُخزن كفروق (delta) في array('I')
+    - تكرار المصطلح في array('H') بالترتيب نفسه
+    """
+    __slots__ = ("deltas", "freqs", "last")
+
+    def __init__(self):
+        self.deltas = array("I")
+        self.freqs = array("H")
+        self.last = 0
+
+    def append(self, doc_id: int, freq: int) -> None:
+        self.deltas.append(doc_id - self.last)
+        self.freqs.append(min(freq, 0xFFFF))
+        self.last = doc_id
+
+    def __iter__(self):
+        return zip(accumulate(self.deltas), self.freqs)
+
+    def __len__(self):
+        return len(self.deltas)
+
+
+class SearchIndexService:
+    """
+    فهرس مقلوب للمشاريع والفرق والأعضاء والأفراد مع ترتيب BM25
+    - التحميل كسول: عند أول استعلام أو في خيط خلفي عند بدء التشغيل
+    - التحديثات تدريجية: السجلات المعدّلة تُعلَّم عند الالتزام وتُعاد فهرستها قبل الاستعلام التالي
+    - تعديل المستند = علامة حذف (tombstone) على معرفه القديم + معرف داخلي جديد في النهاية
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._dirty = set()  # (kind, id) بانتظار إعادة الفهرسة
+        self._reset()
+
+    def _reset(self):
+        self._postings: Dict[str, _Postings] = {}
+        self._doc_keys: List[Optional[tuple]] = [None]  # المعرف الداخلي 0 غير مستخدم
+        self._doc_lengths = array("I", [0])
+        self._doc_kinds = array("B", [0])
+        self._alive = array("B", [0])  # 0 للمستندات المحذوفة
+        self._internal_ids: Dict[tuple, int] = {}  # (kind, id) -> المعرف الداخلي الحالي
+        self._tombstones = set()
+        self._total_length = 0
+
+    # ==================== البناء ====================
+
+    def _add(self, kind: str, record_id: int, text: str) -> None:
+        terms = analyze(text)
+        if not terms:
+            return
+
+        doc_id = len(self._doc_keys)
+        self._doc_keys.append((kind, record_id))
+        self._doc_lengths.append(len(terms))
+        self._doc_kinds.append(_KIND_CODES[kind])
+        self._alive.append(1)
+        self._internal_ids[(kind, record_id)] = doc_id
+        self._total_length += len(terms)
+
+        frequencies = {}
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        for term, freq in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Postings()
+            postings.append(doc_id, freq)
+
+    def _remove(self, key: tuple) -> None:
+        doc_id = self._internal_ids.pop(key, None)
+        if doc_id is not None:
+            self._tombstones.add(doc_id)
+            self._alive[doc_id] = 0
+            self._total_length -= self._doc_lengths[doc_id]
+
+    def load(self, db: Optional[Session] = None) -> None:
+        """بناء الفهرس كاملاً من قاعدة البيانات"""
+        own_session = db is None
+        db = db or SessionLocal()
+        try:
+            with self._lock:
+                started = time.perf_counter()
+                self._reset()
+                self._dirty.clear()
+                for kind, (model, fields) in INDEXED_FIELDS.items():
+                    columns = [model.id] + [getattr(model, f) for f in fields]
+                    for row in db.query(*columns).yield_per(1000):
+                        self._add(kind, row[0], " ".join(value or "" for value in row[1:]))
+                self._loaded = True
+                print(f"✅ تم بناء فهرس البحث: {self.document_count} مستند في {(time.perf_counter() - started) * 1000:.0f}ms")
+        finally:
+            if own_session:
+                db.close()
+
+    def load_in_background(self) -> None:
+        """بدء البناء في خيط خلفي حتى لا يتأخر تشغيل الخادم"""
+        if self.enabled:
+            threading.Thread(target=self._safe_load, daemon=True).start()
+
+    def _safe_load(self):
+        try:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+        except Exception as e:
+            print(f"❌ خطأ في بناء فهرس البحث: {e}")
+
+    def compact(self) -> None:
+        """إعادة بناء قوائم الورود بدون المستندات المحذوفة (بالمعرفات الداخلية نفسها)"""
+        with self._lock:
+            for term in list(self._postings):
+                old = self._postings[term]
+                postings = _Postings()
+                for doc_id, freq in old:
+                    if doc_id not in self._tombstones:
+                        postings.append(doc_id, freq)
+                if len(postings):
+                    self._postings[term] = postings
+                else:
+                    del self._postings[term]
+            for doc_id in self._tombstones:
+                self._doc_keys[doc_id] = None
+            self._tombstones.clear()
+
+    # ==================== التحديث التدريجي ====================
+
+    def mark_dirty(self, kind: str, record_id: int) -> None:
+        """
+        تعليم سجل لإعادة فهرسته قبل الاستعلام التالي
+        - يُعلَّم حتى أثناء البناء، فالبناء يمسح القائمة قبل قراءة الجداول
+        """
+        if self.enabled and record_id is not None:
+            self._dirty.add((kind, record_id))
+
+    def _apply_dirty(self) -> None:
+        """إعادة فهرسة السجلات المعدّلة (استعلام واحد لكل نوع)"""
+        if not self._dirty or not self._loaded:
+            return
+
+        with self._lock:
+            pending, self._dirty = self._dirty, set()
+            db = SessionLocal()
+            try:
+                for kind, (model, fields) in INDEXED_FIELDS.items():
+                    ids = [record_id for k, record_id in pending if k == kind]
+                    if not ids:
+                        continue
+                    columns = [model.id] + [getattr(model, f) for f in fields]
+                    rows = {row[0]: row for row in db.query(*columns).filter(model.id.in_(ids)).all()}
+                    for record_id in ids:
+                        self._remove((kind, record_id))
+                        row = rows.get(record_id)
+                        if row is not None:
+                            self._add(kind, record_id, " ".join(value or "" for value in row[1:]))
+            finally:
+                db.close()
+
+            if len(self._tombstones) > COMPACT_RATIO * max(len(self._internal_ids), 1):
+                self.compact()
+
+    def ensure_ready(self) -> None:
+        """تحميل الفهرس إن لم يُحمَّل، وتطبيق التعديلات المعلقة"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+        self._apply_dirty()
+
+    # ==================== الاستعلام ====================
+
+    @property
+    def document_count(self) -> int:
+        return len(self._internal_ids)
+
+    def search(self, text: str, kinds: Optional[List[str]] = None, limit: Optional[int] = 20) -> List[dict]:
+        """
+        أفضل المستندات حسب BM25
+        - kinds: تقييد النتائج بأنواع معينة (project, team, member, individual)
+        - limit=None: كل المستندات المطابقة مرتبة
+        - قوائم الورود تُفك وتُجمع بـ NumPy (cumsum للفروق) دون حلقات Python لكل مستند
+        """
+        self.ensure_ready()
+        terms = set(analyze(text))
+        if not terms:
+            return []
+
+        with self._lock:
+            live = self.document_count
+            if not live:
+                return []
+
+            lengths = np.array(self._doc_lengths, dtype=np.float64)
+            length_norm = BM25_K1 * (1 - BM25_B) + BM25_K1 * BM25_B * lengths / (self._total_length / live)
+            scores = np.zeros(len(lengths))
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                df = len(postings)
+                weight = math.log(1 + (live - df + 0.5) / (df + 0.5)) * (BM25_K1 + 1)
+                doc_ids = np.cumsum(np.frombuffer(postings.deltas, dtype=np.uintc), dtype=np.int64)
+                freqs = np.frombuffer(postings.freqs, dtype=np.ushort).astype(np.float64)
+                scores[doc_ids] += weight * freqs / (freqs + length_norm[doc_ids])
+
+            mask = np.array(self._alive, dtype=bool)
+            if kinds:
+                mask &= np.isin(np.array(self._doc_kinds), [_KIND_CODES[k] for k in kinds if k in _KIND_CODES])
+            scores[~mask] = 0
+
+            candidates = np.flatnonzero(scores)
+            if limit is not None and len(candidates) > limit:
+                candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            return [
+                {
+                    "kind": self._doc_keys[doc_id][0],
+                    "id": self._doc_keys[doc_id][1],
+                    "score": round(float(scores[doc_id]), 4)
+                }
+                for doc_id in candidates
+            ]
+
+    def stats(self) -> dict:
+        """حجم الفهرس"""
+        return {
+            "loaded": self._loaded,
+            "documents": self.document_count,
+            "terms": len(self._postings),
+            "tombstones": len(self._tombstones),
+            "postings_bytes": sum(
+                p.deltas.itemsize * len(p.deltas) + p.freqs.itemsize * len(p.freqs)
+                for p in self._postings.values()
+            )
+        }
+
+
+# إنشاء نسخة من الخدمة
+search_index_service = SearchIndexService()
+
+
+# ==================== ربط التحديثات بالجلسات ====================
+
+def _track_change(mapper, connection, record):
+    """تسجيل السجل المعدّل في الجلسة حتى الالتزام"""
+    session = Session.object_session(record)
+    if session is not None:
+        session.info.setdefault("search_index_changes", set()).add(
+            (_KIND_BY_MODEL[mapper.class_], record.id)
+        )
+
+
+for _model in _KIND_BY_MODEL:
+    event.listen(_model, "after_insert", _track_change)
+    event.listen(_model, "after_update", _track_change)
+    event.listen(_model, "after_delete", _track_change)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session):
+    """السجلات الملتزم بها فقط تُعلَّم لإعادة الفهرسة"""
+    for kind, record_id in session.info.pop("search_index_changes", ()):
+        search_index_service.mark_dirty(kind, record_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("search_index_changes", None)
@@ -0,0 +1,116 @@
+"""
+تسلسل سريع لصفوف ORM إلى JSON - تحقق واحد ثم dump_json (Rust) مباشرة
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Type
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, TypeAdapter, create_model
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only, selectinload
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def _json_response(content: bytes, response: Optional[Response]) -> Response:
+    """استجابة JSON جاهزة مع نقل ترويسات الاستجابة المحقونة (مثل X-Next-Cursor)"""
+    headers = {
+        key: value for key, value in response.headers.items()
+        if key != "content-length"
+    } if response is not None else None
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def orm_json_response(schema: Type[BaseModel], rows: list, response: Optional[Response] = None) -> Response:
+    """
+    استجابة JSON جاهزة لقائمة صفوف ORM موثوقة (من قاعدة البيانات)
+    - المسار العادي: تحقق response_model ثم تحويل لقواميس Python ثم ترميز JSON
+    - هنا: تحقق واحد (from_attributes) ثم ترميز JSON في pydantic-core مباشرة
+    - response: ترويسات الاستجابة المحقونة (مثل X-Next-Cursor) تُنقل للاستجابة الجديدة
+    """
+    adapter = _list_adapter(schema)
+    return _json_response(adapter.dump_json(adapter.validate_python(rows, from_attributes=True)), response)
+
+
+# ==================== الحقول المختارة (?fields=) ====================
+
+@lru_cache(maxsize=256)
+def _sparse_schema(schema: Type[BaseModel], names: Tuple[str, ...], extra_types: Tuple[tuple, ...]) -> Type[BaseModel]:
+    """مخطط مختصر بالحقول المطلوبة فقط (مخزن لكل تركيبة حقول)"""
+    extra_types = dict(extra_types)
+    definitions = {
+        name: (schema.model_fields[name].annotation, schema.model_fields[name])
+        if name in schema.model_fields else (extra_types[name], ...)
+        for name in names
+    }
+    return create_model(f"{schema.__name__}Fields", **definitions)
+
+
+@lru_cache(maxsize=256)
+def _sparse_adapter(schema: Type[BaseModel], names: Tuple[str, ...], extra_types: Tuple[tuple, ...]) -> TypeAdapter:
+    return TypeAdapter(List[_sparse_schema(schema, names, extra_types)])
+
+
+class Fieldset:
+    """
+    اختيار الحقول في الاستجابة (?fields=id,title,field)
+    - الأعمدة المطلوبة فقط تُقرأ من قاعدة البيانات (load_only)، والعلاقات المطلوبة بـ selectinload
+    - extra: حقول من جداول أخرى {الاسم: (النوع، دالة القيمة، خيار التحميل)}
+    """
+
+    # تُقرأ دائماً لأن ترقيم الصفحات بالمؤشر يحتاجها
+    ALWAYS_LOADED = ("id", "created_at")
+
+    def __init__(self, model, schema: Type[BaseModel], extra: Optional[Dict[str, tuple]] = None):
+        self.model = model
+        self.schema = schema
+        self.extra = extra or {}
+        mapper = inspect(model)
+        self._columns = set(mapper.column_attrs.keys())
+        self._relationships = set(mapper.relationships.keys())
+        self._extra_types = tuple((name, spec[0]) for name, spec in self.extra.items())
+
+    def parse(self, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+        """أسماء الحقول المطلوبة بترتيبها، أو None إذا لم تُحدد (خطأ 400 لأي حقل غير معروف)"""
+        if fields is None:
+            return None
+        names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        allowed = set(self.schema.model_fields) | set(self.extra)
+        unknown = [name for name in names if name not in allowed]
+        if unknown or not names:
+            raise HTTPException(
+                status_code=400,
+                detail=f"حقول غير معروفة: {', '.join(unknown)}. المتاح: {', '.join(sorted(allowed))}"
+            )
+        return names
+
+    def options(self, names: Tuple[str, ...]) -> list:
+        """خيارات التحميل للاستعلام: الأعمدة المطلوبة فقط"""
+        columns = [
+            getattr(self.model, name) for name in dict.fromkeys((*self.ALWAYS_LOADED, *names))
+            if name in self._columns
+        ]
+        options = [load_only(*columns)]
+        options += [selectinload(getattr(self.model, name)) for name in names if name in self._relationships]
+        options += [self.extra[name][2] for name in names if name in self.extra]
+        return options
+
+    def _record(self, obj, names: Tuple[str, ...]) -> dict:
+        return {
+            name: self.extra[name][1](obj) if name in self.extra else getattr(obj, name)
+            for name in names
+        }
+
+    def response(self, names: Tuple[str, ...], rows: list, response: Optional[Response] = None) -> Response:
+        """قائمة بالحقول المطلوبة فقط"""
+        adapter = _sparse_adapter(self.schema, names, self._extra_types)
+        records = [self._record(row, names) for row in rows]
+        return _json_response(adapter.dump_json(adapter.validate_python(records, from_attributes=True)), response)
+
+    def response_one(self, names: Tuple[str, ...], obj) -> Response:
+        """سجل واحد بالحقول المطلوبة فقط"""
+        schema = _sparse_schema(self.schema, names, self._extra_types)
+        item = schema.model_validate(self._record(obj, names), from_attributes=True)
+        return _json_response(item.model_dump_json().encode("utf-8"), None)
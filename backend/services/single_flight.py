@@ -0,0 +1,52 @@
+"""
+دمج الطلبات المتزامنة المتطابقة (single-flight) - حساب واحد لكل مفتاح مهما كثرت الطلبات
+"""
+import asyncio
+from typing import Callable, Dict
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """
+    أول طلب لمفتاح يبدأ الحساب، والطلبات المطابقة التي تصل أثناءه تنتظر نفس النتيجة
+    - الحساب المتزامن (sync) يعمل في threadpool فلا يحجز حلقة الأحداث
+    - الحساب مهمة مستقلة: انقطاع الطلب الأول لا يلغيه على البقية
+    - الدمج داخل العملية الواحدة (كل عامل uvicorn يحسب مرة واحدة)
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: str, func: Callable, *args, **kwargs):
+        task = self._inflight.get(key)
+        if task is None:
+            if asyncio.iscoroutinefunction(func):
+                task = asyncio.ensure_future(func(*args, **kwargs))
+            else:
+                task = asyncio.ensure_future(run_in_threadpool(func, *args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.executions += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # استرجاع الاستثناء حتى لا يُسجل كغير مُعالج إذا انقطع كل المنتظرين
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "executions": self.executions,
+            "shared": self.shared
+        }
+
+
+# إنشاء نسخة من الخدمة
+single_flight = SingleFlight()
@@ -0,0 +1,85 @@
+"""
+خدمة البحث التقريبي في أسماء الفرق - pg_trgm على الاسم الموحد
+"""
+from typing import List
+from sqlalchemy import event, func, or_, case
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
+from database import trigram_enabled
+from models import Team
+from services.arabic_text import normalize_arabic
+
+
+@event.listens_for(Team, "before_insert")
+@event.listens_for(Team, "before_update")
+def _normalize_team_name(mapper, connection, team):
+    """تحديث الاسم الموحد عند كل إضافة أو تعديل للفريق"""
+    team.team_name_normalized = normalize_arabic(team.team_name)
+
+
+class TeamSearchService:
+    """إكمال تلقائي لأسماء الفرق مرتب حسب التشابه"""
+
+    def _match(self, normalized: str):
+        """
+        شرط المطابقة وقيمة الترتيب
+        - مع pg_trgm: احتواء الجزء المكتوب أو تشابه كلمات (word_similarity) فوق الحد، وكلاهما يستخدم فهرس GIN
+        - بدونها: احتواء الجزء المكتوب فقط
+        """
+        column = Team.team_name_normalized
+        contains = column.like(f"%{normalized}%")
+
+        if trigram_enabled():
+            return or_(contains, column.op("%>")(normalized)), func.word_similarity(normalized, column)
+
+        return contains, case((column.like(f"{normalized}%"), 1.0), else_=0.5)
+
+    def matching_team_ids(self, db: Session, text: str):
+        """استعلام فرعي بمعرفات الفرق المطابقة (لاستخدامه داخل IN)"""
+        normalized = normalize_arabic(text)
+        condition, _ = self._match(normalized)
+        return db.query(Team.id).filter(condition)
+
+    def autocomplete(self, db: Session, text: str, limit: int = 10, active_only: bool = True) -> List[dict]:
+        """أفضل الفرق المطابقة: التي تبدأ بالنص أولاً ثم حسب التشابه"""
+        normalized = normalize_arabic(text)
+        if not normalized:
+            return []
+
+        condition, score = self._match(normalized)
+        query = db.query(
+            Team.id, Team.team_name, Team.field, score.label("score")
+        ).filter(condition)
+        if active_only:
+            query = query.filter(Team.is_active == True)
+
+        rows = query.order_by(
+            Team.team_name_normalized.like(f"{normalized}%").desc(),
+            score.desc(),
+            func.length(Team.team_name_normalized),
+            Team.id
+        ).limit(limit).all()
+
+        return [
+            {
+                "id": row.id,
+                "team_name": row.team_name,
+                "field": row.field,
+                "score": round(float(row.score), 3)
+            }
+            for row in rows
+        ]
+
+    def normalize_missing(self, db: Session) -> int:
+        """حساب الاسم الموحد للفرق المسجلة قبل إضافة العمود"""
+        teams = db.query(Team).filter(Team.team_name_normalized.is_(None)).all()
+        for team in teams:
+            team.team_name_normalized = normalize_arabic(team.team_name)
+            # updated_at بقيمته الحالية (وإلا طبّق onupdate وقت التشغيل): العمود مشتق لا تعديل على الفريق
+            flag_modified(team, "updated_at")
+        db.commit()
+        return len(teams)
+
+
+# إنشاء نسخة من الخدمة
+team_search_service = TeamSearchService()
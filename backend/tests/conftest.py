@@ -0,0 +1,99 @@
+"""
+إعداد الاختبارات (تُشغَّل من مجلد backend: python -m pytest -q)
+"""
+import os
+from itertools import count
+
+import pytest
+from sqlalchemy import event
+
+# قبل استيراد التطبيق: المحرك يُنشأ عند الاستيراد (دون اتصال حتى أول استعلام)
+# والبريد يقرأ المنفذ كرقم
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("SMTP_PORT", "587")
+
+# قاعدة PostgreSQL مخصصة للاختبار (تُحذف جداولها وتُنشأ من جديد)، وبدونها تُتخطى اختبارات قاعدة البيانات
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL غير محدد")
+    from database import Base, engine, init_db
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+    return engine
+
+
+@pytest.fixture
+def api(db_engine):
+    """عميل الاختبار بدون أحداث التشغيل (خيوط الفهرسة الخلفية تُربك عدّ الاستعلامات)"""
+    from fastapi.testclient import TestClient
+    from main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def statements(db_engine):
+    """الاستعلامات المنفذة على المحرك أثناء الاختبار (تُفرَّغ قبل كل قياس)"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(db_engine, "before_cursor_execute", record)
+
+
+_ids = count()
+
+DESCRIPTION = "وصف تقني مفصل للمشروع يشرح البنية والخوارزميات المستخدمة في النظام. " * 20
+
+
+@pytest.fixture
+def make_team(api):
+    """إنشاء فريق عبر المسار العام بعدد أعضاء معين"""
+    def create(members: int = 3) -> dict:
+        n = next(_ids)
+        response = api.post("/api/students/team", json={
+            "team_name": f"فريق الاختبار {n}",
+            "registration_type": "team_with_idea",
+            "field": "مسابقة التنقل الذكي",
+            "initial_idea": "فكرة أولية للمشروع",
+            "gender": "male",
+            "members": [
+                {
+                    "full_name": f"عضو {n}-{i}",
+                    "email": f"member{n}-{i}@example.com",
+                    "phone": f"05{n:04d}{i:04d}",
+                    "is_leader": i == 0
+                }
+                for i in range(members)
+            ]
+        })
+        assert response.status_code == 201, response.text
+        return response.json()
+    return create
+
+
+@pytest.fixture
+def make_project(api, make_team):
+    """تقديم مشروع لفريق (جديد إن لم يُحدد) ويعيد معرفه"""
+    def submit(team: dict = None) -> int:
+        team = team or make_team()
+        response = api.post("/api/projects/submit", json={
+            "member_email": team["members"][0]["email"],
+            "title": f"مشروع {team['team_name']}",
+            "problem_statement": "مشكلة الازدحام المروري في المدن الكبيرة وتأثيرها على التنقل اليومي",
+            "technical_description": f"{DESCRIPTION} ({team['team_name']})",
+            "scientific_reference": "https://doi.org/10.1000/xyz",
+            "field": "مسابقة التنقل الذكي"
+        })
+        assert response.status_code == 201, response.text
+        return response.json()["id"]
+    return submit
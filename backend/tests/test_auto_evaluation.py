@@ -0,0 +1,80 @@
+"""
+التقييم التلقائي بعد التقديم: انتظار AI لا يحجز خيوط threadpool ولا اتصالات قاعدة البيانات
+"""
+import asyncio
+
+import anyio
+
+import routers.evaluation as evaluation_router
+import routers.projects as projects_router
+from models import Evaluation
+from services.ai_evaluation import ai_evaluation_service
+
+SUBMISSIONS = 6
+CONCURRENCY = 2
+
+
+class CountingSemaphore(asyncio.Semaphore):
+    """حد الاستدعاءات مع عدد الطلبات التي وصلته"""
+
+    def __init__(self, value: int):
+        super().__init__(value)
+        self.requested = 0
+
+    async def acquire(self):
+        self.requested += 1
+        return await super().acquire()
+
+
+def test_waiting_evaluations_hold_no_threads_or_connections(db_engine, make_project, monkeypatch):
+    project_ids = [make_project() for _ in range(SUBMISSIONS)]
+    started = []
+    state = {}
+
+    async def fake_evaluate(**kwargs):
+        started.append(kwargs["title"])
+        await state["release"].wait()
+        return {
+            "success": True,
+            "outcome": "real",
+            "score": 20,
+            "detailed_scores": {"innovation": 4},
+            "notes": "تقييم تجريبي للاختبار",
+            "telemetry": {"model": "test"}
+        }
+
+    monkeypatch.setattr(projects_router, "AUTO_AI_EVALUATION", True)
+    monkeypatch.setattr(ai_evaluation_service, "api_key", "test-key")
+    monkeypatch.setattr(ai_evaluation_service, "evaluate_project", fake_evaluate)
+
+    async def scenario():
+        state["release"] = asyncio.Event()
+        slots = CountingSemaphore(CONCURRENCY)
+        monkeypatch.setattr(evaluation_router, "_auto_evaluation_slots", slots)
+
+        tasks = [asyncio.create_task(projects_router.process_new_submission(pid)) for pid in project_ids]
+        with anyio.fail_after(10):
+            while slots.requested < SUBMISSIONS or len(started) < CONCURRENCY:
+                await asyncio.sleep(0.01)
+
+        # كل المهام تنتظر AI أو الحد الآن
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        assert limiter.borrowed_tokens == 0
+        assert db_engine.pool.checkedout() == 0
+        assert len(started) == CONCURRENCY
+        assert not any(task.done() for task in tasks)
+
+        state["release"].set()
+        await asyncio.gather(*tasks)
+
+    anyio.run(scenario)
+
+    assert len(started) == SUBMISSIONS
+    with db_engine.connect() as connection:
+        saved = connection.execute(
+            Evaluation.__table__.select().where(
+                Evaluation.project_id.in_(project_ids),
+                Evaluation.is_ai_evaluation == True
+            )
+        ).all()
+    assert len(saved) == SUBMISSIONS
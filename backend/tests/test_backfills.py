@@ -0,0 +1,54 @@
+"""
+حساب الأعمدة المشتقة للسجلات القديمة عند التشغيل لا يُعدّ تعديلاً عليها
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update
+
+from database import SessionLocal
+from models import Team, TeamMember
+from services.people_directory import people_directory_service
+from services.team_search import team_search_service
+
+MODIFIED = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+def test_team_name_backfill_keeps_updated_at(db_engine, make_team):
+    team_id = make_team()["id"]
+
+    db = SessionLocal()
+    try:
+        db.execute(update(Team.__table__).where(Team.__table__.c.id == team_id).values(
+            team_name_normalized=None, updated_at=MODIFIED
+        ))
+        db.commit()
+
+        assert team_search_service.normalize_missing(db) >= 1
+        normalized, updated_at = db.execute(
+            select(Team.team_name_normalized, Team.updated_at).where(Team.id == team_id)
+        ).one()
+        assert normalized
+        assert updated_at == MODIFIED
+    finally:
+        db.close()
+
+
+def test_people_backfill_keeps_updated_at(db_engine, make_team):
+    team_id = make_team()["id"]
+    members = TeamMember.__table__
+
+    db = SessionLocal()
+    try:
+        db.execute(update(members).where(members.c.team_id == team_id).values(
+            email_normalized=None, updated_at=MODIFIED
+        ))
+        db.commit()
+
+        assert people_directory_service.normalize_missing(db) >= 3
+        rows = db.execute(
+            select(TeamMember.email_normalized, TeamMember.updated_at).where(TeamMember.team_id == team_id)
+        ).all()
+        assert all(email for email, _ in rows)
+        assert {updated_at for _, updated_at in rows} == {MODIFIED}
+    finally:
+        db.close()
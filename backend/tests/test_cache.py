@@ -0,0 +1,123 @@
+"""
+اختبارات طبقة التخزين المؤقت - RedisBackend مقابل fakeredis (بديل Redis داخل العملية)
+"""
+import sys
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from services.cache import Cache, MemoryBackend, RedisBackend, MISSING, cache, cached
+
+
+@pytest.fixture
+def client():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def redis_cache(client):
+    return Cache(RedisBackend(client))
+
+
+def test_values_round_trip_as_json(redis_cache):
+    redis_cache.set("stats", {"teams": 3, "fields": ["ذكاء", "تنقل"], "ratio": 0.5})
+    redis_cache.set("stamp", {"at": datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)})
+
+    assert redis_cache.get("stats") == {"teams": 3, "fields": ["ذكاء", "تنقل"], "ratio": 0.5}
+    # الأنواع غير JSON تعود بصيغتها المرمّزة
+    assert redis_cache.get("stamp") == {"at": "2026-01-02T03:04:05+00:00"}
+
+
+def test_stored_none_is_not_a_miss(redis_cache):
+    redis_cache.set("empty", None)
+
+    assert redis_cache.get("empty") is None
+    assert redis_cache.get("absent") is MISSING
+    assert (redis_cache.hits, redis_cache.misses) == (1, 1)
+
+
+def test_ttl_is_set_and_expires(client, redis_cache):
+    redis_cache.set("short", 1, ttl=1, tags=["projects"])
+
+    assert 0 < client.ttl("cache:short") <= 1
+    # وسم المفتاح لا ينتهي قبله
+    assert client.ttl("cache:tag:projects") >= 1
+
+    time.sleep(1.1)
+    assert redis_cache.get("short") is MISSING
+
+
+def test_short_write_does_not_shorten_tag_ttl(monkeypatch, client, redis_cache):
+    # أدنى مدة للوسم ثانية واحدة حتى ينتهي أجل الكتابة القصيرة سريعاً
+    monkeypatch.setattr(sys.modules["services.cache"], "CACHE_DEFAULT_TTL", 1)
+    redis_cache.set("a", 1, ttl=300, tags=["t"])
+    redis_cache.set("b", 2, ttl=1, tags=["t"])
+
+    assert client.ttl("cache:tag:t") > 1
+
+    # بعد انتهاء المفتاح القصير يبقى الوسم ليُبطل المفتاح الأطول عمراً
+    time.sleep(1.1)
+    assert redis_cache.get("b") is MISSING
+    assert redis_cache.invalidate("t") == 1
+    assert redis_cache.get("a") is MISSING
+
+
+def test_invalidate_removes_only_tagged_keys(client, redis_cache):
+    redis_cache.set("project-1", 1, tags=["projects", "project:1"])
+    redis_cache.set("project-2", 2, tags=["projects", "project:2"])
+    redis_cache.set("teams", 3, tags=["teams"])
+
+    assert redis_cache.invalidate("project:1") == 1
+    assert redis_cache.get("project-1") is MISSING
+    assert redis_cache.get("project-2") == 2
+
+    assert redis_cache.invalidate("projects") == 1
+    assert redis_cache.get("project-2") is MISSING
+    assert redis_cache.get("teams") == 3
+    assert not client.exists("cache:tag:projects")
+    assert redis_cache.stats()["invalidations"] == 2
+
+
+def test_size_and_clear_keep_other_prefixes(client, redis_cache):
+    client.set("other:key", "x")
+    redis_cache.set("a", 1, tags=["scores"])
+    redis_cache.set("b", 2)
+
+    # مجموعات الوسوم لا تُحسب مفاتيح
+    assert redis_cache.stats()["entries"] == 2
+
+    redis_cache.clear()
+    assert redis_cache.stats()["entries"] == 0
+    assert client.get("other:key") == b"x"
+
+
+def test_cached_decorator_uses_redis_backend(monkeypatch, client):
+    monkeypatch.setattr(cache, "backend", RedisBackend(client))
+    calls = []
+
+    @cached(key="top-teams:{limit}", tags=["scores"])
+    def top_teams(limit: int):
+        calls.append(limit)
+        return [{"rank": i} for i in range(limit)]
+
+    assert top_teams(2) == top_teams(2) == [{"rank": 0}, {"rank": 1}]
+    assert calls == [2]
+
+    cache.invalidate("scores")
+    top_teams(2)
+    assert calls == [2, 2]
+
+
+def test_memory_backend_evicts_least_recently_used():
+    memory = Cache(MemoryBackend(max_entries=2))
+    memory.set("a", 1)
+    memory.set("b", 2)
+    memory.get("a")
+    memory.set("c", 3)
+
+    assert memory.get("b") is MISSING
+    assert memory.get("a") == 1
+    assert memory.stats()["evictions"] == 1
@@ -0,0 +1,44 @@
+"""
+فهرسة البحث النصي لا تُعدّ تعديلاً على المشروع
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update
+
+from database import SessionLocal
+from models import ProjectSubmission
+from services.project_search import project_search_service
+
+
+def _row(db, project_id):
+    return db.execute(
+        select(ProjectSubmission.updated_at, ProjectSubmission.search_vector).where(ProjectSubmission.id == project_id)
+    ).one()
+
+
+def test_refresh_keeps_updated_at(db_engine, make_project):
+    project_id = make_project()
+    modified = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    db = SessionLocal()
+    try:
+        db.execute(update(ProjectSubmission.__table__).where(
+            ProjectSubmission.__table__.c.id == project_id
+        ).values(updated_at=modified, search_vector=None))
+        db.commit()
+
+        project_search_service.refresh_project(db, project_id)
+        updated_at, vector = _row(db, project_id)
+        assert vector is not None
+        assert updated_at == modified
+
+        # مشروع قديم بلا تعديل سابق: يبقى بلا updated_at بعد الفهرسة عند التشغيل
+        db.execute(update(ProjectSubmission.__table__).where(
+            ProjectSubmission.__table__.c.id == project_id
+        ).values(updated_at=None, search_vector=None))
+        db.commit()
+
+        assert project_search_service.index_missing(db) >= 1
+        assert _row(db, project_id).updated_at is None
+    finally:
+        db.close()
@@ -0,0 +1,47 @@
+"""
+عدد الاستعلامات ثابت لكل صفحة مهما كثرت الفرق والأعضاء (بدون N+1)
+"""
+import pytest
+
+
+def queries_for(api, statements, url: str) -> int:
+    statements.clear()
+    response = api.get(url)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+@pytest.mark.parametrize("url", [
+    "/api/students/teams?limit=100",
+    "/api/students/teams-with-space",
+])
+def test_team_lists_use_constant_queries(api, statements, make_team, url):
+    for _ in range(2):
+        make_team()
+    few = queries_for(api, statements, url)
+
+    for _ in range(10):
+        make_team(members=4)
+    many = queries_for(api, statements, url)
+
+    assert many == few
+
+
+def test_team_detail_does_not_grow_with_members(api, statements, make_team):
+    small = make_team(members=3)
+    large = make_team(members=6)
+
+    assert (
+        queries_for(api, statements, f"/api/students/team/{small['id']}")
+        == queries_for(api, statements, f"/api/students/team/{large['id']}")
+    )
+
+
+def test_project_detail_does_not_grow_with_members(api, statements, make_team, make_project):
+    small = make_project(make_team(members=3))
+    large = make_project(make_team(members=6))
+
+    assert (
+        queries_for(api, statements, f"/api/projects/{small}")
+        == queries_for(api, statements, f"/api/projects/{large}")
+    )
@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react'
 import { Link } from 'react-router-dom'
 import { Users, User, FileText, Star, TrendingUp, Loader2 } from 'lucide-react'
-import { teamsService, individualsService, projectsService } from '../../services/api'
+import { statsService } from '../../services/api'
 
 interface Stats {
   totalTeams: number
@@ -22,18 +22,14 @@ export default function AdminDashboard() {
   useEffect(() => {
     const fetchStats = async () => {
       try {
-        const [teams, individuals, projects, unassigned] = await Promise.all([
-          teamsService.getAll(),
-          individualsService.getAll(),
-          projectsService.getAll(),
-          individualsService.getUnassigned(),
-        ])
+        // All counters in one aggregated request
+        const dashboard = await statsService.getDashboardStats()
 
         setStats({
-          totalTeams: teams.length,
-          totalIndividuals: individuals.length,
-          totalProjects: projects.length,
-          unassignedIndividuals: unassigned.length,
+          totalTeams: dashboard.teams.total,
+          totalIndividuals: dashboard.individuals.total,
+          totalProjects: dashboard.projects.total,
+          unassignedIndividuals: dashboard.individuals.unassigned,
         })
       } catch (error) {
         console.error('Error fetching stats:', error)
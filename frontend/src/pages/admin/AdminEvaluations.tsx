@@ -117,15 +117,26 @@ export default function AdminEvaluations() {
 
   const handleRequestAIEvaluation = async (projectId: number) => {
     setRequestingAI(projectId)
+    const toastId = toast.loading('جاري بدء تقييم الذكاء الاصطناعي...')
     try {
-      await evaluationsService.requestAIEvaluation(projectId)
-      toast.success('تم طلب تقييم الذكاء الاصطناعي')
+      let received = 0
+      await evaluationsService.streamAIEvaluation(projectId, (event, data) => {
+        if (event === 'token') {
+          received += data.content.length
+          toast.loading(`جاري التقييم... (${received} حرف)`, { id: toastId })
+        } else if (event === 'result') {
+          toast.loading(`النتيجة: ${data.score} - جاري الحفظ...`, { id: toastId })
+        } else if (event === 'error') {
+          throw new Error(data.detail)
+        }
+      })
+      toast.success('تم تقييم المشروع بالذكاء الاصطناعي', { id: toastId })
 
       // Refresh projects
       const data = await projectsService.getAll()
       setProjects(data)
     } catch (error: any) {
-      toast.error(error.response?.data?.detail || 'حدث خطأ في طلب التقييم')
+      toast.error(error.response?.data?.detail || error.message || 'حدث خطأ في طلب التقييم', { id: toastId })
     } finally {
       setRequestingAI(null)
     }
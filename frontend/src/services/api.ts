@@ -11,6 +11,15 @@ import type {
   TopTeam,
   Admin,
   TeamWithSpace,
+  FacetedProjects,
+  ProjectListItem,
+  ProjectColumn,
+  ProjectColumnsRow,
+  TeamListItem,
+  IndividualListItem,
+  ProjectFacetFilters,
+  DashboardStats,
+  ProjectInclude,
 } from '../types'
 
 const API_BASE_URL = import.meta.env.VITE_API_TARGET || 'http://localhost:8000'
@@ -82,6 +91,12 @@ export const teamsService = {
     return response.data
   },
 
+  // Without initial_idea and members, for views that only need the rows
+  getAllCompact: async (): Promise<TeamListItem[]> => {
+    const response = await api.get('/students/teams?compact=true')
+    return response.data
+  },
+
   getById: async (id: number): Promise<Team> => {
     const response = await api.get(`/students/team/${id}`)
     return response.data
@@ -114,6 +129,11 @@ export const individualsService = {
     return response.data
   },
 
+  getAllCompact: async (): Promise<IndividualListItem[]> => {
+    const response = await api.get('/students/individuals?compact=true')
+    return response.data
+  },
+
   getById: async (id: number): Promise<Individual> => {
     const response = await api.get(`/students/individual/${id}`)
     return response.data
@@ -169,8 +189,34 @@ export const projectsService = {
     return response.data
   },
 
-  getById: async (id: number): Promise<ProjectSubmission> => {
-    const response = await api.get(`/projects/${id}`)
+  getAllCompact: async (): Promise<ProjectListItem[]> => {
+    const response = await api.get('/projects?compact=true')
+    return response.data
+  },
+
+  // Only the requested columns are read and returned (?fields=id,title,team_name)
+  getFields: async <K extends ProjectColumn>(fields: K[]): Promise<Pick<ProjectColumnsRow, K>[]> => {
+    const response = await api.get('/projects', { params: { fields: fields.join(',') } })
+    return response.data
+  },
+
+  getFaceted: async (filters: ProjectFacetFilters = {}): Promise<FacetedProjects> => {
+    // Arrays are sent as repeated params (field=a&field=b), as FastAPI expects
+    const params = new URLSearchParams()
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value === undefined || value === null) return
+      if (Array.isArray(value)) value.forEach((v) => params.append(key, String(v)))
+      else params.append(key, String(value))
+    })
+    const response = await api.get('/projects/faceted', { params })
+    return response.data
+  },
+
+  // include=evaluations requires an admin token
+  getById: async (id: number, include: ProjectInclude[] = []): Promise<ProjectSubmission> => {
+    const response = await api.get(`/projects/${id}`, {
+      params: include.length ? { include: include.join(',') } : undefined,
+    })
     return response.data
   },
 
@@ -223,6 +269,59 @@ export const evaluationsService = {
     return response.data
   },
 
+  // Streams the AI evaluation as Server-Sent Events (status/token/result/saved/error)
+  streamAIEvaluation: async (
+    projectId: number,
+    onEvent: (event: string, data: any) => void
+  ): Promise<Evaluation | null> => {
+    const token = localStorage.getItem('admin_token')
+    const response = await fetch(`${API_BASE_URL}/api/evaluation/ai/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Accept: 'text/event-stream',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: JSON.stringify({ project_id: projectId }),
+    })
+
+    if (!response.ok || !response.body) {
+      const error: any = new Error('AI evaluation stream failed')
+      error.response = { status: response.status, data: await response.json().catch(() => ({})) }
+      throw error
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+    let saved: Evaluation | null = null
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      let boundary = buffer.indexOf('\n\n')
+      while (boundary !== -1) {
+        const raw = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+        boundary = buffer.indexOf('\n\n')
+
+        let event = 'message'
+        let data = ''
+        for (const line of raw.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7)
+          else if (line.startsWith('data: ')) data += line.slice(6)
+        }
+        const parsed = data ? JSON.parse(data) : null
+        if (event === 'saved') saved = parsed
+        onEvent(event, parsed)
+      }
+    }
+
+    return saved
+  },
+
   getByProject: async (projectId: number): Promise<Evaluation[]> => {
     const response = await api.get(`/evaluation/project/${projectId}`)
     return response.data
@@ -285,7 +384,7 @@ export const emailService = {
 // ==================== Statistics ====================
 
 export const statsService = {
-  getDashboardStats: async () => {
+  getDashboardStats: async (): Promise<DashboardStats> => {
     const response = await api.get('/admin/stats')
     return response.data
   },
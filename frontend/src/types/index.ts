@@ -126,6 +126,66 @@ export interface ProjectSubmission {
   total_score?: number
   admin_score?: number
   ai_score?: number
+  // Only filled when requested with ?include= on the detail endpoint
+  evaluations?: ProjectEvaluation[] | null
+  attachments?: ProjectAttachment[] | null
+}
+
+// Optional parts of the project detail (?include=evaluations,attachments)
+export type ProjectInclude = 'evaluations' | 'attachments'
+
+export interface ProjectAttachment {
+  type: 'image' | 'diagram' | 'design'
+  label: string
+  filename: string
+  url: string
+}
+
+// Compact list rows (?compact=true): long text columns are not loaded
+export type ProjectListItem = Omit<ProjectSubmission, 'problem_statement' | 'technical_description' | 'scientific_reference' | 'team'>
+export type TeamListItem = Omit<Team, 'initial_idea' | 'members'>
+export type IndividualListItem = Omit<Individual, 'project_idea'>
+
+// Row shape for sparse project lists (?fields=)
+export type ProjectColumnsRow = Omit<
+  ProjectSubmission,
+  'team' | 'total_score' | 'admin_score' | 'ai_score' | 'evaluations' | 'attachments'
+> & { team_name: string }
+export type ProjectColumn = keyof ProjectColumnsRow
+
+// Faceted project listing
+export type EvaluationStatus = 'not_evaluated' | 'ai_only' | 'judges_only' | 'complete'
+
+export interface ProjectFacetItem extends ProjectListItem {
+  team_name: string
+  team_gender: 'male' | 'female'
+  evaluation_status: EvaluationStatus
+}
+
+export interface FacetCount {
+  value: string | null
+  count: number
+}
+
+export interface ProjectFacetFilters {
+  field?: string[]
+  has_attachments?: boolean
+  is_featured?: boolean
+  program_version_id?: number
+  gender?: 'male' | 'female'
+  evaluation_status?: EvaluationStatus[]
+  score_min?: number
+  score_max?: number
+  skip?: number
+  limit?: number
+}
+
+export interface FacetedProjects {
+  total: number
+  skip: number
+  limit: number
+  items: ProjectFacetItem[]
+  facets: Record<string, FacetCount[]>
 }
 
 // Evaluation
@@ -140,6 +200,12 @@ export interface Evaluation {
   created_at?: string
 }
 
+// Evaluation with the judge's name and weight (project detail, admins only)
+export interface ProjectEvaluation extends Evaluation {
+  admin_name?: string | null
+  admin_weight?: number | null
+}
+
 // Admin
 export interface Admin {
   id?: number
@@ -184,6 +250,41 @@ export interface TopTeam {
   ai_score: number
 }
 
+// Admin dashboard counters (GET /admin/stats)
+export interface DashboardStats {
+  program_version: string | null
+  teams: {
+    with_idea: number
+    no_idea: number
+    total: number
+    members: number
+  }
+  individuals: {
+    with_idea: number
+    no_idea: number
+    total: number
+    unassigned: number
+  }
+  total_participants: number
+  projects: {
+    total: number
+    with_attachments: number
+    without_attachments: number
+    featured: number
+    field_distribution: Record<string, number>
+  }
+  evaluations: {
+    total: number
+    ai: number
+    admin: number
+    projects_with_ai_evaluation: number
+    projects_with_admin_evaluation: number
+    projects_without_evaluation: number
+    average_ai_score: number
+    average_admin_score: number
+  }
+}
+
 // Team with available space
 export interface TeamWithSpace {
   id: number